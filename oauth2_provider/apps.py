@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class DOTConfig(AppConfig):
     name = "oauth2_provider"
     verbose_name = "Django OAuth Toolkit"
+
+    def ready(self):
+        # Connect the signal receivers invalidating the caches.
+        from . import cache  # noqa: F401
@@ -5,7 +5,6 @@ from .oauth2_backends import get_oauthlib_core
 
 
 UserModel = get_user_model()
-OAuthLibCore = get_oauthlib_core()
 
 
 class OAuth2Backend:
@@ -16,7 +15,7 @@ class OAuth2Backend:
     def authenticate(self, request=None, **credentials):
         if request is not None:
             try:
-                valid, request = OAuthLibCore.verify_request(request, scopes=[])
+                valid, request = get_oauthlib_core().verify_request(request, scopes=[])
             except ValueError as error:
                 if str(error) == "Invalid hex encoding in query string.":
                     raise SuspiciousOperation(error)
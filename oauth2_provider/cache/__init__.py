@@ -0,0 +1,44 @@
+"""
+Caching helpers used to keep hot lookups away from the database, one module
+per cached object.
+"""
+
+# flake8: noqa
+from .applications import (
+    APPLICATION_VERSION_KEY,
+    application_cache_key,
+    get_application,
+    get_application_cache,
+    get_applications,
+    get_local_application_cache,
+    invalidate_application_cache,
+)
+from .client_secrets import (
+    cache_verified_client_secret,
+    client_secret_cache_key,
+    get_client_secret_cache,
+    is_client_secret_verified,
+)
+from .grants import cache_grant, consume_cached_grant, get_cached_grant, get_grant_cache, grant_cache_key
+from .local import LocalTokenCache
+from .quotas import count_issued_token, get_live_token_count, get_live_token_count_cache, set_live_token_count
+from .refresh_tokens import (
+    cache_refresh_token_result,
+    claim_refresh_token,
+    get_refresh_token_result_cache,
+    refresh_token_result_cache_key,
+    release_refresh_token,
+    release_refresh_token_claims,
+)
+from .tokens import (
+    NOT_CACHED,
+    access_token_cache_enabled,
+    access_token_cache_key,
+    cache_access_token,
+    cache_missing_access_token,
+    get_access_token_cache,
+    get_cached_access_token,
+    get_local_access_token_cache,
+    invalidate_access_token,
+    local_access_token_cache_stats,
+)
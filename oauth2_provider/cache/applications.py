@@ -0,0 +1,209 @@
+"""
+Applications are cached by client_id and primary key, in a per-process cache
+when ``APPLICATION_LOCAL_CACHE_MAX_ENTRIES`` is set and in a shared cache when
+``APPLICATION_CACHE_ALIAS`` is set.
+"""
+
+import hashlib
+import threading
+import time
+
+from django.apps import apps
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from ..settings import APPLICATION_MODEL, oauth2_settings
+from .local import LocalTokenCache
+
+
+APPLICATION_KEY_PREFIX = "oauth2_provider:application:"
+APPLICATION_VERSION_KEY = APPLICATION_KEY_PREFIX + "version"
+
+
+_local_application_cache = None
+_local_application_cache_generation = 0
+_local_application_cache_lock = threading.Lock()
+
+
+def get_local_application_cache():
+    """
+    Return this process' application cache, or None if it is disabled.
+    """
+    global _local_application_cache
+
+    max_entries = oauth2_settings.APPLICATION_LOCAL_CACHE_MAX_ENTRIES
+    if not max_entries:
+        return None
+    if _local_application_cache is None:
+        with _local_application_cache_lock:
+            if _local_application_cache is None:
+                _local_application_cache = LocalTokenCache(
+                    max_entries, oauth2_settings.APPLICATION_LOCAL_CACHE_MAX_BYTES
+                )
+    return _local_application_cache
+
+
+def get_application_cache():
+    """
+    Return the Django cache used for applications, or None if caching is disabled.
+    """
+    alias = oauth2_settings.APPLICATION_CACHE_ALIAS
+    if not alias:
+        return None
+    return caches[alias]
+
+
+def application_cache_key(field, value):
+    digest = hashlib.sha256(str(value).encode("utf-8")).hexdigest()
+    return "%s%s:%s" % (APPLICATION_KEY_PREFIX, field, digest)
+
+
+def _get_application_cache_version(cache):
+    version = cache.get(APPLICATION_VERSION_KEY)
+    if version is None:
+        # Start from an arbitrary value, so that entries written before the
+        # version was evicted cannot match it again.
+        cache.add(APPLICATION_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(APPLICATION_VERSION_KEY)
+    return version
+
+
+def get_application(client_id=None, pk=None):
+    """
+    Return the Application with the given client_id, or primary key, going
+    through the application caches when they are enabled.
+
+    Raises Application.DoesNotExist like ``Application.objects.get()``.
+
+    Entries of the shared cache carry the version of the cache they were read
+    at, which is bumped whenever an application is saved or deleted: stale
+    entries are ignored by every process. Entries of the local cache are
+    dropped in the process that saves or deletes an application, other
+    processes keep serving them for at most ``APPLICATION_LOCAL_CACHE_SECONDS``.
+    """
+    field, value = ("client_id", client_id) if pk is None else ("pk", pk)
+    key = application_cache_key(field, value)
+
+    local_cache = get_local_application_cache()
+    if local_cache is not None:
+        application = local_cache.get(key)
+        if application is not None:
+            return application
+    generation = _local_application_cache_generation
+
+    cache = get_application_cache()
+    version = None
+    if cache is not None:
+        entries = cache.get_many([APPLICATION_VERSION_KEY, key])
+        version = entries.get(APPLICATION_VERSION_KEY)
+        entry = entries.get(key)
+        if version is None:
+            version = _get_application_cache_version(cache)
+        elif entry is not None and entry[0] == version:
+            application = entry[1]
+            if local_cache is not None and generation == _local_application_cache_generation:
+                local_cache.set(key, application, oauth2_settings.APPLICATION_LOCAL_CACHE_SECONDS)
+            return application
+
+    application = apps.get_model(APPLICATION_MODEL).objects.get(**{field: value})
+    _cache_application(application, cache, version, local_cache, generation)
+    return application
+
+
+def get_applications(client_ids):
+    """
+    Return the Applications with the given client_ids, in the same order and
+    skipping the unknown ones, going through the application caches like
+    ``get_application()``. The applications missing from the caches are loaded
+    with a single query.
+    """
+    keys = {client_id: application_cache_key("client_id", client_id) for client_id in client_ids}
+    found = {}
+
+    local_cache = get_local_application_cache()
+    if local_cache is not None:
+        for client_id, key in keys.items():
+            application = local_cache.get(key)
+            if application is not None:
+                found[client_id] = application
+    generation = _local_application_cache_generation
+    missing = [client_id for client_id in keys if client_id not in found]
+
+    cache = get_application_cache()
+    version = None
+    if cache is not None and missing:
+        entries = cache.get_many([APPLICATION_VERSION_KEY] + [keys[client_id] for client_id in missing])
+        version = entries.get(APPLICATION_VERSION_KEY)
+        if version is None:
+            version = _get_application_cache_version(cache)
+        for client_id in missing:
+            entry = entries.get(keys[client_id])
+            if entry is not None and entry[0] == version:
+                found[client_id] = entry[1]
+                if local_cache is not None and generation == _local_application_cache_generation:
+                    local_cache.set(
+                        keys[client_id], entry[1], oauth2_settings.APPLICATION_LOCAL_CACHE_SECONDS
+                    )
+        missing = [client_id for client_id in missing if client_id not in found]
+
+    if missing:
+        for application in apps.get_model(APPLICATION_MODEL).objects.filter(client_id__in=missing):
+            found[application.client_id] = application
+            _cache_application(application, cache, version, local_cache, generation)
+    return [found[client_id] for client_id in keys if client_id in found]
+
+
+def _cache_application(application, cache, version, local_cache, generation):
+    keys = [
+        application_cache_key("client_id", application.client_id),
+        application_cache_key("pk", application.pk),
+    ]
+    if cache is not None:
+        cache.set_many(
+            {cache_key: (version, application) for cache_key in keys},
+            oauth2_settings.APPLICATION_CACHE_SECONDS,
+        )
+    if local_cache is not None and generation == _local_application_cache_generation:
+        for cache_key in keys:
+            local_cache.set(cache_key, application, oauth2_settings.APPLICATION_LOCAL_CACHE_SECONDS)
+
+
+def _bump_application_cache_version():
+    cache = get_application_cache()
+    if cache is not None:
+        try:
+            cache.incr(APPLICATION_VERSION_KEY)
+        except ValueError:
+            cache.add(APPLICATION_VERSION_KEY, time.time_ns(), None)
+
+
+def invalidate_application_cache(*args, **kwargs):
+    """
+    Invalidate every cached application. Connected to the post_save and
+    post_delete signals of the application model, and to be called after
+    updating applications without sending them, e.g. with ``QuerySet.update()``.
+    """
+    global _local_application_cache_generation
+
+    _local_application_cache_generation += 1
+    local_cache = get_local_application_cache()
+    if local_cache is not None:
+        local_cache.clear()
+    _bump_application_cache_version()
+    # Bump it again once committed, in case another process cached the previous
+    # values in between.
+    transaction.on_commit(_bump_application_cache_version)
+
+
+def reset_local_application_cache(*args, **kwargs):
+    global _local_application_cache
+
+    if kwargs.get("setting") == "OAUTH2_PROVIDER":
+        _local_application_cache = None
+
+
+setting_changed.connect(reset_local_application_cache)
+post_save.connect(invalidate_application_cache, sender=APPLICATION_MODEL)
+post_delete.connect(invalidate_application_cache, sender=APPLICATION_MODEL)
@@ -0,0 +1,55 @@
+"""
+Successful verifications of hashed client secrets can be remembered in the
+cache named by ``CLIENT_SECRET_CACHE_ALIAS``.
+"""
+
+import hashlib
+
+from django.core.cache import caches
+from django.utils.crypto import salted_hmac
+
+from ..settings import oauth2_settings
+
+
+CLIENT_SECRET_KEY_PREFIX = "oauth2_provider:client_secret:"
+
+
+def get_client_secret_cache():
+    """
+    Return the Django cache used for verified client secrets, or None if caching is disabled.
+    """
+    alias = oauth2_settings.CLIENT_SECRET_CACHE_ALIAS
+    if not alias:
+        return None
+    return caches[alias]
+
+
+def client_secret_cache_key(provided_secret, stored_secret):
+    """
+    The key depends on the stored (hashed) secret, so that changing it makes
+    previous entries unreachable, and on an HMAC of the provided secret keyed
+    with SECRET_KEY, so that the cache contents cannot be used to guess it.
+    """
+    stored_digest = hashlib.sha256(stored_secret.encode("utf-8")).hexdigest()
+    provided_digest = salted_hmac(CLIENT_SECRET_KEY_PREFIX, provided_secret, algorithm="sha256").hexdigest()
+    return CLIENT_SECRET_KEY_PREFIX + stored_digest + ":" + provided_digest
+
+
+def is_client_secret_verified(provided_secret, stored_secret):
+    """
+    Return True if the provided secret was recently found to match the stored hash.
+    """
+    cache = get_client_secret_cache()
+    if cache is None:
+        return False
+    return cache.get(client_secret_cache_key(provided_secret, stored_secret)) is True
+
+
+def cache_verified_client_secret(provided_secret, stored_secret):
+    cache = get_client_secret_cache()
+    if cache is not None:
+        cache.set(
+            client_secret_cache_key(provided_secret, stored_secret),
+            True,
+            oauth2_settings.CLIENT_SECRET_CACHE_SECONDS,
+        )
@@ -0,0 +1,68 @@
+"""
+Authorization codes can be kept in the cache named by ``GRANT_CACHE_ALIAS``
+instead of the grant table.
+"""
+
+import hashlib
+import math
+
+from django.apps import apps
+from django.core.cache import caches
+from django.utils import timezone
+
+from ..settings import GRANT_MODEL, oauth2_settings
+
+
+GRANT_KEY_PREFIX = "oauth2_provider:grant:"
+
+
+def get_grant_cache():
+    """
+    Return the Django cache grants are stored in, or None if they are stored in the database.
+    """
+    alias = oauth2_settings.GRANT_CACHE_ALIAS
+    if not alias:
+        return None
+    return caches[alias]
+
+
+def grant_cache_key(code):
+    return GRANT_KEY_PREFIX + hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+def cache_grant(grant):
+    """
+    Store an unsaved grant in the grant cache until it expires.
+
+    Only the field values are stored, so that entries do not depend on how
+    model instances are pickled and do not embed the related objects.
+    """
+    values = {
+        field.attname: getattr(grant, field.attname)
+        for field in grant._meta.concrete_fields
+        if not field.primary_key
+    }
+    timeout = math.ceil((grant.expires - timezone.now()).total_seconds())
+    get_grant_cache().set(grant_cache_key(grant.code), values, max(timeout, 1))
+
+
+def get_cached_grant(code):
+    """
+    Return the unsaved grant stored for the given code, or None.
+    """
+    values = get_grant_cache().get(grant_cache_key(code))
+    if values is None:
+        return None
+    return apps.get_model(GRANT_MODEL)(**values)
+
+
+def consume_cached_grant(code):
+    """
+    Remove the grant stored for the given code, and return whether this call
+    removed it. When several requests redeem the same code concurrently, only
+    one of them gets True.
+
+    This relies on the cache backend reporting whether ``delete()`` removed the
+    key, which the backends shipped with Django do.
+    """
+    return bool(get_grant_cache().delete(grant_cache_key(code)))
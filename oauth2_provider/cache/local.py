@@ -0,0 +1,117 @@
+"""
+A bounded in-process cache, used in front of the shared Django caches.
+"""
+
+import heapq
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+
+class LocalTokenCache:
+    """
+    A thread-safe, in-process cache bounded both by number of entries and by
+    size in bytes.
+
+    Values are stored pickled, so that every caller gets its own copy and the
+    size of each entry is known exactly. ``None`` can be stored to remember that
+    a token does not exist.
+
+    When the cache is over budget, entries whose timeout has passed are
+    reclaimed first, in expiry order, then the least recently used ones.
+    """
+
+    # Rough per-entry bookkeeping cost: key, tuple, dict slot and heap item.
+    ENTRY_OVERHEAD = 256
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._expiry_heap = []
+        self._lock = threading.Lock()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= now:
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+        data = entry[0]
+        return None if data is None else pickle.loads(data)
+
+    def set(self, key, value, timeout):
+        data = None if value is None else pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        size = self.ENTRY_OVERHEAD + (len(data) if data is not None else 0)
+        if timeout <= 0 or size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + timeout
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (data, expires_at, size)
+            self._size += size
+            heapq.heappush(self._expiry_heap, (expires_at, key))
+            self._evict()
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                if key in self._entries:
+                    self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._expiry_heap = []
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _remove(self, key):
+        _data, _expires_at, size = self._entries.pop(key)
+        self._size -= size
+
+    def _evict(self):
+        now = time.monotonic()
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            expires_at, key = heapq.heappop(heap)
+            entry = self._entries.get(key)
+            # The heap may hold stale items for keys that were overwritten or deleted.
+            if entry is not None and entry[1] == expires_at:
+                self._remove(key)
+                self.expirations += 1
+
+        while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+            key = next(iter(self._entries))
+            self._remove(key)
+            self.evictions += 1
+
+        if len(heap) > 2 * len(self._entries) + 64:
+            self._expiry_heap = [(entry[1], key) for key, entry in self._entries.items()]
+            heapq.heapify(self._expiry_heap)
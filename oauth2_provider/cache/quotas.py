@@ -0,0 +1,76 @@
+"""
+The number of live tokens of each application and user, checked against the
+application's ``live_token_quota``, can be counted in the cache named by
+``LIVE_TOKEN_QUOTA_CACHE_ALIAS``.
+"""
+
+from django.core.cache import caches
+from django.db import transaction
+
+from ..settings import oauth2_settings
+
+
+LIVE_TOKEN_COUNT_KEY_PREFIX = "oauth2_provider:live_token_count:"
+
+
+def get_live_token_count_cache():
+    """
+    Return the Django cache live tokens are counted in, or None if disabled.
+    """
+    alias = oauth2_settings.LIVE_TOKEN_QUOTA_CACHE_ALIAS
+    if not alias:
+        return None
+    return caches[alias]
+
+
+def live_token_count_cache_key(application_id, user_id):
+    return "%s%s:%s" % (LIVE_TOKEN_COUNT_KEY_PREFIX, application_id, user_id)
+
+
+def get_live_token_count(application_id, user_id, count_live_tokens, timeout):
+    """
+    Return the number of live tokens the user has with the application.
+
+    The number is kept in the cache for ``timeout`` seconds, the lifetime of the
+    application's access tokens, and only counted in the database, with the
+    ``count_live_tokens`` callable, when the cache does not have it, or on every
+    call if the cache is disabled. Tokens revoked or expired since are still
+    counted: callers enforcing a quota should check the database before acting
+    on it, and store the right number with ``set_live_token_count``.
+    """
+    cache = get_live_token_count_cache()
+    if cache is None:
+        return count_live_tokens()
+    key = live_token_count_cache_key(application_id, user_id)
+    count = cache.get(key)
+    if count is None:
+        count = count_live_tokens()
+        if not cache.add(key, count, timeout):
+            count = cache.get(key, count)
+    return count
+
+
+def count_issued_token(application_id, user_id):
+    """
+    Add a token issued to the user by the application to the cached count, once
+    the transaction issuing it commits: tokens rolled back are not counted.
+    """
+    cache = get_live_token_count_cache()
+    if cache is None:
+        return
+    key = live_token_count_cache_key(application_id, user_id)
+
+    def increment():
+        try:
+            cache.incr(key)
+        except ValueError:
+            # The count expired, the next token issued counts them in the database.
+            pass
+
+    transaction.on_commit(increment)
+
+
+def set_live_token_count(application_id, user_id, count, timeout):
+    cache = get_live_token_count_cache()
+    if cache is not None:
+        cache.set(live_token_count_cache_key(application_id, user_id), count, timeout)
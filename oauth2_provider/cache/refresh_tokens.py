@@ -0,0 +1,110 @@
+"""
+The token responses of refresh token requests can be shared, for a short while,
+through the cache named by ``REFRESH_TOKEN_RESULT_CACHE_ALIAS``, so that
+duplicate refreshes wait for the first one instead of competing for its rows.
+"""
+
+import hashlib
+import threading
+import time
+
+from django.core.cache import caches
+
+from ..settings import oauth2_settings
+
+
+REFRESH_TOKEN_RESULT_KEY_PREFIX = "oauth2_provider:refresh_token_result:"
+
+# Stored in the refresh token result cache while a refresh is in progress.
+REFRESH_TOKEN_PENDING = "pending"
+REFRESH_TOKEN_POLL_SECONDS = 0.02
+
+# The refresh tokens marked as pending by the current thread whose result is not
+# stored yet, released by `release_refresh_token_claims` when the request ends.
+_refresh_token_claims = threading.local()
+
+
+def get_refresh_token_result_cache():
+    """
+    Return the Django cache refresh token responses are shared through, or None if disabled.
+    """
+    alias = oauth2_settings.REFRESH_TOKEN_RESULT_CACHE_ALIAS
+    if not alias:
+        return None
+    return caches[alias]
+
+
+def refresh_token_result_cache_key(refresh_token):
+    return REFRESH_TOKEN_RESULT_KEY_PREFIX + hashlib.sha256(refresh_token.encode("utf-8")).hexdigest()
+
+
+def _get_refresh_token_claims():
+    claims = getattr(_refresh_token_claims, "refresh_tokens", None)
+    if claims is None:
+        claims = _refresh_token_claims.refresh_tokens = set()
+    return claims
+
+
+def claim_refresh_token(refresh_token):
+    """
+    Return the result stored by a recent refresh with the given refresh token, or
+    None if the caller should do the refresh itself.
+
+    The first caller marks the refresh token as pending and gets None. Callers
+    finding it pending wait up to ``REFRESH_TOKEN_RESULT_WAIT_SECONDS`` for the
+    result, polling the cache; if none shows up, they get None as well.
+    """
+    cache = get_refresh_token_result_cache()
+    key = refresh_token_result_cache_key(refresh_token)
+    wait_seconds = oauth2_settings.REFRESH_TOKEN_RESULT_WAIT_SECONDS
+    if cache.add(key, REFRESH_TOKEN_PENDING, wait_seconds):
+        _get_refresh_token_claims().add(refresh_token)
+        return None
+    deadline = time.monotonic() + wait_seconds
+    while True:
+        result = cache.get(key)
+        if result != REFRESH_TOKEN_PENDING:
+            return result
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(REFRESH_TOKEN_POLL_SECONDS)
+
+
+def release_refresh_token(refresh_token):
+    """
+    Remove the pending mark of a refresh that did not complete.
+    """
+    _get_refresh_token_claims().discard(refresh_token)
+    cache = get_refresh_token_result_cache()
+    if cache is None:
+        return
+    key = refresh_token_result_cache_key(refresh_token)
+    if cache.get(key) == REFRESH_TOKEN_PENDING:
+        cache.delete(key)
+
+
+def release_refresh_token_claims():
+    """
+    Remove the pending marks left by the current thread, whose refreshes failed
+    after the refresh token was validated or were rolled back.
+    """
+    for refresh_token in list(_get_refresh_token_claims()):
+        release_refresh_token(refresh_token)
+
+
+def cache_refresh_token_result(refresh_token, result):
+    """
+    Store the result of a refresh in place of its pending mark.
+
+    A rotated refresh token is only accepted again during the grace period, so the
+    result is kept no longer than ``REFRESH_TOKEN_GRACE_PERIOD_SECONDS``: without
+    one, the pending mark is removed and duplicate requests are refused.
+    """
+    timeout = oauth2_settings.REFRESH_TOKEN_RESULT_CACHE_SECONDS
+    if oauth2_settings.ROTATE_REFRESH_TOKEN:
+        timeout = min(timeout, oauth2_settings.REFRESH_TOKEN_GRACE_PERIOD_SECONDS)
+    if timeout <= 0:
+        release_refresh_token(refresh_token)
+        return
+    _get_refresh_token_claims().discard(refresh_token)
+    get_refresh_token_result_cache().set(refresh_token_result_cache_key(refresh_token), result, timeout)
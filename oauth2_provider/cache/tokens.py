@@ -0,0 +1,191 @@
+"""
+Access tokens are cached by the validator in up to two tiers:
+
+* a per-process LRU cache, enabled by ``ACCESS_TOKEN_LOCAL_CACHE_MAX_ENTRIES``,
+  which also remembers tokens that do not exist for a short while;
+* a shared cache, enabled when ``ACCESS_TOKEN_CACHE_ALIAS`` names one of the
+  caches configured in Django's ``CACHES`` setting.
+
+Entries are keyed by a digest of the token string, so that raw tokens never end
+up in cache keys, and never outlive the token they represent.
+"""
+
+import hashlib
+import threading
+
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+from ..settings import ACCESS_TOKEN_MODEL, oauth2_settings
+from .local import LocalTokenCache
+
+
+ACCESS_TOKEN_KEY_PREFIX = "oauth2_provider:access_token:"
+
+# Returned by get_cached_access_token() when the caller passes it as default and
+# nothing is known about the token.
+NOT_CACHED = object()
+
+
+_local_access_token_cache = None
+_local_access_token_cache_lock = threading.Lock()
+
+
+def get_local_access_token_cache():
+    """
+    Return this process' access token cache, or None if it is disabled.
+    """
+    global _local_access_token_cache
+
+    max_entries = oauth2_settings.ACCESS_TOKEN_LOCAL_CACHE_MAX_ENTRIES
+    if not max_entries:
+        return None
+    if _local_access_token_cache is None:
+        with _local_access_token_cache_lock:
+            if _local_access_token_cache is None:
+                _local_access_token_cache = LocalTokenCache(
+                    max_entries, oauth2_settings.ACCESS_TOKEN_LOCAL_CACHE_MAX_BYTES
+                )
+    return _local_access_token_cache
+
+
+def local_access_token_cache_stats():
+    """
+    Return the hit, miss, eviction and size counters of this process' access
+    token cache, or None if it is disabled.
+    """
+    local_cache = get_local_access_token_cache()
+    return local_cache.stats() if local_cache is not None else None
+
+
+def get_access_token_cache():
+    """
+    Return the Django cache used for access tokens, or None if caching is disabled.
+    """
+    alias = oauth2_settings.ACCESS_TOKEN_CACHE_ALIAS
+    if not alias:
+        return None
+    return caches[alias]
+
+
+def access_token_cache_key(token):
+    digest = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    return ACCESS_TOKEN_KEY_PREFIX + digest
+
+
+def _remaining_seconds(access_token, max_seconds):
+    if not access_token.expires:
+        return 0
+    remaining = (access_token.expires - timezone.now()).total_seconds()
+    return min(max_seconds, int(remaining))
+
+
+def get_cached_access_token(token, default=None):
+    """
+    Return the cached AccessToken instance for the given token string.
+
+    ``None`` is returned if the token is known not to exist, ``default`` if
+    nothing is cached for it.
+    """
+    key = access_token_cache_key(token)
+    local_cache = get_local_access_token_cache()
+    if local_cache is not None:
+        access_token = local_cache.get(key, NOT_CACHED)
+        if access_token is not NOT_CACHED:
+            return access_token
+
+    cache = get_access_token_cache()
+    if cache is None:
+        return default
+    access_token = cache.get(key)
+    if access_token is None:
+        return default
+    if local_cache is not None:
+        local_cache.set(
+            key,
+            access_token,
+            _remaining_seconds(access_token, oauth2_settings.ACCESS_TOKEN_LOCAL_CACHE_SECONDS),
+        )
+    return access_token
+
+
+def cache_access_token(access_token):
+    """
+    Store an AccessToken instance, along with its related application.
+
+    The timeout is capped at the token's expiry so that an expired token is
+    never served from the cache.
+    """
+    key = access_token_cache_key(access_token.token)
+    local_cache = get_local_access_token_cache()
+    if local_cache is not None:
+        local_cache.set(
+            key,
+            access_token,
+            _remaining_seconds(access_token, oauth2_settings.ACCESS_TOKEN_LOCAL_CACHE_SECONDS),
+        )
+    cache = get_access_token_cache()
+    if cache is not None:
+        timeout = _remaining_seconds(access_token, oauth2_settings.ACCESS_TOKEN_CACHE_SECONDS)
+        if timeout > 0:
+            cache.set(key, access_token, timeout)
+
+
+def cache_missing_access_token(token):
+    """
+    Remember for ``ACCESS_TOKEN_LOCAL_CACHE_NEGATIVE_SECONDS`` that the given
+    token string does not exist, so that repeated attempts with unknown tokens
+    do not reach the database.
+    """
+    local_cache = get_local_access_token_cache()
+    if local_cache is not None:
+        local_cache.set(
+            access_token_cache_key(token), None, oauth2_settings.ACCESS_TOKEN_LOCAL_CACHE_NEGATIVE_SECONDS
+        )
+
+
+def invalidate_access_token(*tokens):
+    """
+    Remove the given token strings from the access token caches.
+
+    Only this process' local cache can be invalidated: other processes keep
+    serving their copy for at most ``ACCESS_TOKEN_LOCAL_CACHE_SECONDS``, which
+    bounds how long revocations take to reach them.
+    """
+    if not tokens:
+        return
+    keys = [access_token_cache_key(token) for token in tokens]
+    local_cache = get_local_access_token_cache()
+    if local_cache is not None:
+        local_cache.delete_many(keys)
+    cache = get_access_token_cache()
+    if cache is not None:
+        cache.delete_many(keys)
+
+
+def invalidate_cached_access_token(sender, instance, **kwargs):
+    """
+    Remove a saved or deleted access token from the access token caches.
+    Connected to the post_save and post_delete signals of the access token
+    model, which are also sent for the tokens deleted in cascade with their
+    user, application or ID token, or by ``QuerySet.delete()``.
+    """
+    invalidate_access_token(instance.token)
+
+
+def access_token_cache_enabled():
+    return get_access_token_cache() is not None or get_local_access_token_cache() is not None
+
+
+def reset_local_access_token_cache(*args, **kwargs):
+    global _local_access_token_cache
+
+    if kwargs.get("setting") == "OAUTH2_PROVIDER":
+        _local_access_token_cache = None
+
+
+setting_changed.connect(reset_local_access_token_cache)
+post_save.connect(invalidate_cached_access_token, sender=ACCESS_TOKEN_MODEL)
+post_delete.connect(invalidate_cached_access_token, sender=ACCESS_TOKEN_MODEL)
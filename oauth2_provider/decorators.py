@@ -1,15 +1,65 @@
+import asyncio
 from functools import wraps
 
+from asgiref.sync import sync_to_async
 from django.core.exceptions import ImproperlyConfigured
 from django.http import HttpResponseForbidden
 from oauthlib.oauth2 import Server
 
-from .oauth2_backends import OAuthLibCore
+from .oauth2_backends import OAuthLibCore, get_oauthlib_core
 from .oauth2_validators import OAuth2Validator
 from .scopes import get_scopes_backend
 from .settings import oauth2_settings
 
 
+SAFE_HTTP_METHODS = frozenset(["GET", "HEAD", "OPTIONS"])
+
+
+def _protect(view_func, get_required_scopes, validator_cls, server_cls):
+    """
+    Wrap `view_func` so that it is only called for requests carrying an access token
+    valid for the scopes returned by `get_required_scopes(request)`. Both sync and
+    async views are supported.
+
+    The default ``Server`` is built with ``oauth2_settings.server_kwargs`` and shared
+    through ``get_oauthlib_core()``; a custom `server_cls` only gets the validator,
+    and is built once for the decorated view.
+    """
+    custom_cores = []
+
+    def get_core():
+        if server_cls is Server:
+            return get_oauthlib_core(server_cls, validator_cls, OAuthLibCore)
+        if not custom_cores or oauth2_settings.ALWAYS_RELOAD_OAUTHLIB_CORE:
+            custom_cores[:] = [OAuthLibCore(server_cls(validator_cls()))]
+        return custom_cores[0]
+
+    def verify(request):
+        core = get_core()
+        valid, oauthlib_req = core.verify_request(request, scopes=get_required_scopes(request))
+        if valid:
+            request.resource_owner = oauthlib_req.user
+        return valid
+
+    if asyncio.iscoroutinefunction(view_func):
+
+        @wraps(view_func)
+        async def _validate(request, *args, **kwargs):
+            if await sync_to_async(verify)(request):
+                return await view_func(request, *args, **kwargs)
+            return HttpResponseForbidden()
+
+    else:
+
+        @wraps(view_func)
+        def _validate(request, *args, **kwargs):
+            if verify(request):
+                return view_func(request, *args, **kwargs)
+            return HttpResponseForbidden()
+
+    return _validate
+
+
 def protected_resource(scopes=None, validator_cls=OAuth2Validator, server_cls=Server):
     """
     Decorator to protect views by providing OAuth2 authentication out of the box,
@@ -21,20 +71,10 @@ def protected_resource(scopes=None, validator_cls=OAuth2Validator, server_cls=Se
             # ...
             pass
     """
-    _scopes = scopes or []
+    required_scopes = frozenset(scopes or [])
 
     def decorator(view_func):
-        @wraps(view_func)
-        def _validate(request, *args, **kwargs):
-            validator = validator_cls()
-            core = OAuthLibCore(server_cls(validator))
-            valid, oauthlib_req = core.verify_request(request, scopes=_scopes)
-            if valid:
-                request.resource_owner = oauthlib_req.user
-                return view_func(request, *args, **kwargs)
-            return HttpResponseForbidden()
-
-        return _validate
+        return _protect(view_func, lambda request: required_scopes, validator_cls, server_cls)
 
     return decorator
 
@@ -52,36 +92,31 @@ def rw_protected_resource(scopes=None, validator_cls=OAuth2Validator, server_cls
             pass
 
     """
-    _scopes = scopes or []
-
-    def decorator(view_func):
-        @wraps(view_func)
-        def _validate(request, *args, **kwargs):
-            # Check if provided scopes are acceptable
+    extra_scopes = frozenset(scopes or [])
+    checked_scopes = None
+
+    def get_required_scopes(request):
+        nonlocal checked_scopes
+        # READ_SCOPE and WRITE_SCOPE are read on every request, so that changes
+        # to the settings are honoured; they are checked against the scopes
+        # backend when they change.
+        read_scope, write_scope = oauth2_settings.READ_SCOPE, oauth2_settings.WRITE_SCOPE
+        if checked_scopes != (read_scope, write_scope):
+            read_write_scopes = [read_scope, write_scope]
             provided_scopes = get_scopes_backend().get_all_scopes()
-            read_write_scopes = [oauth2_settings.READ_SCOPE, oauth2_settings.WRITE_SCOPE]
-
             if not set(read_write_scopes).issubset(set(provided_scopes)):
                 raise ImproperlyConfigured(
                     "rw_protected_resource decorator requires following scopes {0}"
                     " to be in OAUTH2_PROVIDER['SCOPES'] list in settings".format(read_write_scopes)
                 )
+            checked_scopes = (read_scope, write_scope)
 
-            # Check if method is safe
-            if request.method.upper() in ["GET", "HEAD", "OPTIONS"]:
-                _scopes.append(oauth2_settings.READ_SCOPE)
-            else:
-                _scopes.append(oauth2_settings.WRITE_SCOPE)
-
-            # proceed with validation
-            validator = validator_cls()
-            core = OAuthLibCore(server_cls(validator))
-            valid, oauthlib_req = core.verify_request(request, scopes=_scopes)
-            if valid:
-                request.resource_owner = oauthlib_req.user
-                return view_func(request, *args, **kwargs)
-            return HttpResponseForbidden()
+        # Check if method is safe
+        if request.method.upper() in SAFE_HTTP_METHODS:
+            return extra_scopes | {read_scope}
+        return extra_scopes | {write_scope}
 
-        return _validate
+    def decorator(view_func):
+        return _protect(view_func, get_required_scopes, validator_cls, server_cls)
 
     return decorator
@@ -0,0 +1,111 @@
+import hashlib
+import hmac
+
+from django.contrib.auth.hashers import BasePasswordHasher, get_hasher, identify_hasher, mask_hash
+from django.utils.crypto import constant_time_compare
+from django.utils.translation import gettext_noop as _
+
+from .settings import oauth2_settings
+
+
+class SaltedHMACSHA256Hasher(BasePasswordHasher):
+    """
+    Hash client secrets with a salted HMAC-SHA256.
+
+    Generated client secrets are long random strings, which cannot be guessed
+    whatever the cost of hashing them, so this hasher skips the key stretching
+    of password hashers. It must not be used for user passwords, nor for client
+    secrets chosen by people.
+    """
+
+    algorithm = "hmac_sha256"
+
+    def encode(self, password, salt):
+        assert password is not None
+        assert salt and "$" not in salt
+        digest = hmac.new(salt.encode(), password.encode(), hashlib.sha256).hexdigest()
+        return "%s$%s$%s" % (self.algorithm, salt, digest)
+
+    def decode(self, encoded):
+        algorithm, salt, digest = encoded.split("$", 2)
+        assert algorithm == self.algorithm
+        return {"algorithm": algorithm, "hash": digest, "salt": salt}
+
+    def verify(self, password, encoded):
+        decoded = self.decode(encoded)
+        return constant_time_compare(encoded, self.encode(password, decoded["salt"]))
+
+    def safe_summary(self, encoded):
+        decoded = self.decode(encoded)
+        return {
+            _("algorithm"): decoded["algorithm"],
+            _("salt"): mask_hash(decoded["salt"], show=2),
+            _("hash"): mask_hash(decoded["hash"]),
+        }
+
+    def harden_runtime(self, password, encoded):
+        pass
+
+
+def get_client_secret_hasher():
+    """
+    Return the hasher new client secrets are hashed with: CLIENT_SECRET_HASHER,
+    or Django's default password hasher if it is not set.
+    """
+    hasher_class = oauth2_settings.CLIENT_SECRET_HASHER
+    if hasher_class is None:
+        return get_hasher("default")
+    return hasher_class()
+
+
+def identify_client_secret_hasher(encoded):
+    """
+    Return the hasher a client secret was hashed with, which is either
+    CLIENT_SECRET_HASHER, SaltedHMACSHA256Hasher or one of PASSWORD_HASHERS.
+
+    Raises ValueError if the secret is not hashed.
+    """
+    algorithm = encoded.split("$", 1)[0]
+    for hasher in (get_client_secret_hasher(), SaltedHMACSHA256Hasher()):
+        if hasher.algorithm == algorithm:
+            return hasher
+    return identify_hasher(encoded)
+
+
+def make_client_secret(secret):
+    return encode_client_secret(get_client_secret_hasher(), secret)
+
+
+def encode_client_secret(hasher, secret):
+    """
+    Hash a secret with the given hasher instance and a new salt. This needs no
+    settings, so that it can run in worker processes.
+    """
+    return hasher.encode(secret, hasher.salt())
+
+
+def check_client_secret(secret, encoded):
+    """
+    Return whether the secret matches its hashed value.
+
+    Raises ValueError if the value is not hashed.
+    """
+    hasher = identify_client_secret_hasher(encoded)
+    if secret is None:
+        return False
+    try:
+        return hasher.verify(secret, encoded)
+    except (AssertionError, ValueError):
+        return False
+
+
+def client_secret_must_update(encoded):
+    """
+    Return whether a hashed client secret should be hashed again, because it was
+    hashed with another hasher than the current one or with other parameters.
+
+    Raises ValueError if the value is not hashed.
+    """
+    hasher = identify_client_secret_hasher(encoded)
+    preferred = get_client_secret_hasher()
+    return hasher.algorithm != preferred.algorithm or preferred.must_update(encoded)
@@ -0,0 +1,216 @@
+"""
+Self-contained access tokens, issued as JWTs following the profile of
+`RFC 9068 <https://rfc-editor.org/rfc/rfc9068.html>`_.
+
+When ``ACCESS_TOKEN_JWT_ENABLED`` is set, access tokens are signed with
+``ACCESS_TOKEN_JWT_PRIVATE_KEY`` and carry their own client_id, scope, subject
+and expiry, so that their signature and lifetime can be checked without a
+database query. The AccessToken row only stores the ``jti`` claim, which is
+used to check that the token has not been revoked; with the revocation filter
+of ``oauth2_provider.revocation``, the row is only read when the filter may
+contain the ``jti``.
+"""
+
+import base64
+import calendar
+import functools
+import json
+import re
+import time
+import uuid
+from datetime import datetime
+from datetime import timezone as dt_timezone
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from jwcrypto import jwt
+from jwcrypto.common import JWException
+
+from .cache import get_application
+from .settings import ACCESS_TOKEN_MODEL, APPLICATION_MODEL, oauth2_settings
+from .utils import jwk_from_pem
+
+
+ACCESS_TOKEN_JWT_TYPE = "at+jwt"
+
+# The jti claims of our JWT access tokens are random UUIDs in hex.
+JTI_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+
+def jwt_access_tokens_enabled():
+    return oauth2_settings.ACCESS_TOKEN_JWT_ENABLED
+
+
+def looks_like_jwt(token):
+    return token.count(".") == 2
+
+
+def looks_like_jti(value):
+    return JTI_PATTERN.fullmatch(value) is not None
+
+
+def get_signing_algorithm(key):
+    """
+    Return the JWS algorithm used with the given key: RS256 for RSA keys and
+    ES256 for P-256 elliptic curve keys.
+    """
+    public_key = json.loads(key.export_public())
+    if public_key["kty"] == "RSA":
+        return "RS256"
+    if public_key["kty"] == "EC" and public_key.get("crv") == "P-256":
+        return "ES256"
+    raise ImproperlyConfigured("JWT access tokens must be signed with an RSA or a P-256 EC key")
+
+
+def _get_private_key_pems():
+    active = oauth2_settings.ACCESS_TOKEN_JWT_PRIVATE_KEY or oauth2_settings.OIDC_RSA_PRIVATE_KEY
+    if not active:
+        raise ImproperlyConfigured(
+            "ACCESS_TOKEN_JWT_ENABLED requires ACCESS_TOKEN_JWT_PRIVATE_KEY or OIDC_RSA_PRIVATE_KEY"
+        )
+    return (active, *oauth2_settings.ACCESS_TOKEN_JWT_PRIVATE_KEYS_INACTIVE)
+
+
+@functools.lru_cache()
+def _load_keys(pems):
+    keys = {}
+    for pem in pems:
+        key = jwk_from_pem(pem)
+        keys[key.thumbprint()] = (key, get_signing_algorithm(key))
+    return keys
+
+
+def get_verification_keys():
+    """
+    Return the keys access tokens may have been signed with, as a dict mapping
+    each kid to a ``(key, algorithm)`` pair. The active key comes first.
+    """
+    return _load_keys(_get_private_key_pems())
+
+
+def encode_access_token(claims):
+    kid, (key, algorithm) = next(iter(get_verification_keys().items()))
+    header = {"typ": ACCESS_TOKEN_JWT_TYPE, "alg": algorithm, "kid": kid}
+    token = jwt.JWT(header=header, claims=claims)
+    token.make_signed_token(key)
+    return token.serialize()
+
+
+def _decode_header(token):
+    header = token.split(".", 1)[0]
+    return json.loads(base64.urlsafe_b64decode(header + "=" * (-len(header) % 4)))
+
+
+def decode_access_token(token, check_expiry=True):
+    """
+    Verify a JWT access token and return its claims.
+
+    None is returned if the token was not issued by us, its signature does not
+    match, or it has expired (unless ``check_expiry`` is False).
+    """
+    if not looks_like_jwt(token):
+        return None
+    try:
+        header = _decode_header(token)
+        # Reject other JWTs signed with the same keys, such as ID tokens.
+        if header["typ"] != ACCESS_TOKEN_JWT_TYPE:
+            return None
+        key, algorithm = get_verification_keys().get(header["kid"], (None, None))
+        if key is None or header["alg"] != algorithm:
+            return None
+        check_claims = {"exp": None} if check_expiry else {}
+        claims = json.loads(jwt.JWT(key=key, jwt=token, check_claims=check_claims).claims)
+    except (JWException, ValueError, KeyError, TypeError):
+        return None
+    if not isinstance(claims, dict) or "jti" not in claims:
+        return None
+    return claims
+
+
+def get_access_token_key(token):
+    """
+    Return the value stored in ``AccessToken.token`` for the given token string:
+    the ``jti`` claim of our JWT access tokens, the token itself otherwise.
+    """
+    if jwt_access_tokens_enabled():
+        claims = decode_access_token(token, check_expiry=False)
+        if claims is not None:
+            return claims["jti"]
+    return token
+
+
+def access_token_from_claims(claims):
+    """
+    Return an unsaved AccessToken built from the claims of a verified JWT access
+    token, or None if its application no longer exists.
+
+    The application is loaded through the application caches, the user is left
+    to be loaded on first use.
+    """
+    application_model = apps.get_model(APPLICATION_MODEL)
+    try:
+        application = get_application(client_id=claims["client_id"])
+    except application_model.DoesNotExist:
+        return None
+    user_id = None
+    if claims["sub"] != claims["client_id"]:
+        user_id = get_user_model()._meta.pk.to_python(claims["sub"])
+    expires = datetime.fromtimestamp(claims["exp"], tz=dt_timezone.utc)
+    if not settings.USE_TZ:
+        expires = timezone.make_naive(expires)
+    return apps.get_model(ACCESS_TOKEN_MODEL)(
+        token=claims["jti"],
+        application=application,
+        user_id=user_id,
+        scope=claims["scope"],
+        expires=expires,
+    )
+
+
+def _make_claims(jti, client_id, user, scope, issued_at, expires_at):
+    return {
+        "jti": jti,
+        "sub": str(user.pk) if user is not None else client_id,
+        "client_id": client_id,
+        "scope": scope,
+        "iat": issued_at,
+        "exp": expires_at,
+    }
+
+
+def generate_jwt_access_token(request):
+    """
+    Token generator used in place of ``ACCESS_TOKEN_GENERATOR`` when
+    ``ACCESS_TOKEN_JWT_ENABLED`` is set.
+    """
+    now = int(time.time())
+    user = getattr(request, "user", None) if request.grant_type != "client_credentials" else None
+    return encode_access_token(
+        _make_claims(
+            uuid.uuid4().hex,
+            request.client.client_id,
+            user,
+            " ".join(request.scopes or []),
+            now,
+            now + int(request.expires_in),
+        )
+    )
+
+
+def encode_access_token_instance(access_token):
+    """
+    Return the JWT for an AccessToken row stored by JWT access token mode.
+    """
+    return encode_access_token(
+        _make_claims(
+            access_token.token,
+            access_token.application.client_id,
+            access_token.user,
+            access_token.scope,
+            int(calendar.timegm(access_token.created.timetuple())),
+            int(calendar.timegm(access_token.expires.timetuple())),
+        )
+    )
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from oauth2_provider.models import (
+    get_access_token_model,
+    get_grant_model,
+    get_refresh_token_model,
+    token_checksum,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compute the missing checksums of access tokens, refresh tokens and authorization codes. "
+        "Rows that already have a checksum are left alone, so the command can be run again at any time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="The number of rows loaded and updated at once",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        if batch_size < 1:
+            raise CommandError("--batch-size must be positive")
+
+        for model, source_field, checksum_field in [
+            (get_access_token_model(), "token", "token_checksum"),
+            (get_refresh_token_model(), "token", "token_checksum"),
+            (get_grant_model(), "code", "code_checksum"),
+        ]:
+            filled = self._backfill(model, source_field, checksum_field, batch_size)
+            self.stdout.write(
+                self.style.SUCCESS("Filled %d %s checksums." % (filled, model._meta.verbose_name))
+            )
+
+    def _backfill(self, model, source_field, checksum_field, batch_size):
+        queryset = model.objects.filter(**{checksum_field + "__isnull": True}).order_by("pk")
+        filled = 0
+        last_pk = None
+        while True:
+            batch = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+            batch = list(batch.only("pk", source_field)[:batch_size])
+            if not batch:
+                return filled
+            last_pk = batch[-1].pk
+            for instance in batch:
+                setattr(instance, checksum_field, token_checksum(getattr(instance, source_field)))
+            with transaction.atomic():
+                model.objects.bulk_update(batch, [checksum_field])
+            filled += len(batch)
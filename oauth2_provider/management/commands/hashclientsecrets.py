@@ -0,0 +1,135 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from oauth2_provider.cache import invalidate_application_cache
+from oauth2_provider.hashers import (
+    encode_client_secret,
+    get_client_secret_hasher,
+    identify_client_secret_hasher,
+)
+from oauth2_provider.models import get_application_model
+
+
+Application = get_application_model()
+
+
+def is_hashed(secret):
+    try:
+        identify_client_secret_hasher(secret)
+    except ValueError:
+        return False
+    return True
+
+
+class Command(BaseCommand):
+    help = (
+        "Hash the client secrets stored in clear of applications with hash_client_secret set. "
+        "Hashed secrets cannot be hashed again offline: they are upgraded to a new hasher "
+        "or new hasher parameters when clients authenticate."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="The number of applications loaded and updated at once",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="The number of processes hashing secrets, 1 to hash them in this process",
+        )
+        parser.add_argument(
+            "--start-after",
+            type=str,
+            default=None,
+            help="Resume after the application with this primary key, as reported by a previous run",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report the secrets that would be hashed",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        workers = options["workers"]
+        if batch_size < 1 or workers < 1:
+            raise CommandError("--batch-size and --workers must be positive")
+
+        queryset = Application.objects.filter(hash_client_secret=True).order_by("pk")
+        if options["start_after"] is not None:
+            queryset = queryset.filter(pk__gt=options["start_after"])
+        total = queryset.count()
+        hasher = get_client_secret_hasher()
+
+        executor = (
+            ProcessPoolExecutor(max_workers=workers) if workers > 1 and not options["dry_run"] else None
+        )
+        processed = hashed = 0
+        try:
+            last_pk = options["start_after"]
+            while True:
+                batch = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+                batch = list(batch.values_list("pk", "client_secret")[:batch_size])
+                if not batch:
+                    break
+                last_pk = batch[-1][0]
+                processed += len(batch)
+
+                cleartext = [(pk, secret) for pk, secret in batch if not is_hashed(secret)]
+                if cleartext and not options["dry_run"]:
+                    secrets = [secret for _pk, secret in cleartext]
+                    if executor is not None:
+                        chunksize = max(1, len(secrets) // (workers * 4))
+                        encoded = executor.map(
+                            encode_client_secret, repeat(hasher), secrets, chunksize=chunksize
+                        )
+                    else:
+                        encoded = map(encode_client_secret, repeat(hasher), secrets)
+                    hashed += self._update(
+                        {pk: (secret, new_secret) for (pk, secret), new_secret in zip(cleartext, encoded)}
+                    )
+                else:
+                    hashed += len(cleartext)
+
+                self.stdout.write(
+                    "Processed %d/%d applications, %s %d secrets (last pk: %s)"
+                    % (processed, total, "would hash" if options["dry_run"] else "hashed", hashed, last_pk)
+                )
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                "%s %d client secrets with %s."
+                % ("Would hash" if options["dry_run"] else "Hashed", hashed, hasher.algorithm)
+            )
+        )
+
+    def _update(self, secrets):
+        """
+        Store the new hashes of the given `{pk: (cleartext, hashed)}` secrets, skipping
+        the applications whose secret was changed while they were hashed.
+        """
+        with transaction.atomic():
+            current = dict(
+                Application.objects.select_for_update()
+                .filter(pk__in=secrets)
+                .values_list("pk", "client_secret")
+            )
+            applications = [
+                Application(pk=pk, client_secret=new_secret)
+                for pk, (secret, new_secret) in secrets.items()
+                if current.get(pk) == secret
+            ]
+            Application.objects.bulk_update(applications, ["client_secret"])
+        invalidate_application_cache()
+        return len(applications)
@@ -3,7 +3,7 @@ import logging
 from django.contrib.auth import authenticate
 from django.utils.cache import patch_vary_headers
 
-from oauth2_provider.models import AccessToken
+from oauth2_provider.oauth2_backends import get_oauthlib_core
 
 
 log = logging.getLogger(__name__)
@@ -52,11 +52,15 @@ class OAuth2ExtraTokenMiddleware:
     def __call__(self, request):
         authheader = request.META.get("HTTP_AUTHORIZATION", "")
         if authheader.startswith("Bearer"):
-            tokenstring = authheader.split()[1]
             try:
-                token = AccessToken.objects.get(token=tokenstring)
-                request.access_token = token
-            except AccessToken.DoesNotExist as e:
-                log.exception(e)
+                valid, r = get_oauthlib_core().verify_request(request, scopes=[])
+            except ValueError as error:
+                log.debug("Cannot verify the bearer token: %s", error)
+            else:
+                # Expired tokens or tokens without the scopes are set as well.
+                if r.access_token is not None:
+                    request.access_token = r.access_token
+                if not valid:
+                    log.debug("Invalid bearer token: %s", getattr(r, "oauth2_error", {}))
         response = self.get_response(request)
         return response
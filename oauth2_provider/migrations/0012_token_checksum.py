@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:00
+
+from django.db import migrations
+
+import oauth2_provider.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("oauth2_provider", "0011_revokedaccesstoken"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="accesstoken",
+            name="token_checksum",
+            field=oauth2_provider.models.TokenChecksumField(
+                blank=True, editable=False, max_length=64, null=True, unique=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="grant",
+            name="code_checksum",
+            field=oauth2_provider.models.TokenChecksumField(
+                blank=True, editable=False, max_length=64, null=True, source_field="code", unique=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="refreshtoken",
+            name="token_checksum",
+            field=oauth2_provider.models.TokenChecksumField(
+                blank=True, db_index=True, editable=False, max_length=64, null=True
+            ),
+        ),
+    ]
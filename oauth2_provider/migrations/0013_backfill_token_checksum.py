@@ -0,0 +1,47 @@
+import hashlib
+
+from django.db import migrations, transaction
+
+
+BATCH_SIZE = 1000
+
+
+def backfill_checksums(apps, schema_editor):
+    """
+    Compute the checksum of existing tokens and codes, in small transactions so
+    that the tables stay writable. Rows that already have a checksum are
+    skipped, so that an interrupted run can simply be started again.
+    """
+    for model_name, source_field, checksum_field in [
+        ("AccessToken", "token", "token_checksum"),
+        ("RefreshToken", "token", "token_checksum"),
+        ("Grant", "code", "code_checksum"),
+    ]:
+        model = apps.get_model("oauth2_provider", model_name)
+        if model._meta.swapped:
+            continue
+        manager = model._default_manager.db_manager(schema_editor.connection.alias)
+        queryset = manager.filter(**{checksum_field + "__isnull": True}).order_by("pk")
+        last_pk = 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk).only("pk", source_field)[:BATCH_SIZE])
+            if not batch:
+                break
+            for instance in batch:
+                value = getattr(instance, source_field)
+                setattr(instance, checksum_field, hashlib.sha256(value.encode("utf-8")).hexdigest())
+            with transaction.atomic(using=schema_editor.connection.alias):
+                manager.bulk_update(batch, [checksum_field])
+            last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("oauth2_provider", "0012_token_checksum"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_checksums, migrations.RunPython.noop),
+    ]
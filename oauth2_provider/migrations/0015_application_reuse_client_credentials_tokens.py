@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 04:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("oauth2_provider", "0014_refreshtoken_previous_token_checksum"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="application",
+            name="reuse_client_credentials_tokens",
+            field=models.BooleanField(default=False),
+        ),
+    ]
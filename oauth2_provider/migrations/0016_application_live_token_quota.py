@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 04:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("oauth2_provider", "0015_application_reuse_client_credentials_tokens"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="application",
+            name="live_token_quota",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
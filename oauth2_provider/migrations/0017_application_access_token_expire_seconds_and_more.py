@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-17 04:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("oauth2_provider", "0016_application_live_token_quota"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="application",
+            name="access_token_expire_seconds",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="application",
+            name="id_token_expire_seconds",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="application",
+            name="refresh_token_expire_seconds",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -1,4 +1,8 @@
+import functools
+import hashlib
 import logging
+import operator
+import random
 import time
 import uuid
 from datetime import timedelta
@@ -6,7 +10,6 @@ from urllib.parse import parse_qsl, urlparse
 
 from django.apps import apps
 from django.conf import settings
-from django.contrib.auth.hashers import identify_hasher, make_password
 from django.core.exceptions import ImproperlyConfigured
 from django.db import models, transaction
 from django.urls import reverse
@@ -17,6 +20,8 @@ from jwcrypto.common import base64url_encode
 from oauthlib.oauth2.rfc6749 import errors
 
 from .generators import generate_client_id, generate_client_secret
+from .hashers import identify_client_secret_hasher, make_client_secret
+from .revocation import record_revoked_access_tokens
 from .scopes import get_scopes_backend
 from .settings import oauth2_settings
 from .utils import jwk_from_pem
@@ -34,16 +39,46 @@ class ClientSecretField(models.CharField):
             return super().pre_save(model_instance, add)
 
         try:
-            hasher = identify_hasher(secret)
+            hasher = identify_client_secret_hasher(secret)
             logger.debug(f"{model_instance}: {self.attname} is already hashed with {hasher}.")
         except ValueError:
             logger.debug(f"{model_instance}: {self.attname} is not hashed; hashing it now.")
-            hashed_secret = make_password(secret)
+            hashed_secret = make_client_secret(secret)
             setattr(model_instance, self.attname, hashed_secret)
             return hashed_secret
         return super().pre_save(model_instance, add)
 
 
+class TokenChecksumField(models.CharField):
+    """
+    Stores the SHA-256 hex digest of another field of the instance, so that
+    tokens can be looked up on a short fixed-width index.
+
+    The index on the source field is kept: it serves lookups while
+    ``TOKEN_CHECKSUM_LOOKUP`` is disabled.
+    """
+
+    def __init__(self, *args, source_field="token", **kwargs):
+        self.source_field = source_field
+        kwargs.setdefault("max_length", 64)
+        kwargs.setdefault("blank", True)
+        kwargs.setdefault("null", True)
+        kwargs.setdefault("editable", False)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.source_field != "token":
+            kwargs["source_field"] = self.source_field
+        return name, path, args, kwargs
+
+    def pre_save(self, model_instance, add):
+        value = getattr(model_instance, self.source_field)
+        checksum = token_checksum(value) if value else None
+        setattr(model_instance, self.attname, checksum)
+        return checksum
+
+
 class AbstractApplication(models.Model):
     """
     An Application instance represents a Client on the Authorization server.
@@ -66,6 +101,17 @@ class AbstractApplication(models.Model):
     * :attr:`client_secret` Confidential secret issued to the client during
                             the registration process as described in :rfc:`2.2`
     * :attr:`name` Friendly name for the Application
+    * :attr:`reuse_client_credentials_tokens` Return the unexpired token already
+                                              issued for the same scopes to
+                                              client credentials requests
+    * :attr:`live_token_quota` Maximum number of live access tokens of each user
+                               with the Application
+    * :attr:`access_token_expire_seconds` Lifetime of the access tokens, overriding
+                                          ``ACCESS_TOKEN_EXPIRE_SECONDS``
+    * :attr:`refresh_token_expire_seconds` Lifetime of the refresh tokens, overriding
+                                           ``REFRESH_TOKEN_EXPIRE_SECONDS``
+    * :attr:`id_token_expire_seconds` Lifetime of the ID tokens, overriding
+                                      ``ID_TOKEN_EXPIRE_SECONDS``
     """
 
     CLIENT_CONFIDENTIAL = "confidential"
@@ -128,6 +174,11 @@ class AbstractApplication(models.Model):
     hash_client_secret = models.BooleanField(default=True)
     name = models.CharField(max_length=255, blank=True)
     skip_authorization = models.BooleanField(default=False)
+    reuse_client_credentials_tokens = models.BooleanField(default=False)
+    live_token_quota = models.PositiveIntegerField(null=True, blank=True)
+    access_token_expire_seconds = models.PositiveIntegerField(null=True, blank=True)
+    refresh_token_expire_seconds = models.PositiveIntegerField(null=True, blank=True)
+    id_token_expire_seconds = models.PositiveIntegerField(null=True, blank=True)
 
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
@@ -290,6 +341,7 @@ class AbstractGrant(models.Model):
 
     * :attr:`user` The Django user who requested the grant
     * :attr:`code` The authorization code generated by the authorization server
+    * :attr:`code_checksum` SHA-256 digest of the code
     * :attr:`application` Application instance this grant was asked for
     * :attr:`expires` Expire time in seconds, defaults to
                       :data:`settings.AUTHORIZATION_CODE_EXPIRE_SECONDS`
@@ -308,6 +360,7 @@ class AbstractGrant(models.Model):
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="%(app_label)s_%(class)s"
     )
     code = models.CharField(max_length=255, unique=True)  # code comes from oauthlib
+    code_checksum = TokenChecksumField(source_field="code", unique=True)
     application = models.ForeignKey(oauth2_settings.APPLICATION_MODEL, on_delete=models.CASCADE)
     expires = models.DateTimeField()
     redirect_uri = models.TextField()
@@ -358,6 +411,7 @@ class AbstractAccessToken(models.Model):
     * :attr:`user` The Django user representing resources" owner
     * :attr:`source_refresh_token` If from a refresh, the consumed RefeshToken
     * :attr:`token` Access token
+    * :attr:`token_checksum` SHA-256 digest of the token
     * :attr:`application` Application instance
     * :attr:`expires` Date and time of token expiration, in DateTime format
     * :attr:`scope` Allowed scopes
@@ -384,6 +438,7 @@ class AbstractAccessToken(models.Model):
         unique=True,
         db_index=True,
     )
+    token_checksum = TokenChecksumField(unique=True)
     id_token = models.OneToOneField(
         oauth2_settings.ID_TOKEN_MODEL,
         on_delete=models.CASCADE,
@@ -439,6 +494,7 @@ class AbstractAccessToken(models.Model):
         Convenience method to uniform tokens" interface, for now
         simply remove this token from the database in order to revoke it.
         """
+        record_revoked_access_tokens(self)
         self.delete()
 
     @property
@@ -471,6 +527,9 @@ class AbstractRefreshToken(models.Model):
 
     * :attr:`user` The Django user representing resources" owner
     * :attr:`token` Token value
+    * :attr:`token_checksum` SHA-256 digest of the token
+    * :attr:`previous_token_checksum` SHA-256 digest of the token this one
+                                      replaced, when rotated in place
     * :attr:`application` Application instance
     * :attr:`access_token` AccessToken instance this refresh token is
                            bounded to
@@ -482,6 +541,10 @@ class AbstractRefreshToken(models.Model):
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="%(app_label)s_%(class)s"
     )
     token = models.CharField(max_length=255)
+    token_checksum = TokenChecksumField(db_index=True)
+    previous_token_checksum = models.CharField(
+        max_length=64, blank=True, null=True, db_index=True, editable=False
+    )
     application = models.ForeignKey(oauth2_settings.APPLICATION_MODEL, on_delete=models.CASCADE)
     access_token = models.OneToOneField(
         oauth2_settings.ACCESS_TOKEN_MODEL,
@@ -627,6 +690,26 @@ class IDToken(AbstractIDToken):
         swappable = "OAUTH2_PROVIDER_ID_TOKEN_MODEL"
 
 
+class RevokedAccessToken(models.Model):
+    """
+    A RevokedAccessToken instance records the revocation of a JWT access token,
+    so that every process can reject it until it expires.
+
+    Fields:
+
+    * :attr:`jti` The jti claim of the revoked token
+    * :attr:`expires` Date and time of token expiration, in DateTime format
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    jti = models.CharField(max_length=255, unique=True)
+    expires = models.DateTimeField(db_index=True)
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return self.jti
+
+
 def get_application_model():
     """Return the Application model that is active in this project."""
     return apps.get_model(oauth2_settings.APPLICATION_MODEL)
@@ -682,6 +765,47 @@ def get_refresh_token_admin_class():
     return refresh_token_admin_class
 
 
+def token_checksum(value):
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def token_lookup(value, field_name="token"):
+    """
+    Return the filter arguments matching the given token string: on its
+    checksum if ``TOKEN_CHECKSUM_LOOKUP`` is enabled, on the token itself otherwise.
+    """
+    if oauth2_settings.TOKEN_CHECKSUM_LOOKUP:
+        return {field_name + "_checksum": token_checksum(value)}
+    return {field_name: value}
+
+
+def access_token_expires_in(request):
+    """
+    The ``token_expires_in`` callable given to oauthlib: the ``access_token_expire_seconds``
+    of the request's application if set, ``ACCESS_TOKEN_EXPIRE_SECONDS`` otherwise, shortened
+    by ``ACCESS_TOKEN_EXPIRE_JITTER``. oauthlib calls it before generating the token, so the
+    ``exp`` claim of JWT access tokens matches ``expires_in``.
+    """
+    expires_in = getattr(request.client, "access_token_expire_seconds", None)
+    if not expires_in:
+        expires_in = oauth2_settings.ACCESS_TOKEN_EXPIRE_SECONDS
+        if callable(expires_in):
+            expires_in = expires_in(request)
+    return _jitter_expires_in(expires_in)
+
+
+def _jitter_expires_in(expires_in):
+    """
+    Return the lifetime of a new access token, shortened by a random fraction of
+    at most ``ACCESS_TOKEN_EXPIRE_JITTER``, so that clients issued tokens at the
+    same time do not all come back to refresh them at the same time.
+    """
+    jitter = oauth2_settings.ACCESS_TOKEN_EXPIRE_JITTER
+    if not jitter or not expires_in:
+        return expires_in
+    return expires_in - int(expires_in * jitter * random.random())
+
+
 def clear_expired():
     def batch_delete(queryset, query):
         CLEAR_EXPIRED_TOKENS_BATCH_SIZE = oauth2_settings.CLEAR_EXPIRED_TOKENS_BATCH_SIZE
@@ -690,8 +814,9 @@ def clear_expired():
 
         while current_no:
             flat_queryset = queryset.values_list("id", flat=True)[:CLEAR_EXPIRED_TOKENS_BATCH_SIZE]
-            batch_length = flat_queryset.count()
-            queryset.model.objects.filter(id__in=list(flat_queryset)).delete()
+            batch_ids = list(flat_queryset)
+            batch_length = len(batch_ids)
+            queryset.model.objects.filter(id__in=batch_ids).delete()
             logger.debug(f"{batch_length} tokens deleted, {current_no-batch_length} left")
             queryset = queryset.model.objects.filter(query)
             time.sleep(CLEAR_EXPIRED_TOKENS_BATCH_INTERVAL)
@@ -718,14 +843,46 @@ def clear_expired():
                 raise ImproperlyConfigured(e)
         refresh_expire_at = now - REFRESH_TOKEN_EXPIRE_SECONDS
 
+    # The refresh tokens of applications with a refresh_token_expire_seconds expire after it.
+    refresh_expire_ats = []
     if refresh_expire_at:
-        revoked_query = models.Q(revoked__lt=refresh_expire_at)
+        refresh_expire_ats.append(
+            (models.Q(application__refresh_token_expire_seconds__isnull=True), refresh_expire_at)
+        )
+    application_expire_seconds = (
+        get_application_model()
+        .objects.filter(refresh_token_expire_seconds__isnull=False)
+        .values_list("refresh_token_expire_seconds", flat=True)
+        .distinct()
+    )
+    for expire_seconds in application_expire_seconds:
+        refresh_expire_ats.append(
+            (
+                models.Q(application__refresh_token_expire_seconds=expire_seconds),
+                now - timedelta(seconds=expire_seconds),
+            )
+        )
+
+    if refresh_expire_ats:
+        revoked_query = functools.reduce(
+            operator.or_,
+            [
+                applications & models.Q(revoked__lt=expire_at)
+                for applications, expire_at in refresh_expire_ats
+            ],
+        )
         revoked = refresh_token_model.objects.filter(revoked_query)
 
         revoked_deleted_no = batch_delete(revoked, revoked_query)
         logger.info("%s Revoked refresh tokens deleted", revoked_deleted_no)
 
-        expired_query = models.Q(access_token__expires__lt=refresh_expire_at)
+        expired_query = functools.reduce(
+            operator.or_,
+            [
+                applications & models.Q(access_token__expires__lt=expire_at)
+                for applications, expire_at in refresh_expire_ats
+            ],
+        )
         expired = refresh_token_model.objects.filter(expired_query)
 
         expired_deleted_no = batch_delete(expired, expired_query)
@@ -751,6 +908,12 @@ def clear_expired():
     grants_deleted_no = batch_delete(grants, grants_query)
     logger.info("%s Expired grant tokens deleted", grants_deleted_no)
 
+    revoked_query = models.Q(expires__lt=now)
+    revoked = RevokedAccessToken.objects.filter(revoked_query)
+
+    revoked_deleted_no = batch_delete(revoked, revoked_query)
+    logger.info("%s Expired access token revocations deleted", revoked_deleted_no)
+
 
 def redirect_to_uri_allowed(uri, allowed_uris):
     """
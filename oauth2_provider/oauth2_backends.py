@@ -1,11 +1,14 @@
 import json
 from urllib.parse import urlparse, urlunparse
 
+from django.core.signals import setting_changed
 from oauthlib import oauth2
+from oauthlib.common import INVALID_HEX_PATTERN
 from oauthlib.common import Request as OauthlibRequest
 from oauthlib.common import quote, urlencode, urlencoded
-from oauthlib.oauth2 import OAuth2Error
+from oauthlib.oauth2 import BearerToken, OAuth2Error
 
+from .cache import release_refresh_token_claims
 from .exceptions import FatalClientError, OAuthToolkitError
 from .settings import oauth2_settings
 
@@ -165,6 +168,9 @@ class OAuthLibCore:
             return uri, headers, body, status
         except OAuth2Error as exc:
             return None, exc.headers, exc.json, exc.status_code
+        finally:
+            # A refresh failing at any step must not keep its duplicates waiting.
+            release_refresh_token_claims()
 
     def create_revocation_response(self, request):
         """
@@ -199,14 +205,88 @@ class OAuthLibCore:
         """
         A wrapper method that calls verify_request on `server_class` instance.
 
+        The token is validated once per request: the outcome is stored on the
+        Django request, so that the middleware, DRF authentication and views
+        that verify the same request reuse it and only check their own scopes.
+
+        With ``BEARER_TOKEN_FAST_PATH``, servers that only handle bearer tokens
+        validate them without building the full oauthlib request, see
+        ``_verify_bearer_request``.
+
         :param request: The current django.http.HttpRequest object
         :param scopes: A list of scopes required to verify so that request is verified
         """
-        uri, http_method, body, headers = self._extract_params(request)
-
-        valid, r = self.server.verify_request(uri, http_method, body, headers, scopes=scopes)
+        # DRF wraps the Django request, keep the outcome on the wrapped one.
+        http_request = getattr(request, "_request", request)
+        # Cores built from the same classes verify tokens the same way, as for
+        # the cores shared by get_oauthlib_core().
+        key = (
+            type(self),
+            type(self.server),
+            type(self.server.request_validator),
+            request.META.get("HTTP_AUTHORIZATION"),
+        )
+        verified = getattr(http_request, "_oauth2_verified_request", None)
+        if verified is None or verified[0] != key:
+            if self._is_bearer_only():
+                valid, r = self._verify_bearer_request(request)
+            else:
+                uri, http_method, body, headers = self._extract_params(request)
+                valid, r = self.server.verify_request(uri, http_method, body, headers, scopes=[])
+            verified = (key, valid, r)
+            http_request._oauth2_verified_request = verified
+
+        _key, valid, r = verified
+        if valid and scopes and not r.access_token.is_valid(scopes):
+            # Let the validator report the missing scopes, or find them through
+            # introspection if it is configured.
+            uri, http_method, body, headers = self._extract_params(request)
+            valid, r = self.server.verify_request(uri, http_method, body, headers, scopes=scopes)
         return valid, r
 
+    def _is_bearer_only(self):
+        if not oauth2_settings.BEARER_TOKEN_FAST_PATH:
+            return False
+        tokens = getattr(self.server, "tokens", None)
+        return (
+            tokens is not None
+            and list(tokens) == ["Bearer"]
+            and type(tokens["Bearer"]) is BearerToken
+            and self.server.available
+            and not self.server.catch_errors
+        )
+
+    def _verify_bearer_request(self, request):
+        """
+        Validate the bearer token of the request like oauthlib's resource
+        endpoint does, without extracting the whole request for it: the token
+        is read from the Authorization header, or else from the access_token
+        query or form parameter, and the oauthlib request only carries the path,
+        method and Authorization header.
+
+        Validators relying on the other headers, the query string, the body or
+        the full URI of the request must not be used with this path.
+
+        :param request: The current django.http.HttpRequest object
+        """
+        if INVALID_HEX_PATTERN.search(request.META.get("QUERY_STRING", "")):
+            raise ValueError("Invalid hex encoding in query string.")
+
+        authorization = request.META.get("HTTP_AUTHORIZATION")
+        headers = {"Authorization": authorization} if authorization is not None else None
+        r = OauthlibRequest(request.path, http_method=request.method, headers=headers)
+        r.token_type = "Bearer"
+        r.scopes = []
+
+        split_header = authorization.split() if authorization else []
+        if len(split_header) == 2 and split_header[0].lower() == "bearer":
+            token = split_header[1]
+        else:
+            token = request.GET.get("access_token") or dict(self.extract_body(request)).get("access_token")
+
+        validator = self.server.tokens["Bearer"].request_validator
+        return validator.validate_bearer_token(token, r.scopes, r), r
+
     def authenticate_client(self, request):
         """Wrapper to call  `authenticate_client` on `server_class` instance.
 
@@ -238,13 +318,37 @@ class JSONOAuthLibCore(OAuthLibCore):
         return body
 
 
-def get_oauthlib_core():
+_oauthlib_cores = {}
+
+
+def get_oauthlib_core(server_class=None, validator_class=None, backend_class=None):
     """
     Utility function that returns an instance of
     `oauth2_provider.backends.OAuthLibCore`
+
+    Instances are shared by the whole process, one for each combination of
+    server, validator and backend classes, which default to OAUTH2_SERVER_CLASS,
+    OAUTH2_VALIDATOR_CLASS and OAUTH2_BACKEND_CLASS. A new instance is built on
+    every call if ALWAYS_RELOAD_OAUTHLIB_CORE is True, and the shared ones are
+    dropped when the OAUTH2_PROVIDER setting changes.
     """
-    validator_class = oauth2_settings.OAUTH2_VALIDATOR_CLASS
-    validator = validator_class()
-    server_kwargs = oauth2_settings.server_kwargs
-    server = oauth2_settings.OAUTH2_SERVER_CLASS(validator, **server_kwargs)
-    return oauth2_settings.OAUTH2_BACKEND_CLASS(server)
+    server_class = server_class or oauth2_settings.OAUTH2_SERVER_CLASS
+    validator_class = validator_class or oauth2_settings.OAUTH2_VALIDATOR_CLASS
+    backend_class = backend_class or oauth2_settings.OAUTH2_BACKEND_CLASS
+    key = (server_class, validator_class, backend_class)
+
+    core = None if oauth2_settings.ALWAYS_RELOAD_OAUTHLIB_CORE else _oauthlib_cores.get(key)
+    if core is None:
+        server = server_class(validator_class(), **oauth2_settings.server_kwargs)
+        core = backend_class(server)
+        if not oauth2_settings.ALWAYS_RELOAD_OAUTHLIB_CORE:
+            core = _oauthlib_cores.setdefault(key, core)
+    return core
+
+
+def clear_oauthlib_cores(*args, **kwargs):
+    if kwargs.get("setting") == "OAUTH2_PROVIDER":
+        _oauthlib_cores.clear()
+
+
+setting_changed.connect(clear_oauthlib_cores)
@@ -1,5 +1,6 @@
 import base64
 import binascii
+import functools
 import http.client
 import inspect
 import json
@@ -12,7 +13,7 @@ from urllib.parse import unquote_plus
 import requests
 from django.conf import settings
 from django.contrib.auth import authenticate, get_user_model
-from django.contrib.auth.hashers import check_password, identify_hasher
+from django.contrib.auth.models import AnonymousUser
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import transaction
 from django.db.models import Q
@@ -24,10 +25,47 @@ from django.utils.translation import gettext_lazy as _
 from jwcrypto import jws, jwt
 from jwcrypto.common import JWException
 from jwcrypto.jwt import JWTExpired
-from oauthlib.oauth2.rfc6749 import utils
+from oauthlib.oauth2.rfc6749 import errors, utils
 from oauthlib.openid import RequestValidator
 
+from .cache import (
+    NOT_CACHED,
+    cache_access_token,
+    cache_grant,
+    cache_missing_access_token,
+    cache_refresh_token_result,
+    cache_verified_client_secret,
+    claim_refresh_token,
+    consume_cached_grant,
+    count_issued_token,
+    get_application,
+    get_applications,
+    get_cached_access_token,
+    get_cached_grant,
+    get_grant_cache,
+    get_live_token_count,
+    get_refresh_token_result_cache,
+    invalidate_access_token,
+    invalidate_application_cache,
+    is_client_secret_verified,
+    release_refresh_token,
+    set_live_token_count,
+)
 from .exceptions import FatalClientError
+from .hashers import (
+    check_client_secret,
+    client_secret_must_update,
+    identify_client_secret_hasher,
+    make_client_secret,
+)
+from .jwt_tokens import (
+    access_token_from_claims,
+    decode_access_token,
+    encode_access_token_instance,
+    get_access_token_key,
+    jwt_access_tokens_enabled,
+    looks_like_jwt,
+)
 from .models import (
     AbstractApplication,
     get_access_token_model,
@@ -35,9 +73,28 @@ from .models import (
     get_grant_model,
     get_id_token_model,
     get_refresh_token_model,
+    token_checksum,
+    token_lookup,
 )
+from .revocation import get_revocation_list, record_revoked_access_tokens, revocation_filter_enabled
 from .scopes import get_scopes_backend
+from .sealed_codes import (
+    is_sealed_code_redeemed,
+    looks_like_sealed_code,
+    redeem_sealed_code,
+    seal_grant,
+    sealed_authorization_codes_enabled,
+    unseal_grant,
+)
 from .settings import oauth2_settings
+from .structured_tokens import (
+    ACCESS_TOKEN,
+    MALFORMED_TOKEN,
+    REFRESH_TOKEN,
+    get_token_type,
+    is_malformed_access_token,
+)
+from .utils import LazyUser
 
 
 log = logging.getLogger("oauth2_provider")
@@ -117,13 +174,39 @@ class OAuth2Validator(RequestValidator):
         """
         Checks whether the provided client secret is valid.
 
-        Supports both hashed and unhashed secrets.
+        Supports both hashed and unhashed secrets. Successful checks of hashed
+        secrets are remembered if CLIENT_SECRET_CACHE_ALIAS is set.
         """
         try:
-            identify_hasher(stored_secret)
-            return check_password(provided_secret, stored_secret)
+            identify_client_secret_hasher(stored_secret)
         except ValueError:  # Raised if the stored_secret is not hashed.
             return constant_time_compare(provided_secret, stored_secret)
+        if is_client_secret_verified(provided_secret, stored_secret):
+            return True
+        valid = check_client_secret(provided_secret, stored_secret)
+        if valid:
+            cache_verified_client_secret(provided_secret, stored_secret)
+        return valid
+
+    def _update_client_secret_hash(self, client, provided_secret):
+        """
+        Hash the client secret again with the current hasher if it was hashed with
+        another one, once the provided secret has been found to be valid.
+        """
+        stored_secret = client.client_secret
+        if not getattr(client, "hash_client_secret", True):
+            return
+        try:
+            if not client_secret_must_update(stored_secret):
+                return
+        except ValueError:  # Raised if the stored_secret is not hashed.
+            return
+        client.client_secret = make_client_secret(provided_secret)
+        # Only update the row if the secret was not changed meanwhile.
+        if Application.objects.filter(pk=client.pk, client_secret=stored_secret).update(
+            client_secret=client.client_secret
+        ):
+            invalidate_application_cache()
 
     def _authenticate_basic_auth(self, request):
         """
@@ -169,6 +252,7 @@ class OAuth2Validator(RequestValidator):
             log.debug("Failed basic auth: wrong client secret %s" % client_secret)
             return False
         else:
+            self._update_client_secret_hash(request.client, client_secret)
             return True
 
     def _authenticate_request_body(self, request):
@@ -194,6 +278,7 @@ class OAuth2Validator(RequestValidator):
             log.debug("Failed body auth: wrong client secret %s" % client_secret)
             return False
         else:
+            self._update_client_secret_hash(request.client, client_secret)
             return True
 
     def _load_application(self, client_id, request):
@@ -206,7 +291,7 @@ class OAuth2Validator(RequestValidator):
         assert hasattr(request, "client"), '"request" instance has no "client" attribute'
 
         try:
-            request.client = request.client or Application.objects.get(client_id=client_id)
+            request.client = request.client or get_application(client_id=client_id)
             # Check that the application can be used (defaults to always True)
             if not request.client.is_usable(request):
                 log.debug("Failed body authentication: Application %r is disabled" % (client_id))
@@ -308,19 +393,76 @@ class OAuth2Validator(RequestValidator):
             return request.client.client_type != AbstractApplication.CLIENT_CONFIDENTIAL
         return False
 
+    def _get_grant(self, code, request, client=None):
+        """
+        Return the Grant for the given code, issued to `client` if it is given.
+
+        The grant is loaded once per request, along with its user, and kept on the
+        oauthlib request for the other steps of the code exchange.
+        Raises Grant.DoesNotExist if there is none.
+        """
+        cached = getattr(request, "_oauth2_grant", None)
+        if cached is not None and cached[0] == code:
+            grant = cached[1]
+        else:
+            if sealed_authorization_codes_enabled() and looks_like_sealed_code(code):
+                grant = unseal_grant(code)
+                if grant is not None and is_sealed_code_redeemed(code):
+                    grant = None
+            elif get_grant_cache() is not None:
+                grant = get_cached_grant(code)
+            else:
+                grant = Grant.objects.select_related("user").filter(**token_lookup(code, "code")).first()
+            if request is not None:
+                request._oauth2_grant = (code, grant)
+        if grant is None:
+            raise Grant.DoesNotExist()
+        if client is not None:
+            if grant.application_id is None and getattr(grant, "client_id", None) == client.client_id:
+                # Sealed codes carry the client_id instead of the application's primary key.
+                grant.application = client
+            if grant.application_id != client.pk:
+                raise Grant.DoesNotExist()
+        return grant
+
     def confirm_redirect_uri(self, client_id, code, redirect_uri, client, *args, **kwargs):
         """
         Ensure the redirect_uri is listed in the Application instance redirect_uris field
         """
-        grant = Grant.objects.get(code=code, application=client)
+        request = kwargs.get("request", args[0] if args else None)
+        grant = self._get_grant(code, request, client)
         return grant.redirect_uri_allowed(redirect_uri)
 
+    def _consume_grant(self, code, request):
+        """
+        Consume the grant of `code` for this request.
+
+        The grant is deleted, or a sealed code recorded as redeemed, with a single query
+        or cache operation which tells whether this request consumed it: if a concurrent
+        request using the same code already did, the exchange fails with invalid_grant.
+        """
+        grant = self._get_grant(code, request, request.client)
+        if sealed_authorization_codes_enabled() and looks_like_sealed_code(code):
+            deleted = redeem_sealed_code(code, grant.expires)
+        elif get_grant_cache() is not None:
+            deleted = consume_cached_grant(code)
+        else:
+            deleted, _rows = Grant.objects.filter(pk=grant.pk).delete()
+        request._oauth2_grant = None
+        if not deleted:
+            raise errors.InvalidGrantError(request=request)
+        request._oauth2_consumed_code = code
+
     def invalidate_authorization_code(self, client_id, code, request, *args, **kwargs):
         """
-        Remove the temporary grant used to swap the authorization token
+        Remove the temporary grant used to swap the authorization token.
+
+        oauthlib calls this once the tokens are saved, too late to keep a concurrent
+        request from issuing tokens for the same code: `save_bearer_token` consumes the
+        grant first, in its transaction, and this only covers the grant not consumed yet.
         """
-        grant = Grant.objects.get(code=code, application=request.client)
-        grant.delete()
+        if getattr(request, "_oauth2_consumed_code", None) != code:
+            self._consume_grant(code, request)
 
     def validate_client_id(self, client_id, request, *args, **kwargs):
         """
@@ -411,6 +553,7 @@ class OAuth2Validator(RequestValidator):
                     "expires": expires,
                 },
             )
+            invalidate_access_token(token)
 
             return access_token
 
@@ -420,6 +563,11 @@ class OAuth2Validator(RequestValidator):
         """
         if not token:
             return False
+        if is_malformed_access_token(token):
+            # Structured tokens failing their checksum were not issued by any server,
+            # there is no point in introspecting them.
+            self._set_oauth2_error_on_request(request, None, scopes)
+            return False
 
         introspection_url = oauth2_settings.RESOURCE_SERVER_INTROSPECTION_URL
         introspection_token = oauth2_settings.RESOURCE_SERVER_AUTH_TOKEN
@@ -436,22 +584,70 @@ class OAuth2Validator(RequestValidator):
 
         if access_token and access_token.is_valid(scopes):
             request.client = access_token.application
-            request.user = access_token.user
+            request.user = self._get_token_user(access_token)
             request.scopes = list(access_token.scopes)
 
             # this is needed by django rest framework
             request.access_token = access_token
             return True
         else:
+            # Keep the token that was found, expired or without the scopes, for
+            # OAuth2ExtraTokenMiddleware.
+            request.access_token = access_token
             self._set_oauth2_error_on_request(request, access_token, scopes)
             return False
 
     def _load_access_token(self, token):
-        return AccessToken.objects.select_related("application", "user").filter(token=token).first()
+        if is_malformed_access_token(token):
+            return None
+        if jwt_access_tokens_enabled() and looks_like_jwt(token):
+            # The signature and expiry are checked locally; the row is only
+            # needed to make sure the token has not been revoked.
+            claims = decode_access_token(token)
+            if claims is None:
+                return None
+            if revocation_filter_enabled():
+                revoked = get_revocation_list().check(claims["jti"])
+                if revoked:
+                    return None
+                if revoked is False:
+                    return access_token_from_claims(claims)
+                # Only the Bloom filter matched: revoked tokens have no row left.
+            token = claims["jti"]
+
+        access_token = get_cached_access_token(token, default=NOT_CACHED)
+        if access_token is NOT_CACHED:
+            access_token = (
+                AccessToken.objects.select_related("application").filter(**token_lookup(token)).first()
+            )
+            if access_token is not None:
+                cache_access_token(access_token)
+            else:
+                cache_missing_access_token(token)
+        return access_token
+
+    def _get_token_user(self, access_token):
+        """
+        Return the user of the access token, which is only loaded from the
+        database when an attribute other than its primary key is used.
+
+        A token served from a cache may outlive its user: the user is then
+        anonymous once loaded.
+        """
+        if access_token.user_id is None or AccessToken.user.is_cached(access_token):
+            return access_token.user
+
+        def load_user():
+            try:
+                return access_token.user
+            except UserModel.DoesNotExist:
+                return AnonymousUser()
+
+        return LazyUser(access_token.user_id, load_user)
 
     def validate_code(self, client_id, code, client, request, *args, **kwargs):
         try:
-            grant = Grant.objects.get(code=code, application=client)
+            grant = self._get_grant(code, request, client)
             if not grant.is_expired():
                 request.scopes = grant.scope.split(" ")
                 request.user = grant.user
@@ -462,7 +658,8 @@ class OAuth2Validator(RequestValidator):
                 return True
             return False
 
-        except Grant.DoesNotExist:
+        except ObjectDoesNotExist:
+            # The grant does not exist, or the user it was issued to was deleted.
             return False
 
     def validate_grant_type(self, client_id, grant_type, client, request, *args, **kwargs):
@@ -520,18 +717,21 @@ class OAuth2Validator(RequestValidator):
         return oauth2_settings.PKCE_REQUIRED
 
     def get_code_challenge(self, code, request):
-        grant = Grant.objects.get(code=code, application=request.client)
+        grant = self._get_grant(code, request, request.client)
         return grant.code_challenge or None
 
     def get_code_challenge_method(self, code, request):
-        grant = Grant.objects.get(code=code, application=request.client)
+        grant = self._get_grant(code, request, request.client)
         return grant.code_challenge_method or None
 
     def save_authorization_code(self, client_id, code, request, *args, **kwargs):
         self._create_authorization_code(request, code)
 
     def get_authorization_code_scopes(self, client_id, code, redirect_uri, request):
-        scopes = Grant.objects.filter(code=code).values_list("scope", flat=True).first()
+        try:
+            scopes = self._get_grant(code, request).scope
+        except Grant.DoesNotExist:
+            scopes = None
         if scopes:
             return utils.scope_to_list(scopes)
         return []
@@ -556,15 +756,19 @@ class OAuth2Validator(RequestValidator):
 
         # expires_in is passed to Server on initialization
         # custom server class can have logic to override this
-        expires = timezone.now() + timedelta(
-            seconds=token.get(
-                "expires_in",
-                oauth2_settings.ACCESS_TOKEN_EXPIRE_SECONDS,
-            )
+        expires_in = token.get(
+            "expires_in",
+            getattr(request.client, "access_token_expire_seconds", None)
+            or oauth2_settings.ACCESS_TOKEN_EXPIRE_SECONDS,
         )
+        expires = timezone.now() + timedelta(seconds=expires_in)
 
         if request.grant_type == "client_credentials":
             request.user = None
+        elif request.grant_type == "authorization_code":
+            # Consume the grant before issuing tokens: the losing request of a concurrent
+            # exchange fails here, and the grant deletion rolls back with the tokens.
+            self._consume_grant(request.code, request)
 
         # This comes from OAuthLib:
         # https://github.com/idan/oauthlib/blob/1.0.3/oauthlib/oauth2/rfc6749/tokens.py#L267
@@ -573,6 +777,16 @@ class OAuth2Validator(RequestValidator):
         # (stored in `request.refresh_token`)
         refresh_token_code = token.get("refresh_token", None)
 
+        refresh_result = getattr(request, "_oauth2_refresh_result", None)
+        if refresh_result is not None:
+            # A concurrent or recent request with the same refresh token issued these
+            # tokens: return them rather than rotating the refresh token again.
+            for key in ("access_token", "refresh_token", "scope"):
+                token[key] = refresh_result[key]
+            token["expires_in"] = refresh_result["expires_in"]
+            self._add_refresh_ahead_hint(token)
+            return
+
         if refresh_token_code:
             # an instance of `RefreshToken` that matches the old refresh code.
             # Set on the request in `validate_refresh_token`
@@ -587,41 +801,53 @@ class OAuth2Validator(RequestValidator):
                 access_token = AccessToken.objects.select_for_update().get(
                     pk=refresh_token_instance.access_token.pk
                 )
+                invalidate_access_token(access_token.token)
+                record_revoked_access_tokens(access_token)
                 access_token.user = request.user
                 access_token.scope = token["scope"]
                 access_token.expires = expires
-                access_token.token = token["access_token"]
+                access_token.token = get_access_token_key(token["access_token"])
                 access_token.application = request.client
                 access_token.save()
 
+            elif self._rotates_refresh_token_in_place(request):
+                if not self._rotate_refresh_token_in_place(request, refresh_token_instance, token, expires):
+                    # The refresh token was already rotated, by a concurrent request or
+                    # within the grace period: return the tokens it was rotated to.
+                    rotated = (
+                        RefreshToken.objects.select_related("access_token")
+                        .filter(pk=refresh_token_instance.pk, revoked__isnull=True)
+                        .first()
+                    )
+                    if rotated is None or rotated.access_token is None:
+                        raise errors.InvalidGrantError(request=request)
+                    if jwt_access_tokens_enabled():
+                        token["access_token"] = encode_access_token_instance(rotated.access_token)
+                    else:
+                        token["access_token"] = rotated.access_token.token
+                    token["refresh_token"] = rotated.token
+                    token["scope"] = rotated.access_token.scope
+
             # else create fresh with access & refresh tokens
             else:
+                previous_access_token = None
                 # revoke existing tokens if possible to allow reuse of grant
                 if isinstance(refresh_token_instance, RefreshToken):
-                    # First, to ensure we don't have concurrency issues, we refresh the refresh token
-                    # from the db while acquiring a lock on it
-                    # We also put it in the "request cache"
-                    refresh_token_instance = RefreshToken.objects.select_for_update().get(
-                        id=refresh_token_instance.id
-                    )
-                    request.refresh_token_instance = refresh_token_instance
-
-                    previous_access_token = AccessToken.objects.filter(
-                        source_refresh_token=refresh_token_instance
-                    ).first()
-                    try:
-                        refresh_token_instance.revoke()
-                    except (AccessToken.DoesNotExist, RefreshToken.DoesNotExist):
-                        pass
+                    if self._revoke_refresh_token(refresh_token_instance):
+                        request.refresh_token_instance = None
                     else:
-                        setattr(request, "refresh_token_instance", None)
-                else:
-                    previous_access_token = None
+                        # The refresh token was already used, by a concurrent request or
+                        # within the grace period.
+                        previous_access_token = self._get_previous_access_token(
+                            request, refresh_token_instance
+                        )
 
                 # If the refresh token has already been used to create an
                 # access token (ie it's within the grace period), return that
                 # access token
                 if not previous_access_token:
+                    if request.grant_type != "refresh_token":
+                        self._enforce_live_token_quota(request, expires_in)
                     access_token = self._create_access_token(
                         expires,
                         request,
@@ -633,25 +859,248 @@ class OAuth2Validator(RequestValidator):
                 else:
                     # make sure that the token data we're returning matches
                     # the existing token
-                    token["access_token"] = previous_access_token.token
-                    token["refresh_token"] = (
-                        RefreshToken.objects.filter(access_token=previous_access_token).first().token
-                    )
+                    if jwt_access_tokens_enabled():
+                        token["access_token"] = encode_access_token_instance(previous_access_token)
+                    else:
+                        token["access_token"] = previous_access_token.token
+                    token["refresh_token"] = previous_access_token.refresh_token.token
                     token["scope"] = previous_access_token.scope
 
+            if request.grant_type == "refresh_token" and get_refresh_token_result_cache() is not None:
+                refresh_result = {
+                    "client_id": request.client.client_id,
+                    "user_id": request.user.pk,
+                    "access_token": token["access_token"],
+                    "refresh_token": token["refresh_token"],
+                    "scope": token["scope"],
+                    "id_token": token.get("id_token"),
+                }
+                transaction.on_commit(
+                    functools.partial(cache_refresh_token_result, request.refresh_token, refresh_result)
+                )
+
         # No refresh token should be created, just access token
-        else:
+        elif not self._reuse_client_credentials_token(request, token):
+            self._enforce_live_token_quota(request, expires_in)
             self._create_access_token(expires, request, token)
 
+        self._add_refresh_ahead_hint(token)
+
+    def _add_refresh_ahead_hint(self, token):
+        ratio = oauth2_settings.ACCESS_TOKEN_REFRESH_AHEAD_RATIO
+        if ratio and token.get("expires_in"):
+            token["refresh_in"] = int(token["expires_in"] * ratio)
+
+    def _revoke_refresh_token(self, refresh_token):
+        """
+        Revoke a refresh token loaded by validate_refresh_token, along with its access
+        token, and return whether this call revoked it.
+
+        The refresh token is revoked with a single conditional update, which also locks
+        its row until the end of the transaction: concurrent requests using the same
+        refresh token wait for this one, then find it revoked.
+        """
+        revoked = timezone.now()
+        if not RefreshToken.objects.filter(pk=refresh_token.pk, revoked__isnull=True).update(
+            access_token=None, revoked=revoked
+        ):
+            return False
+        if refresh_token.access_token_id is not None:
+            refresh_token.access_token.revoke()
+        refresh_token.access_token = None
+        refresh_token.revoked = revoked
+        return True
+
+    def _rotate_refresh_token_in_place(self, request, refresh_token, token, expires):
+        """
+        Replace the values of a refresh token loaded by validate_refresh_token and of its
+        access token with the new ones in ``token``, and return whether this call rotated it.
+
+        Like in _revoke_refresh_token, the refresh token is rotated with a single conditional
+        update: concurrent requests using the same refresh token wait for this one, then find
+        it rotated. The digest of the token replaced is kept for the grace period.
+        """
+        if not RefreshToken.objects.filter(
+            pk=refresh_token.pk, token=request.refresh_token, revoked__isnull=True
+        ).update(
+            token=token["refresh_token"],
+            token_checksum=token_checksum(token["refresh_token"]),
+            previous_token_checksum=token_checksum(request.refresh_token),
+            updated=timezone.now(),
+        ):
+            self._save_rotated_id_token(request)
+            return False
+        access_token = refresh_token.access_token
+        if access_token is None:
+            self._save_rotated_id_token(request)
+            access_token = self._create_access_token(expires, request, token)
+            RefreshToken.objects.filter(pk=refresh_token.pk).update(access_token=access_token)
+        else:
+            invalidate_access_token(access_token.token)
+            record_revoked_access_tokens(access_token)
+            access_token.user = request.user
+            access_token.scope = token["scope"]
+            access_token.expires = expires
+            access_token.token = get_access_token_key(token["access_token"])
+            self._save_rotated_id_token(request, access_token)
+            access_token.save()
+        refresh_token.token = token["refresh_token"]
+        refresh_token.access_token = access_token
+        return True
+
+    def _rotates_refresh_token_in_place(self, request):
+        return (
+            oauth2_settings.ROTATE_REFRESH_TOKEN_IN_PLACE
+            and self.rotate_refresh_token(request)
+            and isinstance(getattr(request, "refresh_token_instance", None), RefreshToken)
+        )
+
+    def _save_rotated_id_token(self, request, access_token=None):
+        """
+        Save the ID token issued by a refresh rotated in place, which finalize_id_token
+        left to this method: in the row of the ID token of `access_token` it replaces,
+        or else in a new row.
+        """
+        pending = getattr(request, "_oauth2_rotated_id_token", None)
+        if pending is None:
+            return
+        request._oauth2_rotated_id_token = None
+        jti, expires = pending
+        if access_token is not None and access_token.id_token_id is not None:
+            if IDToken.objects.filter(pk=access_token.id_token_id).update(
+                jti=jti,
+                expires=expires,
+                scope=request.scope or " ".join(request.scopes),
+                updated=timezone.now(),
+            ):
+                return
+        request.id_token = self._save_id_token(jti, request, expires)
+        if access_token is not None:
+            access_token.id_token = request.id_token
+
+    def _get_previous_access_token(self, request, refresh_token):
+        """
+        Return the access token already issued with a revoked refresh token, with its
+        own refresh token, or None. It is loaded once per request.
+        """
+        cached = getattr(request, "_oauth2_previous_access_token", None)
+        if cached is None or cached[0] != refresh_token.pk:
+            access_token = (
+                AccessToken.objects.select_related("refresh_token")
+                .filter(source_refresh_token_id=refresh_token.pk)
+                .first()
+            )
+            cached = request._oauth2_previous_access_token = (refresh_token.pk, access_token)
+        return cached[1]
+
+    def _enforce_live_token_quota(self, request, expires_in):
+        """
+        Make room for a new access token of the request's user, if its application has
+        a ``live_token_quota``: revoke their oldest live tokens, or raise the
+        ``LIVE_TOKEN_QUOTA_ERROR`` error if ``LIVE_TOKEN_QUOTA_POLICY`` is "reject".
+
+        With ``LIVE_TOKEN_QUOTA_CACHE_ALIAS``, live tokens are only counted in the
+        database when the count kept in the cache, for ``expires_in`` seconds, reaches
+        the quota.
+        """
+        quota = getattr(request.client, "live_token_quota", None)
+        if not quota:
+            return
+        user_id = request.user.pk if request.user is not None else None
+        live_tokens = AccessToken.objects.filter(
+            application=request.client, user_id=user_id, expires__gt=timezone.now()
+        )
+        if get_live_token_count(request.client.pk, user_id, live_tokens.count, expires_in) >= quota:
+            if oauth2_settings.LIVE_TOKEN_QUOTA_POLICY == "reject":
+                count = live_tokens.count()
+                set_live_token_count(request.client.pk, user_id, count, expires_in)
+                if count >= quota:
+                    raise errors.CustomOAuth2Error(
+                        error=oauth2_settings.LIVE_TOKEN_QUOTA_ERROR,
+                        description="Too many live tokens.",
+                        status_code=400,
+                        request=request,
+                    )
+            else:
+                evicted = list(live_tokens.order_by("-created").only("pk", "token", "expires")[quota - 1 :])
+                self._revoke_access_tokens(evicted)
+                set_live_token_count(request.client.pk, user_id, quota - 1, expires_in)
+        count_issued_token(request.client.pk, user_id)
+
+    def _revoke_access_tokens(self, access_tokens):
+        """
+        Revoke access tokens and their refresh tokens, with one statement per table.
+        """
+        if not access_tokens:
+            return
+        record_revoked_access_tokens(*access_tokens)
+        pks = [access_token.pk for access_token in access_tokens]
+        RefreshToken.objects.filter(access_token_id__in=pks, revoked__isnull=True).update(
+            access_token=None, revoked=timezone.now()
+        )
+        AccessToken.objects.filter(pk__in=pks).delete()
+
+    def _reuse_client_credentials_token(self, request, token):
+        """
+        For applications with ``reuse_client_credentials_tokens`` set, return the access
+        token already issued to a client credentials request for the same scopes, if it
+        is valid for ``CLIENT_CREDENTIALS_TOKEN_MIN_LIFETIME_SECONDS`` more, instead of
+        issuing a new one. Return whether a token was reused.
+
+        When there is none, the application row is locked until the end of the
+        transaction: concurrent requests of the client wait for the token issued by
+        this one, and reuse it. The token is then looked up again with a locking read,
+        which unlike a plain one sees that token under MySQL's REPEATABLE READ.
+        """
+        if request.grant_type != "client_credentials" or not getattr(
+            request.client, "reuse_client_credentials_tokens", False
+        ):
+            return False
+        # The scopes are stored sorted, so that tokens can be looked up by scope.
+        token["scope"] = " ".join(sorted(set(token["scope"].split())))
+        access_token = self._get_reusable_access_token(request.client, token["scope"])
+        if access_token is None:
+            Application.objects.select_for_update().only("pk").get(pk=request.client.pk)
+            access_token = self._get_reusable_access_token(request.client, token["scope"], lock=True)
+            if access_token is None:
+                return False
+        if jwt_access_tokens_enabled():
+            token["access_token"] = encode_access_token_instance(access_token)
+        else:
+            token["access_token"] = access_token.token
+        token["expires_in"] = int((access_token.expires - timezone.now()).total_seconds())
+        return True
+
+    def _get_reusable_access_token(self, application, scope, lock=False):
+        min_expires = timezone.now() + timedelta(
+            seconds=oauth2_settings.CLIENT_CREDENTIALS_TOKEN_MIN_LIFETIME_SECONDS
+        )
+        access_tokens = AccessToken.objects.filter(
+            application=application, user__isnull=True, scope=scope, expires__gt=min_expires
+        )
+        if lock:
+            access_tokens = access_tokens.select_for_update()
+        access_token = access_tokens.order_by("-expires").first()
+        if access_token is not None:
+            access_token.application = application
+        return access_token
+
+    def _get_id_token(self, request, id_token):
+        # Reuse the ID token saved by finalize_id_token for this request.
+        saved_id_token = getattr(request, "id_token", None)
+        if isinstance(saved_id_token, IDToken):
+            return saved_id_token
+        return self._load_id_token(id_token)
+
     def _create_access_token(self, expires, request, token, source_refresh_token=None):
         id_token = token.get("id_token", None)
         if id_token:
-            id_token = self._load_id_token(id_token)
+            id_token = self._get_id_token(request, id_token)
         return AccessToken.objects.create(
             user=request.user,
             scope=token["scope"],
             expires=expires,
-            token=token["access_token"],
+            token=get_access_token_key(token["access_token"]),
             id_token=id_token,
             application=request.client,
             source_refresh_token=source_refresh_token,
@@ -660,7 +1109,7 @@ class OAuth2Validator(RequestValidator):
     def _create_authorization_code(self, request, code, expires=None):
         if not expires:
             expires = timezone.now() + timedelta(seconds=oauth2_settings.AUTHORIZATION_CODE_EXPIRE_SECONDS)
-        return Grant.objects.create(
+        grant = Grant(
             application=request.client,
             user=request.user,
             code=code["code"],
@@ -672,6 +1121,15 @@ class OAuth2Validator(RequestValidator):
             nonce=request.nonce or "",
             claims=json.dumps(request.claims or {}),
         )
+        if sealed_authorization_codes_enabled() and "id_token" not in code and "access_token" not in code:
+            # Codes of the hybrid flow are already hashed into the tokens issued with
+            # them, so they cannot be replaced by a sealed code and are stored.
+            code["code"] = grant.code = seal_grant(grant, request.client.client_id)
+        elif get_grant_cache() is not None:
+            cache_grant(grant)
+        else:
+            grant.save()
+        return grant
 
     def _create_refresh_token(self, request, refresh_token_code, access_token):
         return RefreshToken.objects.create(
@@ -694,13 +1152,33 @@ class OAuth2Validator(RequestValidator):
             "refresh_token": RefreshToken,
         }
 
+        token_values = {
+            AccessToken: get_access_token_key(token),
+            RefreshToken: token,
+        }
+
+        # The type of a structured token overrides the hint, and no other table is tried.
+        structured_type = get_token_type(token)
+        if structured_type == MALFORMED_TOKEN:
+            return
+        if structured_type in (ACCESS_TOKEN, REFRESH_TOKEN):
+            token_type = token_types[structured_type]
+            for instance in token_type.objects.filter(**token_lookup(token_values[token_type])):
+                instance.revoke()
+            return
+
         token_type = token_types.get(token_type_hint, AccessToken)
         try:
-            token_type.objects.get(token=token).revoke()
+            token_type.objects.get(**token_lookup(token_values[token_type])).revoke()
         except ObjectDoesNotExist:
             for other_type in [_t for _t in token_types.values() if _t != token_type]:
                 # slightly inefficient on Python2, but the queryset contains only one instance
-                list(map(lambda t: t.revoke(), other_type.objects.filter(token=token)))
+                list(
+                    map(
+                        lambda t: t.revoke(),
+                        other_type.objects.filter(**token_lookup(token_values[other_type])),
+                    )
+                )
 
     def validate_user(self, username, password, client, request, *args, **kwargs):
         """
@@ -723,37 +1201,79 @@ class OAuth2Validator(RequestValidator):
     def get_original_scopes(self, refresh_token, request, *args, **kwargs):
         # Avoid second query for RefreshToken since this method is invoked *after*
         # validate_refresh_token.
+        refresh_result = getattr(request, "_oauth2_refresh_result", None)
+        if refresh_result is not None:
+            return refresh_result["scope"]
         rt = request.refresh_token_instance
         if not rt.access_token_id:
-            try:
-                return AccessToken.objects.get(source_refresh_token_id=rt.id).scope
-            except AccessToken.DoesNotExist:
+            previous_access_token = self._get_previous_access_token(request, rt)
+            if previous_access_token is None:
                 return []
+            return previous_access_token.scope
         return rt.access_token.scope
 
     def validate_refresh_token(self, refresh_token, client, request, *args, **kwargs):
         """
         Check refresh_token exists and refers to the right client.
         Also attach User instance to the request object
+
+        With ``REFRESH_TOKEN_RESULT_CACHE_ALIAS``, a refresh token that was just used, or
+        is being used by a concurrent request, is validated by the result of that request.
         """
+        if get_refresh_token_result_cache() is not None:
+            refresh_result = claim_refresh_token(refresh_token)
+            if refresh_result is not None:
+                if refresh_result["client_id"] != client.client_id:
+                    return False
+                # The tokens may have been revoked or have expired since they were issued.
+                issued = (
+                    RefreshToken.objects.select_related("access_token")
+                    .filter(revoked__isnull=True, **token_lookup(refresh_result["refresh_token"]))
+                    .first()
+                )
+                if issued is None or issued.access_token is None or issued.access_token.is_expired():
+                    return False
+                user_id = refresh_result["user_id"]
+                request.user = LazyUser(user_id, lambda: UserModel.objects.get(pk=user_id))
+                request.refresh_token = refresh_token
+                # Reused by get_original_scopes, finalize_id_token and save_bearer_token.
+                expires_in = issued.access_token.expires - timezone.now()
+                request._oauth2_refresh_result = dict(
+                    refresh_result, expires_in=int(expires_in.total_seconds())
+                )
+                return True
 
-        null_or_recent = Q(revoked__isnull=True) | Q(
-            revoked__gt=timezone.now() - timedelta(seconds=oauth2_settings.REFRESH_TOKEN_GRACE_PERIOD_SECONDS)
-        )
-        rt = (
-            RefreshToken.objects.filter(null_or_recent, token=refresh_token)
-            .select_related("access_token")
-            .first()
+        grace_period_start = timezone.now() - timedelta(
+            seconds=oauth2_settings.REFRESH_TOKEN_GRACE_PERIOD_SECONDS
         )
+        if oauth2_settings.ROTATE_REFRESH_TOKEN_IN_PLACE:
+            # Refresh tokens rotated in place are only revoked explicitly, and the token
+            # they replaced is accepted during the grace period.
+            usable = Q(revoked__isnull=True)
+            matching = Q(**token_lookup(refresh_token))
+            if oauth2_settings.REFRESH_TOKEN_GRACE_PERIOD_SECONDS:
+                matching |= Q(
+                    previous_token_checksum=token_checksum(refresh_token), updated__gt=grace_period_start
+                )
+        else:
+            usable = Q(revoked__isnull=True) | Q(revoked__gt=grace_period_start)
+            matching = Q(**token_lookup(refresh_token))
+        rt = RefreshToken.objects.filter(usable, matching).select_related("access_token", "user").first()
 
-        if not rt:
+        if not rt or rt.application_id != client.pk:
+            if get_refresh_token_result_cache() is not None:
+                release_refresh_token(refresh_token)
             return False
 
         request.user = rt.user
-        request.refresh_token = rt.token
+        if oauth2_settings.ROTATE_REFRESH_TOKEN_IN_PLACE:
+            # The token presented, which differs from rt.token if it was already replaced.
+            request.refresh_token = refresh_token
+        else:
+            request.refresh_token = rt.token
         # Temporary store RefreshToken instance to be reused by get_original_scopes and save_bearer_token.
         request.refresh_token_instance = rt
-        return rt.application == client
+        return True
 
     @transaction.atomic
     def _save_id_token(self, jti, request, expires, *args, **kwargs):
@@ -819,7 +1339,11 @@ class OAuth2Validator(RequestValidator):
         """
         claims = self.get_oidc_claims(token, token_handler, request)
 
-        expiration_time = timezone.now() + timedelta(seconds=oauth2_settings.ID_TOKEN_EXPIRE_SECONDS)
+        expire_seconds = (
+            getattr(request.client, "id_token_expire_seconds", None)
+            or oauth2_settings.ID_TOKEN_EXPIRE_SECONDS
+        )
+        expiration_time = timezone.now() + timedelta(seconds=expire_seconds)
         # Required ID Token claims
         claims.update(
             **{
@@ -836,6 +1360,10 @@ class OAuth2Validator(RequestValidator):
         return oauth2_settings.oidc_issuer(request)
 
     def finalize_id_token(self, id_token, token, token_handler, request):
+        refresh_result = getattr(request, "_oauth2_refresh_result", None)
+        if refresh_result is not None and refresh_result.get("id_token"):
+            # Return the ID token issued along with the shared tokens.
+            return refresh_result["id_token"]
         claims, expiration_time = self.get_id_token_dictionary(token, token_handler, request)
         id_token.update(**claims)
         # Workaround for oauthlib bug #746
@@ -856,6 +1384,11 @@ class OAuth2Validator(RequestValidator):
             claims=json.dumps(id_token, default=str),
         )
         jwt_token.make_signed_token(request.client.jwk_key)
+        if request.grant_type == "refresh_token" and self._rotates_refresh_token_in_place(request):
+            # Saved by save_bearer_token once the refresh token is rotated, see
+            # _save_rotated_id_token.
+            request._oauth2_rotated_id_token = (id_token["jti"], expiration_time)
+            return jwt_token.serialize()
         id_token = self._save_id_token(id_token["jti"], request, expiration_time)
         # this is needed by django rest framework
         request.access_token = id_token
@@ -919,7 +1452,8 @@ class OAuth2Validator(RequestValidator):
         """
         if isinstance(audience, str):
             audience = [audience]
-        return Application.objects.filter(client_id__in=audience).first()
+        applications = get_applications(audience)
+        return min(applications, key=lambda application: application.pk, default=None)
 
     def validate_user_match(self, id_token_hint, scopes, claims, request):
         # TODO: Fix to validate when necessary acording
@@ -945,7 +1479,10 @@ class OAuth2Validator(RequestValidator):
         Method is used by:
             - Authorization Token Grant Dispatcher
         """
-        nonce = Grant.objects.filter(code=code).values_list("nonce", flat=True).first()
+        try:
+            nonce = self._get_grant(code, request).nonce
+        except Grant.DoesNotExist:
+            nonce = None
         if nonce:
             return nonce
 
@@ -0,0 +1,230 @@
+"""
+Revocation list for JWT access tokens.
+
+JWT access tokens are checked without reading their row, so revoking one must
+be visible to every process that validates them. Revocations are recorded in
+the RevokedAccessToken table, and each process keeps the ones that have not
+expired yet in memory, behind a Bloom filter:
+
+* a jti that the filter does not contain has not been revoked, which is the
+  answer for almost every request: the token is then built from its claims,
+  without a query;
+* a jti found in the exact set has been revoked;
+* anything else is a false positive of the filter, settled by reading the
+  token's row, which revoked tokens no longer have.
+
+Access tokens deleted in any other way, for instance in cascade with their user
+or application, are recorded as revoked as well.
+
+The in-memory list picks up revocations made by other processes every
+``ACCESS_TOKEN_REVOCATION_FILTER_REFRESH_SECONDS``, by loading the rows created
+since the previous refresh.
+"""
+
+import hashlib
+import math
+import threading
+import time
+from datetime import timedelta
+
+from django.apps import apps
+from django.core.signals import setting_changed
+from django.db.models.signals import post_delete
+from django.utils import timezone
+
+from .jwt_tokens import jwt_access_tokens_enabled, looks_like_jti
+from .settings import ACCESS_TOKEN_MODEL, oauth2_settings
+
+
+# Rows are loaded again if they were created this long before the previous
+# refresh, so that revocations committed late by long transactions are not missed.
+REFRESH_OVERLAP = timedelta(seconds=60)
+
+
+class BloomFilter:
+    """
+    A Bloom filter sized for ``capacity`` items with the given false positive
+    rate, using double hashing over a single BLAKE2b digest.
+    """
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        size = self.size
+        return [(h1 + i * h2) % size for i in range(self.hash_count)]
+
+    def add(self, item):
+        bits = self._bits
+        for position in self._positions(item):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        bits = self._bits
+        for position in self._positions(item):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+
+class RevocationList:
+    """
+    The revoked jtis known to this process, as an exact mapping of jti to
+    expiry timestamp behind a Bloom filter.
+
+    Expired entries are pruned on refresh. Since items cannot be removed from a
+    Bloom filter, it is rebuilt from the exact set once enough of them are gone,
+    or when it grows past its capacity.
+    """
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.refreshed_at = None
+        self._revoked = {}
+        self._filter = BloomFilter(capacity, error_rate)
+        self._lock = threading.Lock()
+        self._next_refresh = 0
+
+    def __len__(self):
+        return len(self._revoked)
+
+    def add(self, jti, expires):
+        with self._lock:
+            if jti in self._revoked:
+                return
+            self._revoked[jti] = expires
+            self._filter.add(jti)
+            if self._filter.count > self._filter.capacity:
+                self._rebuild()
+
+    def check(self, jti):
+        """
+        Return True if the jti has been revoked, False if it has not, and None
+        if only the Bloom filter matched it.
+        """
+        if jti not in self._filter:
+            return False
+        if jti in self._revoked:
+            return True
+        return None
+
+    def prune(self, now):
+        with self._lock:
+            expired = [jti for jti, expires in self._revoked.items() if expires <= now]
+            for jti in expired:
+                del self._revoked[jti]
+            if self._filter.count - len(self._revoked) > self._filter.capacity // 2:
+                self._rebuild()
+
+    def refresh_due(self):
+        return time.monotonic() >= self._next_refresh
+
+    def schedule_refresh(self, seconds):
+        self._next_refresh = time.monotonic() + seconds
+
+    def _rebuild(self):
+        bloom_filter = BloomFilter(max(self.capacity, 2 * len(self._revoked)), self.error_rate)
+        for jti in self._revoked:
+            bloom_filter.add(jti)
+        self._filter = bloom_filter
+
+
+_revocation_list = None
+_revocation_list_lock = threading.Lock()
+
+
+def revocation_filter_enabled():
+    return oauth2_settings.ACCESS_TOKEN_REVOCATION_FILTER_ENABLED
+
+
+def _get_revoked_access_token_model():
+    return apps.get_model("oauth2_provider", "RevokedAccessToken")
+
+
+def _refresh(revocations):
+    now = timezone.now()
+    queryset = _get_revoked_access_token_model().objects.filter(expires__gt=now)
+    if revocations.refreshed_at is not None:
+        queryset = queryset.filter(created__gte=revocations.refreshed_at - REFRESH_OVERLAP)
+    for jti, expires in queryset.values_list("jti", "expires").iterator():
+        revocations.add(jti, expires.timestamp())
+    revocations.refreshed_at = now
+    revocations.prune(now.timestamp())
+
+
+def get_revocation_list():
+    """
+    Return this process' revocation list, loading the revocations recorded
+    since the last call if they are due.
+    """
+    global _revocation_list
+
+    revocations = _revocation_list
+    if revocations is None or revocations.refresh_due():
+        with _revocation_list_lock:
+            if _revocation_list is None:
+                _revocation_list = RevocationList(
+                    oauth2_settings.ACCESS_TOKEN_REVOCATION_FILTER_CAPACITY,
+                    oauth2_settings.ACCESS_TOKEN_REVOCATION_FILTER_ERROR_RATE,
+                )
+            revocations = _revocation_list
+            if revocations.refresh_due():
+                revocations.schedule_refresh(oauth2_settings.ACCESS_TOKEN_REVOCATION_FILTER_REFRESH_SECONDS)
+                _refresh(revocations)
+    return revocations
+
+
+def record_revoked_access_tokens(*access_tokens):
+    """
+    Record the revocation of the given AccessToken instances of JWT access
+    tokens, if the revocation filter is enabled.
+
+    The rows of other access tokens store the bearer token itself, which must
+    not be copied in clear, and are read anyway when the token is used.
+    """
+    if not revocation_filter_enabled() or not jwt_access_tokens_enabled():
+        return
+    access_tokens = [token for token in access_tokens if looks_like_jti(token.token)]
+    if not access_tokens:
+        return
+    RevokedAccessToken = _get_revoked_access_token_model()
+    RevokedAccessToken.objects.bulk_create(
+        [RevokedAccessToken(jti=token.token, expires=token.expires) for token in access_tokens],
+        ignore_conflicts=True,
+    )
+    revocations = get_revocation_list()
+    for token in access_tokens:
+        revocations.add(token.token, token.expires.timestamp())
+
+
+def record_deleted_access_token(sender, instance, **kwargs):
+    """
+    Record the revocation of a deleted access token that has not expired yet.
+    Connected to the post_delete signal of the access token model.
+    """
+    if not revocation_filter_enabled() or instance.expires <= timezone.now():
+        return
+    if not jwt_access_tokens_enabled() or not looks_like_jti(instance.token):
+        return
+    if get_revocation_list().check(instance.token) is not True:
+        record_revoked_access_tokens(instance)
+
+
+def reset_revocation_list(*args, **kwargs):
+    global _revocation_list
+
+    if kwargs.get("setting") == "OAUTH2_PROVIDER":
+        _revocation_list = None
+
+
+setting_changed.connect(reset_revocation_list)
+post_delete.connect(record_deleted_access_token, sender=ACCESS_TOKEN_MODEL)
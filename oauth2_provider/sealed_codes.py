@@ -0,0 +1,152 @@
+"""
+Self-contained authorization codes.
+
+When ``AUTHORIZATION_CODE_SEALED_ENABLED`` is set, authorization codes are
+compact JWEs, encrypted and authenticated with A256GCM under a key derived from
+``AUTHORIZATION_CODE_SEALING_KEYS`` (or ``SECRET_KEY``), which carry everything
+the grant table would store. They are issued and redeemed without writing to
+the database; instead, the cache named by ``AUTHORIZATION_CODE_REPLAY_CACHE_ALIAS``
+remembers the codes already exchanged until they expire, so that each code is
+only exchanged once.
+"""
+
+import base64
+import functools
+import hashlib
+import hmac
+import json
+import math
+from datetime import datetime
+from datetime import timezone as dt_timezone
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from jwcrypto import jwe, jwk
+from jwcrypto.common import JWException
+
+from .settings import GRANT_MODEL, oauth2_settings
+
+
+SEALED_CODE_KEY_PREFIX = "oauth2_provider:sealed_code:"
+SEALED_CODE_ALGORITHMS = ["dir", "A256GCM"]
+
+
+def sealed_authorization_codes_enabled():
+    return oauth2_settings.AUTHORIZATION_CODE_SEALED_ENABLED
+
+
+def looks_like_sealed_code(code):
+    return code.count(".") == 4
+
+
+def _get_sealing_secrets():
+    secrets = oauth2_settings.AUTHORIZATION_CODE_SEALING_KEYS
+    if not secrets:
+        secrets = [settings.SECRET_KEY, *getattr(settings, "SECRET_KEY_FALLBACKS", [])]
+    return tuple(secrets)
+
+
+@functools.lru_cache()
+def _load_keys(secrets):
+    keys = {}
+    for secret in secrets:
+        raw = hmac.new(secret.encode("utf-8"), SEALED_CODE_KEY_PREFIX.encode(), hashlib.sha256).digest()
+        key = jwk.JWK(kty="oct", k=base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii"))
+        keys.setdefault(key.thumbprint()[:8], key)
+    return keys
+
+
+def get_sealing_keys():
+    """
+    Return the keys authorization codes may have been sealed with, as a dict
+    mapping each kid to its key. The active key comes first.
+    """
+    return _load_keys(_get_sealing_secrets())
+
+
+def seal_grant(grant, client_id):
+    """
+    Return the sealed authorization code for an unsaved grant.
+    """
+    kid, key = next(iter(get_sealing_keys().items()))
+    claims = {
+        "client_id": client_id,
+        "sub": str(grant.user_id),
+        "redirect_uri": grant.redirect_uri,
+        "scope": grant.scope,
+        "code_challenge": grant.code_challenge,
+        "code_challenge_method": grant.code_challenge_method,
+        "nonce": grant.nonce,
+        "claims": grant.claims,
+        "exp": math.ceil(grant.expires.timestamp()),
+    }
+    header = {"alg": "dir", "enc": "A256GCM", "kid": kid}
+    token = jwe.JWE(
+        json.dumps(claims, separators=(",", ":")),
+        protected=json.dumps(header, separators=(",", ":")),
+        algs=SEALED_CODE_ALGORITHMS,
+    )
+    token.add_recipient(key)
+    return token.serialize(compact=True)
+
+
+def unseal_grant(code):
+    """
+    Return the unsaved grant carried by a sealed authorization code, with the
+    client_id it was issued to as its ``client_id`` attribute.
+
+    None is returned if the code was not sealed by us. Expired codes are
+    returned, like expired grants are loaded from the database.
+    """
+    if not looks_like_sealed_code(code):
+        return None
+    try:
+        token = jwe.JWE(algs=SEALED_CODE_ALGORITHMS)
+        token.deserialize(code)
+        key = get_sealing_keys().get(token.jose_header.get("kid"))
+        if key is None:
+            return None
+        token.decrypt(key)
+        claims = json.loads(token.payload)
+        expires = datetime.fromtimestamp(claims["exp"], tz=dt_timezone.utc)
+        if not settings.USE_TZ:
+            expires = timezone.make_naive(expires)
+        grant = apps.get_model(GRANT_MODEL)(
+            user_id=claims["sub"],
+            code=code,
+            expires=expires,
+            redirect_uri=claims["redirect_uri"],
+            scope=claims["scope"],
+            code_challenge=claims["code_challenge"],
+            code_challenge_method=claims["code_challenge_method"],
+            nonce=claims["nonce"],
+            claims=claims["claims"],
+        )
+        grant.client_id = claims["client_id"]
+    except (JWException, ValueError, KeyError, TypeError):
+        return None
+    return grant
+
+
+def get_replay_cache():
+    return caches[oauth2_settings.AUTHORIZATION_CODE_REPLAY_CACHE_ALIAS]
+
+
+def replay_cache_key(code):
+    return SEALED_CODE_KEY_PREFIX + hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+def is_sealed_code_redeemed(code):
+    return get_replay_cache().get(replay_cache_key(code)) is not None
+
+
+def redeem_sealed_code(code, expires):
+    """
+    Record that a sealed code was exchanged, until it expires, and return
+    whether this call recorded it. When several requests redeem the same code
+    concurrently, only one of them gets True.
+    """
+    timeout = math.ceil((expires - timezone.now()).total_seconds())
+    return get_replay_cache().add(replay_cache_key(code), True, max(timeout, 1))
@@ -23,6 +23,7 @@ from django.http import HttpRequest
 from django.urls import reverse
 from django.utils.module_loading import import_string
 from oauthlib.common import Request
+from oauthlib.oauth2.rfc6749.tokens import random_token_generator
 
 
 USER_SETTINGS = getattr(settings, "OAUTH2_PROVIDER", None)
@@ -37,6 +38,17 @@ DEFAULTS = {
     "CLIENT_ID_GENERATOR_CLASS": "oauth2_provider.generators.ClientIdGenerator",
     "CLIENT_SECRET_GENERATOR_CLASS": "oauth2_provider.generators.ClientSecretGenerator",
     "CLIENT_SECRET_GENERATOR_LENGTH": 128,
+    # Hasher for client secrets, Django's default password hasher if None
+    "CLIENT_SECRET_HASHER": None,
+    # Cache alias (from Django's CACHES) and per-process cache for application lookups
+    "APPLICATION_CACHE_ALIAS": None,
+    "APPLICATION_CACHE_SECONDS": 300,
+    "APPLICATION_LOCAL_CACHE_MAX_ENTRIES": 0,
+    "APPLICATION_LOCAL_CACHE_MAX_BYTES": 4 * 1024 * 1024,
+    "APPLICATION_LOCAL_CACHE_SECONDS": 30,
+    # Cache alias (from Django's CACHES) used to remember verified hashed client secrets
+    "CLIENT_SECRET_CACHE_ALIAS": None,
+    "CLIENT_SECRET_CACHE_SECONDS": 300,
     "ACCESS_TOKEN_GENERATOR": None,
     "REFRESH_TOKEN_GENERATOR": None,
     "EXTRA_SERVER_KWARGS": {},
@@ -50,11 +62,63 @@ DEFAULTS = {
     "READ_SCOPE": "read",
     "WRITE_SCOPE": "write",
     "AUTHORIZATION_CODE_EXPIRE_SECONDS": 60,
+    # Cache alias (from Django's CACHES) used to store authorization codes instead of the Grant model
+    "GRANT_CACHE_ALIAS": None,
+    # Issue authorization codes as encrypted JWEs, see oauth2_provider.sealed_codes
+    "AUTHORIZATION_CODE_SEALED_ENABLED": False,
+    "AUTHORIZATION_CODE_SEALING_KEYS": [],
+    "AUTHORIZATION_CODE_REPLAY_CACHE_ALIAS": "default",
     "ACCESS_TOKEN_EXPIRE_SECONDS": 36000,
+    # Shorten each access token lifetime by a random fraction of it, of at most this ratio
+    "ACCESS_TOKEN_EXPIRE_JITTER": 0,
+    # Add a "refresh_in" field to token responses: this ratio of the access token lifetime
+    "ACCESS_TOKEN_REFRESH_AHEAD_RATIO": None,
+    # Cache alias (from Django's CACHES) used to cache access tokens on validation
+    "ACCESS_TOKEN_CACHE_ALIAS": None,
+    "ACCESS_TOKEN_CACHE_SECONDS": 300,
+    # Per-process access token cache, disabled unless MAX_ENTRIES is set
+    "ACCESS_TOKEN_LOCAL_CACHE_MAX_ENTRIES": 0,
+    "ACCESS_TOKEN_LOCAL_CACHE_MAX_BYTES": 16 * 1024 * 1024,
+    "ACCESS_TOKEN_LOCAL_CACHE_SECONDS": 30,
+    "ACCESS_TOKEN_LOCAL_CACHE_NEGATIVE_SECONDS": 5,
+    # Issue access tokens as signed JWTs, see oauth2_provider.jwt_tokens
+    "ACCESS_TOKEN_JWT_ENABLED": False,
+    "ACCESS_TOKEN_JWT_PRIVATE_KEY": "",
+    "ACCESS_TOKEN_JWT_PRIVATE_KEYS_INACTIVE": [],
+    # In-memory revocation list for JWT access tokens, see oauth2_provider.revocation
+    "ACCESS_TOKEN_REVOCATION_FILTER_ENABLED": False,
+    "ACCESS_TOKEN_REVOCATION_FILTER_CAPACITY": 100000,
+    "ACCESS_TOKEN_REVOCATION_FILTER_ERROR_RATE": 0.001,
+    "ACCESS_TOKEN_REVOCATION_FILTER_REFRESH_SECONDS": 5,
+    # Lifetime an access token must have left to be returned again to a client
+    # credentials request, for applications with reuse_client_credentials_tokens
+    "CLIENT_CREDENTIALS_TOKEN_MIN_LIFETIME_SECONDS": 300,
+    # What to do when a token would exceed the live_token_quota of its application: "evict" the
+    # oldest live tokens of the user, or "reject" the request with the LIVE_TOKEN_QUOTA_ERROR error
+    "LIVE_TOKEN_QUOTA_POLICY": "evict",
+    "LIVE_TOKEN_QUOTA_ERROR": "access_denied",
+    # Cache alias (from Django's CACHES) counting live tokens, None to count them in the database
+    "LIVE_TOKEN_QUOTA_CACHE_ALIAS": None,
+    # Look tokens and authorization codes up by their SHA-256 checksum
+    "TOKEN_CHECKSUM_LOOKUP": False,
+    # Check the tokens presented against the format of oauth2_provider.structured_tokens
+    "STRUCTURED_TOKENS_ENABLED": False,
+    # Format of the tokens of oauth2_provider.structured_tokens: "crc32" or "hmac" checksum,
+    # prefix and shard tag, and whether tokens without the prefix are rejected
+    "STRUCTURED_TOKEN_PREFIX": "dot",
+    "STRUCTURED_TOKEN_SHARD": None,
+    "STRUCTURED_TOKEN_CHECKSUM": "crc32",
+    "STRUCTURED_TOKENS_ONLY": False,
     "ID_TOKEN_EXPIRE_SECONDS": 36000,
     "REFRESH_TOKEN_EXPIRE_SECONDS": None,
     "REFRESH_TOKEN_GRACE_PERIOD_SECONDS": 0,
+    # Cache alias (from Django's CACHES) sharing the responses of concurrent refreshes
+    "REFRESH_TOKEN_RESULT_CACHE_ALIAS": None,
+    "REFRESH_TOKEN_RESULT_CACHE_SECONDS": 10,
+    "REFRESH_TOKEN_RESULT_WAIT_SECONDS": 0.5,
     "ROTATE_REFRESH_TOKEN": True,
+    # Rotate refresh tokens by updating the token rows instead of replacing them
+    "ROTATE_REFRESH_TOKEN_IN_PLACE": False,
     "ERROR_RESPONSE_WITH_SCOPES": False,
     "APPLICATION_MODEL": APPLICATION_MODEL,
     "ACCESS_TOKEN_MODEL": ACCESS_TOKEN_MODEL,
@@ -104,6 +168,8 @@ DEFAULTS = {
     "RESOURCE_SERVER_TOKEN_CACHING_SECONDS": 36000,
     # Whether or not PKCE is required
     "PKCE_REQUIRED": True,
+    # Verify bearer tokens without building the full oauthlib request, see OAuthLibCore.verify_request
+    "BEARER_TOKEN_FAST_PATH": False,
     # Whether to re-create OAuthlibCore on every request.
     # Should only be required in testing.
     "ALWAYS_RELOAD_OAUTHLIB_CORE": False,
@@ -129,6 +195,7 @@ MANDATORY = (
 IMPORT_STRINGS = (
     "CLIENT_ID_GENERATOR_CLASS",
     "CLIENT_SECRET_GENERATOR_CLASS",
+    "CLIENT_SECRET_HASHER",
     "ACCESS_TOKEN_GENERATOR",
     "REFRESH_TOKEN_GENERATOR",
     "OAUTH2_SERVER_CLASS",
@@ -265,6 +332,16 @@ class OAuth2ProviderSettings:
                 ("refresh_token_generator", "REFRESH_TOKEN_GENERATOR"),
             ]
         }
+        # Honour the access_token_expire_seconds of the request's application.
+        from oauth2_provider.models import access_token_expires_in
+
+        kwargs["token_expires_in"] = access_token_expires_in
+        if self.ACCESS_TOKEN_JWT_ENABLED:
+            from oauth2_provider.jwt_tokens import generate_jwt_access_token
+
+            kwargs["token_generator"] = generate_jwt_access_token
+            # oauthlib falls back to token_generator for refresh tokens
+            kwargs["refresh_token_generator"] = self.REFRESH_TOKEN_GENERATOR or random_token_generator
         kwargs.update(self.EXTRA_SERVER_KWARGS)
         return kwargs
 
@@ -0,0 +1,123 @@
+"""
+Structured access and refresh tokens.
+
+``generate_access_token`` and ``generate_refresh_token``, set as
+``ACCESS_TOKEN_GENERATOR`` and ``REFRESH_TOKEN_GENERATOR``, issue tokens of the
+form ``<prefix>_<type>[_<shard>]_<random>_<checksum>``, for instance
+``dot_at_eu1_Wm3QyXhR0vB9kNcT2sJdLpA8fGzE5u_1Bq7Zk``:
+
+* the prefix is ``STRUCTURED_TOKEN_PREFIX``;
+* the type is ``at`` for access tokens and ``rt`` for refresh tokens;
+* the shard is ``STRUCTURED_TOKEN_SHARD``, if set, to route tokens to the
+  deployment that issued them;
+* the checksum is a CRC32, or an HMAC-SHA256 keyed with ``SECRET_KEY`` if
+  ``STRUCTURED_TOKEN_CHECKSUM`` is ``"hmac"``, of the rest of the token.
+
+With ``STRUCTURED_TOKENS_ENABLED``, tokens with the prefix but a wrong checksum
+or the shard of another deployment, and with ``STRUCTURED_TOKENS_ONLY`` tokens
+without the prefix, are rejected without querying the database; the type of the
+others tells which table to look them up in.
+"""
+
+import zlib
+
+from django.utils.crypto import constant_time_compare, salted_hmac
+from oauthlib.common import generate_token
+
+from .jwt_tokens import jwt_access_tokens_enabled, looks_like_jwt
+from .settings import oauth2_settings
+
+
+ACCESS_TOKEN = "access_token"
+REFRESH_TOKEN = "refresh_token"
+MALFORMED_TOKEN = "malformed"
+
+TOKEN_TYPE_TAGS = {"at": ACCESS_TOKEN, "rt": REFRESH_TOKEN}
+TOKEN_RANDOM_LENGTH = 30
+TOKEN_CHECKSUM_LENGTH = 6
+CHECKSUM_ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+CHECKSUM_HMAC_SALT = "oauth2_provider.structured_tokens"
+
+
+def _checksum(body):
+    if oauth2_settings.STRUCTURED_TOKEN_CHECKSUM == "hmac":
+        digest = salted_hmac(CHECKSUM_HMAC_SALT, body, algorithm="sha256").digest()
+        value = int.from_bytes(digest[:8], "big")
+    else:
+        value = zlib.crc32(body.encode("utf-8"))
+    chars = []
+    for _i in range(TOKEN_CHECKSUM_LENGTH):
+        value, index = divmod(value, len(CHECKSUM_ALPHABET))
+        chars.append(CHECKSUM_ALPHABET[index])
+    return "".join(chars)
+
+
+def _generate_token(type_tag):
+    parts = [oauth2_settings.STRUCTURED_TOKEN_PREFIX, type_tag]
+    if oauth2_settings.STRUCTURED_TOKEN_SHARD:
+        parts.append(oauth2_settings.STRUCTURED_TOKEN_SHARD)
+    parts.append(generate_token(TOKEN_RANDOM_LENGTH))
+    body = "_".join(parts)
+    return "%s_%s" % (body, _checksum(body))
+
+
+def generate_access_token(request):
+    return _generate_token("at")
+
+
+def generate_refresh_token(request):
+    return _generate_token("rt")
+
+
+def structured_tokens_enabled():
+    return oauth2_settings.STRUCTURED_TOKENS_ENABLED
+
+
+def _parse_token(token):
+    """
+    Return the type tag and shard of a structured token with a valid checksum, or
+    None if the token does not have the prefix, or MALFORMED_TOKEN.
+    """
+    prefix = oauth2_settings.STRUCTURED_TOKEN_PREFIX + "_"
+    if not token.startswith(prefix):
+        return None
+    body, _sep, checksum = token.rpartition("_")
+    if len(checksum) != TOKEN_CHECKSUM_LENGTH or not constant_time_compare(checksum, _checksum(body)):
+        return MALFORMED_TOKEN
+    type_tag, _sep, rest = body[len(prefix) :].partition("_")
+    shard, _sep, _random = rest.rpartition("_")
+    return type_tag, shard
+
+
+def get_token_type(token):
+    """
+    Return the type of a token, ACCESS_TOKEN or REFRESH_TOKEN, MALFORMED_TOKEN
+    if it cannot be one of our tokens, or None if it is unknown.
+
+    Tokens tagged with a shard other than ``STRUCTURED_TOKEN_SHARD``, when set,
+    were issued by another deployment and cannot be ours. The type is unknown when
+    structured tokens are not enabled, and for tokens without the prefix, which may
+    have been issued by another generator, unless ``STRUCTURED_TOKENS_ONLY`` is set.
+    JWT access tokens are access tokens.
+    """
+    if not structured_tokens_enabled() or not token:
+        return None
+    parsed = _parse_token(token)
+    if parsed is None:
+        if jwt_access_tokens_enabled() and looks_like_jwt(token):
+            return ACCESS_TOKEN
+        return MALFORMED_TOKEN if oauth2_settings.STRUCTURED_TOKENS_ONLY else None
+    if parsed == MALFORMED_TOKEN:
+        return MALFORMED_TOKEN
+    type_tag, shard = parsed
+    if shard and oauth2_settings.STRUCTURED_TOKEN_SHARD and shard != oauth2_settings.STRUCTURED_TOKEN_SHARD:
+        return MALFORMED_TOKEN
+    return TOKEN_TYPE_TAGS.get(type_tag, MALFORMED_TOKEN)
+
+
+def is_malformed_access_token(token):
+    """
+    Return whether a token presented as an access token can be rejected without
+    looking it up: it is malformed, or a refresh token.
+    """
+    return get_token_type(token) in (MALFORMED_TOKEN, REFRESH_TOKEN)
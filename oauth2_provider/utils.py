@@ -1,5 +1,7 @@
 import functools
 
+from django.contrib.auth import get_user_model
+from django.utils.functional import SimpleLazyObject, empty
 from jwcrypto import jwk
 
 
@@ -10,3 +12,38 @@ def jwk_from_pem(pem_string):
     Converting from PEM is expensive for large keys such as those using RSA.
     """
     return jwk.JWK.from_pem(pem_string.encode("utf-8"))
+
+
+class LazyUser(SimpleLazyObject):
+    """
+    A user that is only loaded when an attribute other than its primary key
+    is used. Attributes set before the user is loaded, such as the ``backend``
+    set by ``django.contrib.auth.authenticate``, are applied once it is.
+    """
+
+    def __init__(self, user_id, func):
+        self.__dict__["_user_id"] = user_id
+        self.__dict__["_pending_attrs"] = {}
+        super().__init__(func)
+
+    def _setup(self):
+        super()._setup()
+        for name, value in self._pending_attrs.items():
+            setattr(self._wrapped, name, value)
+
+    def __getattr__(self, name):
+        if self._wrapped is empty:
+            if name == "pk" or name == get_user_model()._meta.pk.attname:
+                return self._user_id
+            if name in self._pending_attrs:
+                return self._pending_attrs[name]
+        return super().__getattr__(name)
+
+    def __setattr__(self, name, value):
+        if name != "_wrapped" and self._wrapped is empty:
+            self._pending_attrs[name] = value
+        else:
+            super().__setattr__(name, value)
+
+    def __bool__(self):
+        return True
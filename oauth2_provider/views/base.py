@@ -12,10 +12,12 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.debug import sensitive_post_parameters
 from django.views.generic import FormView, View
 
+from ..cache import get_application
 from ..exceptions import OAuthToolkitError
 from ..forms import AllowForm
 from ..http import OAuth2ResponseRedirect
-from ..models import get_access_token_model, get_application_model
+from ..jwt_tokens import get_access_token_key
+from ..models import get_access_token_model, token_lookup
 from ..scopes import get_scopes_backend
 from ..settings import oauth2_settings
 from ..signals import app_authorized
@@ -110,7 +112,7 @@ class AuthorizationView(BaseAuthorizationView, FormView):
 
     def form_valid(self, form):
         client_id = form.cleaned_data["client_id"]
-        application = get_application_model().objects.get(client_id=client_id)
+        application = get_application(client_id=client_id)
         credentials = {
             "client_id": form.cleaned_data.get("client_id"),
             "redirect_uri": form.cleaned_data.get("redirect_uri"),
@@ -156,8 +158,7 @@ class AuthorizationView(BaseAuthorizationView, FormView):
         kwargs["scopes"] = scopes
         # at this point we know an Application instance with such client_id exists in the database
 
-        # TODO: Cache this!
-        application = get_application_model().objects.get(client_id=credentials["client_id"])
+        application = get_application(client_id=credentials["client_id"])
 
         kwargs["application"] = application
         kwargs["client_id"] = credentials["client_id"]
@@ -289,7 +290,9 @@ class TokenView(OAuthLibMixin, View):
         if status == 200:
             access_token = json.loads(body).get("access_token")
             if access_token is not None:
-                token = get_access_token_model().objects.get(token=access_token)
+                token = get_access_token_model().objects.get(
+                    **token_lookup(get_access_token_key(access_token))
+                )
                 app_authorized.send(sender=self, request=request, token=token)
         response = HttpResponse(content=body, status=status)
 
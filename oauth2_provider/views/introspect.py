@@ -5,7 +5,9 @@ from django.http import JsonResponse
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 
-from oauth2_provider.models import get_access_token_model
+from oauth2_provider.jwt_tokens import get_access_token_key
+from oauth2_provider.models import get_access_token_model, token_lookup
+from oauth2_provider.structured_tokens import is_malformed_access_token
 from oauth2_provider.views.generic import ClientProtectedScopedResourceView
 
 
@@ -23,9 +25,13 @@ class IntrospectTokenView(ClientProtectedScopedResourceView):
 
     @staticmethod
     def get_token_response(token_value=None):
+        if is_malformed_access_token(token_value):
+            return JsonResponse({"active": False}, status=200)
         try:
             token = (
-                get_access_token_model().objects.select_related("user", "application").get(token=token_value)
+                get_access_token_model()
+                .objects.select_related("user", "application")
+                .get(**token_lookup(get_access_token_key(token_value)))
             )
         except ObjectDoesNotExist:
             return JsonResponse({"active": False}, status=200)
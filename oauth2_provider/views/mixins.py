@@ -5,6 +5,7 @@ from django.core.exceptions import ImproperlyConfigured, SuspiciousOperation
 from django.http import HttpResponseForbidden, HttpResponseNotFound
 
 from ..exceptions import FatalClientError
+from ..oauth2_backends import get_oauthlib_core
 from ..scopes import get_scopes_backend
 from ..settings import oauth2_settings
 
@@ -79,14 +80,20 @@ class OAuthLibMixin:
     @classmethod
     def get_oauthlib_core(cls):
         """
-        Cache and return `OAuthlibCore` instance so it will be created only on first request
+        Return the `OAuthlibCore` instance shared by the process for this view's server,
+        validator and backend classes, so it will be created only on first request
         unless ALWAYS_RELOAD_OAUTHLIB_CORE is True.
         """
-        if not hasattr(cls, "_oauthlib_core") or oauth2_settings.ALWAYS_RELOAD_OAUTHLIB_CORE:
-            server = cls.get_server()
-            core_class = cls.get_oauthlib_backend_class()
-            cls._oauthlib_core = core_class(server)
-        return cls._oauthlib_core
+        if cls.get_server.__func__ is not OAuthLibMixin.get_server.__func__:
+            # A custom get_server() cannot be shared, keep one core per view class.
+            if not hasattr(cls, "_oauthlib_core") or oauth2_settings.ALWAYS_RELOAD_OAUTHLIB_CORE:
+                server = cls.get_server()
+                core_class = cls.get_oauthlib_backend_class()
+                cls._oauthlib_core = core_class(server)
+            return cls._oauthlib_core
+        return get_oauthlib_core(
+            cls.get_server_class(), cls.get_validator_class(), cls.get_oauthlib_backend_class()
+        )
 
     def validate_authorization_request(self, request):
         """
@@ -15,6 +15,7 @@ from jwcrypto.jws import InvalidJWSObject
 from jwcrypto.jwt import JWTExpired
 from oauthlib.common import add_params_to_uri
 
+from ..cache import get_application
 from ..exceptions import (
     ClientIdMissmatch,
     InvalidIDTokenError,
@@ -25,6 +26,7 @@ from ..exceptions import (
 )
 from ..forms import ConfirmLogoutForm
 from ..http import OAuth2ResponseRedirect
+from ..jwt_tokens import get_verification_keys
 from ..models import (
     AbstractGrant,
     get_access_token_model,
@@ -123,6 +125,13 @@ class JwksInfoView(OIDCOnlyMixin, View):
                 data = {"alg": "RS256", "use": "sig", "kid": key.thumbprint()}
                 data.update(json.loads(key.export_public()))
                 keys.append(data)
+        if oauth2_settings.ACCESS_TOKEN_JWT_ENABLED:
+            known_kids = {data["kid"] for data in keys}
+            for kid, (key, algorithm) in get_verification_keys().items():
+                if kid not in known_kids:
+                    data = {"alg": algorithm, "use": "sig", "kid": kid}
+                    data.update(json.loads(key.export_public()))
+                    keys.append(data)
         response = JsonResponse({"keys": keys})
         response["Access-Control-Allow-Origin"] = "*"
         response["Cache-Control"] = (
@@ -259,7 +268,7 @@ def validate_logout_request(request, id_token_hint, client_id, post_logout_redir
     application = None
     # Determine the application that is requesting the logout.
     if client_id:
-        application = get_application_model().objects.get(client_id=client_id)
+        application = get_application(client_id=client_id)
     elif id_token:
         application = id_token.application
 
@@ -410,7 +419,7 @@ class RPInitiatedLogoutView(OIDCLogoutOnlyMixin, FormView):
 
     def get_request_application(self, id_token, client_id):
         if client_id:
-            return get_application_model().objects.get(client_id=client_id)
+            return get_application(client_id=client_id)
         if id_token:
             return id_token.application
 
@@ -0,0 +1,34 @@
+from django.db import migrations
+
+import oauth2_provider.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tests", "0005_basetestapplication_allowed_origins_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sampleaccesstoken",
+            name="token_checksum",
+            field=oauth2_provider.models.TokenChecksumField(
+                blank=True, editable=False, max_length=64, null=True, unique=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="samplegrant",
+            name="code_checksum",
+            field=oauth2_provider.models.TokenChecksumField(
+                blank=True, editable=False, max_length=64, null=True, source_field="code", unique=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="samplerefreshtoken",
+            name="token_checksum",
+            field=oauth2_provider.models.TokenChecksumField(
+                blank=True, db_index=True, editable=False, max_length=64, null=True
+            ),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tests", "0006_sampleaccesstoken_token_checksum_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="samplerefreshtoken",
+            name="previous_token_checksum",
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64, null=True),
+        ),
+    ]
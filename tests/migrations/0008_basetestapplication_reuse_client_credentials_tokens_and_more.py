@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tests", "0007_samplerefreshtoken_previous_token_checksum"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="basetestapplication",
+            name="reuse_client_credentials_tokens",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name="sampleapplication",
+            name="reuse_client_credentials_tokens",
+            field=models.BooleanField(default=False),
+        ),
+    ]
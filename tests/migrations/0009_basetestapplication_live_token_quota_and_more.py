@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tests", "0008_basetestapplication_reuse_client_credentials_tokens_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="basetestapplication",
+            name="live_token_quota",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="sampleapplication",
+            name="live_token_quota",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
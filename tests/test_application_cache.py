@@ -0,0 +1,109 @@
+import pytest
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from oauth2_provider.cache import APPLICATION_VERSION_KEY, get_application, get_applications
+from oauth2_provider.models import get_application_model
+
+from .utils import get_basic_auth_header
+
+
+Application = get_application_model()
+
+CLEARTEXT_SECRET = "1234567890abcdefghijklmnopqrstuvwxyz"
+
+SHARED_CACHE_SETTINGS = {"APPLICATION_CACHE_ALIAS": "default"}
+LOCAL_CACHE_SETTINGS = {"APPLICATION_LOCAL_CACHE_MAX_ENTRIES": 10}
+
+
+@pytest.fixture
+def application_cache():
+    cache = caches["default"]
+    cache.clear()
+    yield cache
+    cache.clear()
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(SHARED_CACHE_SETTINGS)
+def test_application_is_served_from_shared_cache(
+    oauth2_settings, application_cache, application, django_assert_num_queries
+):
+    with django_assert_num_queries(1):
+        assert get_application(client_id=application.client_id) == application
+    with django_assert_num_queries(0):
+        assert get_application(client_id=application.client_id).name == application.name
+        assert get_application(pk=application.pk) == application
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(SHARED_CACHE_SETTINGS)
+def test_save_invalidates_shared_cache(oauth2_settings, application_cache, application):
+    get_application(client_id=application.client_id)
+    application.name = "Renamed"
+    application.save()
+    assert get_application(client_id=application.client_id).name == "Renamed"
+
+    # Another process saved the application: only the version is shared.
+    Application.objects.filter(pk=application.pk).update(name="Renamed again")
+    assert get_application(pk=application.pk).name == "Renamed"
+    application_cache.incr(APPLICATION_VERSION_KEY)
+    assert get_application(pk=application.pk).name == "Renamed again"
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(LOCAL_CACHE_SETTINGS)
+def test_application_is_served_from_local_cache(oauth2_settings, application, django_assert_num_queries):
+    with django_assert_num_queries(1):
+        get_application(client_id=application.client_id)
+    with django_assert_num_queries(0):
+        assert get_application(pk=application.pk) == application
+
+    client_id = application.client_id
+    application.delete()
+    with pytest.raises(Application.DoesNotExist):
+        get_application(client_id=client_id)
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(SHARED_CACHE_SETTINGS)
+def test_missing_applications_are_loaded_at_once(
+    oauth2_settings, application_cache, application, django_assert_num_queries
+):
+    other = Application.objects.create(
+        name="Other application",
+        client_type=Application.CLIENT_PUBLIC,
+        authorization_grant_type=Application.GRANT_CLIENT_CREDENTIALS,
+    )
+    client_ids = [other.client_id, "unknown", application.client_id]
+    with django_assert_num_queries(1):
+        assert get_applications(client_ids) == [other, application]
+    with django_assert_num_queries(1):
+        assert get_applications(client_ids) == [other, application]
+    with django_assert_num_queries(0):
+        assert get_applications([application.client_id, other.client_id]) == [application, other]
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(dict(SHARED_CACHE_SETTINGS, **LOCAL_CACHE_SETTINGS))
+def test_token_endpoint_does_not_query_applications(oauth2_settings, application_cache, client):
+    application = Application.objects.create(
+        name="Client credentials application",
+        client_type=Application.CLIENT_CONFIDENTIAL,
+        authorization_grant_type=Application.GRANT_CLIENT_CREDENTIALS,
+        client_secret=CLEARTEXT_SECRET,
+    )
+
+    def request_token():
+        return client.post(
+            reverse("oauth2_provider:token"),
+            data={"grant_type": "client_credentials"},
+            **get_basic_auth_header(application.client_id, CLEARTEXT_SECRET),
+        )
+
+    assert request_token().status_code == 200
+    with CaptureQueriesContext(connection) as queries:
+        assert request_token().status_code == 200
+    assert not [query for query in queries if 'FROM "%s"' % Application._meta.db_table in query["sql"]]
@@ -8,10 +8,13 @@ from django.http import HttpResponse
 from django.test import RequestFactory, TestCase
 from django.test.utils import modify_settings, override_settings
 from django.utils.timezone import now, timedelta
+from rest_framework.request import Request
 
 from oauth2_provider.backends import OAuth2Backend
+from oauth2_provider.contrib.rest_framework import OAuth2Authentication
 from oauth2_provider.middleware import OAuth2ExtraTokenMiddleware, OAuth2TokenMiddleware
 from oauth2_provider.models import get_access_token_model, get_application_model
+from oauth2_provider.views import ProtectedResourceView
 
 
 UserModel = get_user_model()
@@ -62,7 +65,7 @@ class TestOAuth2Backend(BaseTest):
         with pytest.raises(SuspiciousOperation):
             OAuth2Backend().authenticate(**credentials)
 
-    @patch("oauth2_provider.backends.OAuthLibCore.verify_request")
+    @patch("oauth2_provider.oauth2_backends.OAuthLibCore.verify_request")
     def test_value_errors_are_reraised(self, patched_verify_request):
         patched_verify_request.side_effect = ValueError("Generic error")
 
@@ -137,6 +140,19 @@ class TestOAuth2Middleware(BaseTest):
         m(request)
         self.assertEqual(request.user, self.user)
 
+    def test_middleware_user_is_lazy(self):
+        m = OAuth2TokenMiddleware(self.dummy_get_response)
+        auth_headers = {
+            "HTTP_AUTHORIZATION": "Bearer " + "tokstr",
+        }
+        request = self.factory.get("/a-resource", **auth_headers)
+        with self.assertNumQueries(1):
+            m(request)
+            self.assertEqual(request.user.pk, self.user.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(request.user.username, self.user.username)
+        self.assertEqual(request.user.backend, "oauth2_provider.backends.OAuth2Backend")
+
     def test_middleware_response(self):
         m = OAuth2TokenMiddleware(self.dummy_get_response)
         auth_headers = {
@@ -202,6 +218,45 @@ class TestOAuth2ExtraTokenMiddleware(BaseTest):
         m(request)
         self.assertEqual(request.access_token, self.token)
 
+    def test_middleware_expired_token(self):
+        expired = AccessTokenModel.objects.create(
+            user=self.user, token="expiredtokstr", application=self.app, expires=now() - timedelta(days=1)
+        )
+        m = OAuth2ExtraTokenMiddleware(self.dummy_get_response)
+        auth_headers = {
+            "HTTP_AUTHORIZATION": "Bearer " + "expiredtokstr",
+        }
+        request = self.factory.get("/a-resource", **auth_headers)
+        m(request)
+        self.assertEqual(request.access_token, expired)
+
+    def test_middleware_invalid_hex_in_query_params(self):
+        m = OAuth2ExtraTokenMiddleware(self.dummy_get_response)
+        auth_headers = {
+            "HTTP_AUTHORIZATION": "Bearer " + "tokstr",
+        }
+        request = self.factory.get("/a-resource?x=%zz", **auth_headers)
+        response = m(request)
+        self.assertIsInstance(response, HttpResponse)
+        self.assertFalse(hasattr(request, "access_token"))
+
+    def test_token_is_validated_once_per_request(self):
+        class ResourceView(ProtectedResourceView):
+            def get(self, request, *args, **kwargs):
+                return HttpResponse(request.access_token.token)
+
+        view = OAuth2TokenMiddleware(OAuth2ExtraTokenMiddleware(ResourceView.as_view()))
+        auth_headers = {
+            "HTTP_AUTHORIZATION": "Bearer " + "tokstr",
+        }
+        request = self.factory.get("/a-resource", **auth_headers)
+        with self.assertNumQueries(1):
+            response = view(request)
+            user, token = OAuth2Authentication().authenticate(Request(request))
+        self.assertEqual(response.content, b"tokstr")
+        self.assertEqual(token, self.token)
+        self.assertEqual(user.pk, self.user.pk)
+
     def test_middleware_response(self):
         m = OAuth2ExtraTokenMiddleware(self.dummy_get_response)
         auth_headers = {
@@ -4,7 +4,9 @@ from unittest.mock import patch
 import pytest
 from django.contrib.auth import get_user_model
 from django.core.exceptions import SuspiciousOperation
+from django.db import connection
 from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.views.generic import View
 from oauthlib.oauth2 import BackendApplicationServer
@@ -188,3 +190,66 @@ class TestClientResourcePasswordBased(BaseTest):
         view = ResourceView.as_view()
         response = view(request)
         self.assertEqual(response, "This is a protected resource")
+
+
+class TestReuseClientCredentialsTokens(BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.application.reuse_client_credentials_tokens = True
+        self.application.save()
+
+    def request_token(self, **data):
+        auth_headers = get_basic_auth_header(self.application.client_id, CLEARTEXT_SECRET)
+        response = self.client.post(
+            reverse("oauth2_provider:token"),
+            data=dict(grant_type="client_credentials", **data),
+            **auth_headers,
+        )
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content.decode("utf-8"))
+
+    def test_live_token_is_reused(self):
+        first = self.request_token(scope="write read")
+        self.assertEqual(AccessToken.objects.get().scope, "read write")
+        second = self.request_token(scope="read write")
+        self.assertEqual(second["access_token"], first["access_token"])
+        self.assertLessEqual(second["expires_in"], first["expires_in"])
+        self.assertEqual(AccessToken.objects.count(), 1)
+
+        other_scopes = self.request_token(scope="read")
+        self.assertNotEqual(other_scopes["access_token"], first["access_token"])
+        self.assertEqual(AccessToken.objects.count(), 2)
+
+    def test_token_about_to_expire_is_not_reused(self):
+        first = self.request_token()
+        self.oauth2_settings.CLIENT_CREDENTIALS_TOKEN_MIN_LIFETIME_SECONDS = (
+            self.oauth2_settings.ACCESS_TOKEN_EXPIRE_SECONDS
+        )
+        self.assertNotEqual(self.request_token()["access_token"], first["access_token"])
+
+    def test_revoked_token_is_not_reused(self):
+        first = self.request_token()
+        AccessToken.objects.get().revoke()
+        self.assertNotEqual(self.request_token()["access_token"], first["access_token"])
+
+    def test_tokens_are_not_reused_by_default(self):
+        self.application.reuse_client_credentials_tokens = False
+        self.application.save()
+        first = self.request_token()
+        self.assertNotEqual(self.request_token()["access_token"], first["access_token"])
+        self.assertEqual(AccessToken.objects.count(), 2)
+
+    def test_application_is_locked_before_issuing_a_token(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.request_token()
+        locks = [query["sql"] for query in queries if Application._meta.db_table in query["sql"]]
+        # SQLite ignores FOR UPDATE, the lock query is run anyway.
+        self.assertEqual(len(locks), 2)
+        lookups = [query["sql"] for query in queries if AccessToken._meta.db_table in query["sql"]]
+        # The token is looked up by scope in SQL, before and after the lock.
+        self.assertIn("LIMIT 1", lookups[0])
+        self.assertIn("LIMIT 1", lookups[1])
+
+        with CaptureQueriesContext(connection) as queries:
+            self.request_token()
+        self.assertEqual(len([query for query in queries if "INSERT" in query["sql"]]), 0)
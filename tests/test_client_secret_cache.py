@@ -0,0 +1,94 @@
+import pytest
+from django.core.cache import caches
+from django.urls import reverse
+
+from oauth2_provider.hashers import check_client_secret
+from oauth2_provider.models import get_application_model
+from oauth2_provider.oauth2_validators import OAuth2Validator
+
+from .utils import get_basic_auth_header
+
+
+Application = get_application_model()
+
+CLEARTEXT_SECRET = "1234567890abcdefghijklmnopqrstuvwxyz"
+
+CACHE_SETTINGS = {"CLIENT_SECRET_CACHE_ALIAS": "default"}
+
+
+@pytest.fixture
+def secret_cache():
+    cache = caches["default"]
+    cache.clear()
+    yield cache
+    cache.clear()
+
+
+@pytest.fixture
+def hashed_secret(application):
+    return Application.objects.get(pk=application.pk).client_secret
+
+
+@pytest.fixture
+def patched_check_client_secret(mocker):
+    return mocker.patch(
+        "oauth2_provider.oauth2_validators.check_client_secret", side_effect=check_client_secret
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(CACHE_SETTINGS)
+def test_verified_secret_is_cached(oauth2_settings, secret_cache, hashed_secret, patched_check_client_secret):
+    validator = OAuth2Validator()
+    assert validator._check_secret(CLEARTEXT_SECRET, hashed_secret)
+    assert validator._check_secret(CLEARTEXT_SECRET, hashed_secret)
+    assert patched_check_client_secret.call_count == 1
+    assert all(CLEARTEXT_SECRET not in key for key in secret_cache._cache)
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(CACHE_SETTINGS)
+def test_wrong_secret_is_not_cached(
+    oauth2_settings, secret_cache, hashed_secret, patched_check_client_secret
+):
+    validator = OAuth2Validator()
+    assert not validator._check_secret("wrong secret", hashed_secret)
+    assert not validator._check_secret("wrong secret", hashed_secret)
+    assert patched_check_client_secret.call_count == 2
+
+
+@pytest.mark.django_db
+def test_cache_disabled_by_default(oauth2_settings, secret_cache, hashed_secret, patched_check_client_secret):
+    validator = OAuth2Validator()
+    assert validator._check_secret(CLEARTEXT_SECRET, hashed_secret)
+    assert validator._check_secret(CLEARTEXT_SECRET, hashed_secret)
+    assert patched_check_client_secret.call_count == 2
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(CACHE_SETTINGS)
+def test_changed_secret_is_not_served_from_cache(
+    oauth2_settings, secret_cache, client, patched_check_client_secret
+):
+    application = Application.objects.create(
+        name="Client credentials application",
+        client_type=Application.CLIENT_CONFIDENTIAL,
+        authorization_grant_type=Application.GRANT_CLIENT_CREDENTIALS,
+        client_secret=CLEARTEXT_SECRET,
+    )
+
+    def request_token(secret):
+        return client.post(
+            reverse("oauth2_provider:token"),
+            data={"grant_type": "client_credentials"},
+            **get_basic_auth_header(application.client_id, secret),
+        )
+
+    assert request_token(CLEARTEXT_SECRET).status_code == 200
+    assert request_token(CLEARTEXT_SECRET).status_code == 200
+    assert patched_check_client_secret.call_count == 1
+
+    application.client_secret = "a new secret"
+    application.save()
+    assert request_token(CLEARTEXT_SECRET).status_code == 401
+    assert request_token("a new secret").status_code == 200
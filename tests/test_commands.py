@@ -1,3 +1,4 @@
+from datetime import timedelta
 from io import StringIO
 
 import pytest
@@ -6,13 +7,23 @@ from django.contrib.auth.hashers import check_password
 from django.core.management import call_command
 from django.core.management.base import CommandError
 from django.test import TestCase
+from django.utils import timezone
 
-from oauth2_provider.models import get_application_model
+from oauth2_provider.models import (
+    get_access_token_model,
+    get_application_model,
+    get_grant_model,
+    get_refresh_token_model,
+    token_checksum,
+)
 
 from . import presets
 
 
+AccessToken = get_access_token_model()
 Application = get_application_model()
+Grant = get_grant_model()
+RefreshToken = get_refresh_token_model()
 
 
 class CreateApplicationTest(TestCase):
@@ -143,3 +154,119 @@ class CreateApplicationTest(TestCase):
         self.assertIn("user", output.getvalue())
         self.assertIn("783", output.getvalue())
         self.assertIn("does not exist", output.getvalue())
+
+
+class HashClientSecretsTest(TestCase):
+    def setUp(self):
+        self.applications = []
+        for i in range(5):
+            application = Application.objects.create(
+                name="app %d" % i,
+                client_type=Application.CLIENT_CONFIDENTIAL,
+                authorization_grant_type=Application.GRANT_CLIENT_CREDENTIALS,
+            )
+            # Store the secret in clear, as if hash_client_secret had just been enabled.
+            Application.objects.filter(pk=application.pk).update(client_secret="SECRET%d" % i)
+            self.applications.append(application)
+        self.unhashed = Application.objects.create(
+            name="unhashed",
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Application.GRANT_CLIENT_CREDENTIALS,
+            client_secret="UNHASHED",
+            hash_client_secret=False,
+        )
+
+    def secrets(self):
+        return dict(Application.objects.values_list("pk", "client_secret"))
+
+    def test_command_hashes_secrets(self):
+        output = StringIO()
+        call_command("hashclientsecrets", "--batch-size=2", "--workers=1", stdout=output)
+
+        secrets = self.secrets()
+        for i, application in enumerate(self.applications):
+            self.assertTrue(check_password("SECRET%d" % i, secrets[application.pk]))
+        self.assertEqual(secrets[self.unhashed.pk], "UNHASHED")
+        self.assertIn("Processed 2/5 applications, hashed 2 secrets", output.getvalue())
+        self.assertIn("Hashed 5 client secrets", output.getvalue())
+
+        hashed = self.secrets()
+        call_command("hashclientsecrets", stdout=StringIO())
+        self.assertEqual(self.secrets(), hashed)
+
+    def test_command_hashes_secrets_in_worker_processes(self):
+        call_command("hashclientsecrets", "--workers=2", stdout=StringIO())
+
+        secrets = self.secrets()
+        for i, application in enumerate(self.applications):
+            self.assertTrue(check_password("SECRET%d" % i, secrets[application.pk]))
+
+    def test_dry_run(self):
+        output = StringIO()
+        call_command("hashclientsecrets", "--dry-run", stdout=output)
+
+        self.assertIn("Would hash 5 client secrets", output.getvalue())
+        self.assertEqual(
+            [secret for pk, secret in self.secrets().items() if pk != self.unhashed.pk],
+            ["SECRET%d" % i for i in range(5)],
+        )
+
+    def test_start_after(self):
+        call_command("hashclientsecrets", "--start-after=%d" % self.applications[2].pk, stdout=StringIO())
+
+        secrets = self.secrets()
+        self.assertEqual(secrets[self.applications[2].pk], "SECRET2")
+        self.assertTrue(check_password("SECRET3", secrets[self.applications[3].pk]))
+
+
+class BackfillTokenChecksumsTest(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user("checksum_user", "test@example.com", "123456")
+        application = Application.objects.create(
+            name="checksums",
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Application.GRANT_AUTHORIZATION_CODE,
+            redirect_uris="http://example.org",
+            user=user,
+        )
+        expires = timezone.now() + timedelta(hours=1)
+        for i in range(3):
+            access_token = AccessToken.objects.create(
+                token="access%d" % i, user=user, application=application, expires=expires
+            )
+            RefreshToken.objects.create(
+                token="refresh%d" % i, user=user, application=application, access_token=access_token
+            )
+            Grant.objects.create(
+                code="code%d" % i,
+                user=user,
+                application=application,
+                expires=expires,
+                redirect_uri="http://example.org",
+            )
+        # Drop the checksums, as if the tokens had been issued by an older version.
+        AccessToken.objects.exclude(token="access0").update(token_checksum=None)
+        RefreshToken.objects.update(token_checksum=None)
+        Grant.objects.update(code_checksum=None)
+
+    def test_command_fills_missing_checksums(self):
+        output = StringIO()
+        call_command("backfilltokenchecksums", "--batch-size=2", stdout=output)
+
+        for model, field, checksum_field in [
+            (AccessToken, "token", "token_checksum"),
+            (RefreshToken, "token", "token_checksum"),
+            (Grant, "code", "code_checksum"),
+        ]:
+            for value, checksum in model.objects.values_list(field, checksum_field):
+                self.assertEqual(checksum, token_checksum(value))
+        self.assertIn("Filled 2 access token checksums", output.getvalue())
+        self.assertIn("Filled 3 grant checksums", output.getvalue())
+
+        output = StringIO()
+        call_command("backfilltokenchecksums", stdout=output)
+        self.assertIn("Filled 0 access token checksums", output.getvalue())
+
+    def test_invalid_batch_size(self):
+        with pytest.raises(CommandError):
+            call_command("backfilltokenchecksums", "--batch-size=0", stdout=StringIO())
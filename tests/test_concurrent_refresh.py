@@ -0,0 +1,189 @@
+import threading
+import time
+
+import pytest
+from django.core.cache import caches
+from django.db import DatabaseError, connection
+from django.test import Client
+
+from oauth2_provider.cache import refresh_token_result_cache_key
+from oauth2_provider.models import get_access_token_model, get_id_token_model, get_refresh_token_model
+from oauth2_provider.oauth2_validators import OAuth2Validator
+
+from . import presets
+from .utils import authorize, exchange, refresh
+
+
+AccessToken = get_access_token_model()
+IDToken = get_id_token_model()
+RefreshToken = get_refresh_token_model()
+
+RESULT_CACHE_SETTINGS = dict(
+    presets.OIDC_SETTINGS_RW,
+    REFRESH_TOKEN_RESULT_CACHE_ALIAS="default",
+    REFRESH_TOKEN_GRACE_PERIOD_SECONDS=10,
+    # Leave room for a slow first refresh on busy test machines.
+    REFRESH_TOKEN_RESULT_WAIT_SECONDS=5,
+    # Keep client authentication out of the measured latencies.
+    CLIENT_SECRET_HASHER="oauth2_provider.hashers.SaltedHMACSHA256Hasher",
+)
+
+REFRESHERS = 8
+
+
+@pytest.fixture
+def result_cache():
+    cache = caches["default"]
+    cache.clear()
+    yield cache
+    cache.clear()
+
+
+def refresh_concurrently(application, refresh_token, refreshers, mocker):
+    """
+    Refresh the same token from several threads at once, and return the responses
+    with the latency of each request and the time spent waiting for row locks.
+    """
+    revoke_refresh_token = OAuth2Validator._revoke_refresh_token
+    lock_waits = []
+
+    def timed_revoke_refresh_token(self, refresh_token):
+        start = time.perf_counter()
+        try:
+            return revoke_refresh_token(self, refresh_token)
+        finally:
+            lock_waits.append(time.perf_counter() - start)
+
+    mocker.patch.object(OAuth2Validator, "_revoke_refresh_token", timed_revoke_refresh_token)
+    barrier = threading.Barrier(refreshers)
+    results = [None] * refreshers
+
+    def refresher(index):
+        client = Client()
+        barrier.wait()
+        start = time.perf_counter()
+        try:
+            response = refresh(client, application, refresh_token)
+            results[index] = (response, time.perf_counter() - start)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=refresher, args=(index,)) for index in range(refreshers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, lock_waits
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.oauth2_settings(RESULT_CACHE_SETTINGS)
+def test_concurrent_refreshes_share_one_result(
+    oauth2_settings, application, test_user, client, result_cache, mocker
+):
+    token = exchange(client, application, authorize(client, application, test_user)).json()
+
+    results, lock_waits = refresh_concurrently(application, token["refresh_token"], REFRESHERS, mocker)
+    responses = [response.json() for response, _latency in results]
+
+    assert all(response.status_code == 200 for response, _latency in results)
+    assert len({response["access_token"] for response in responses}) == 1
+    assert len({response["refresh_token"] for response in responses}) == 1
+    # Only the first request revoked the refresh token, the others waited for its result.
+    assert len(lock_waits) == 1
+    assert AccessToken.objects.count() == 1
+    assert RefreshToken.objects.filter(revoked__isnull=True).count() == 1
+
+    # The new refresh token is not affected.
+    assert refresh(client, application, responses[0]["refresh_token"]).status_code == 200
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(RESULT_CACHE_SETTINGS)
+def test_recent_refresh_result_is_reused(
+    oauth2_settings, application, test_user, client, result_cache, django_capture_on_commit_callbacks
+):
+    token = exchange(client, application, authorize(client, application, test_user)).json()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        first = refresh(client, application, token["refresh_token"]).json()
+    id_tokens = IDToken.objects.count()
+    response = refresh(client, application, token["refresh_token"])
+    assert response.status_code == 200
+    assert response.json()["access_token"] == first["access_token"]
+    assert response.json()["refresh_token"] == first["refresh_token"]
+    assert response.json().get("id_token") == first.get("id_token")
+    assert response.json()["expires_in"] <= first["expires_in"]
+    assert IDToken.objects.count() == id_tokens
+
+    # The tokens came from the cache, the refresh token is only accepted during the grace period.
+    oauth2_settings.REFRESH_TOKEN_RESULT_CACHE_ALIAS = None
+    oauth2_settings.REFRESH_TOKEN_GRACE_PERIOD_SECONDS = 0
+    assert refresh(client, application, token["refresh_token"]).status_code == 400
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(RESULT_CACHE_SETTINGS)
+def test_revoked_refresh_result_is_not_reused(
+    oauth2_settings, application, test_user, client, result_cache, django_capture_on_commit_callbacks
+):
+    token = exchange(client, application, authorize(client, application, test_user)).json()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        first = refresh(client, application, token["refresh_token"]).json()
+    RefreshToken.objects.get(token=first["refresh_token"]).revoke()
+    response = refresh(client, application, token["refresh_token"])
+    assert response.status_code == 400
+    assert response.json()["error"] == "invalid_grant"
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(RESULT_CACHE_SETTINGS)
+def test_failed_refresh_is_not_pending(oauth2_settings, application, client, result_cache):
+    assert refresh(client, application, "invalid").status_code == 400
+    assert result_cache.get(refresh_token_result_cache_key("invalid")) is None
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(dict(RESULT_CACHE_SETTINGS, REFRESH_TOKEN_GRACE_PERIOD_SECONDS=0))
+def test_refresh_result_is_not_kept_without_grace_period(
+    oauth2_settings, application, test_user, client, result_cache, django_capture_on_commit_callbacks
+):
+    token = exchange(client, application, authorize(client, application, test_user)).json()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        assert refresh(client, application, token["refresh_token"]).status_code == 200
+    assert result_cache.get(refresh_token_result_cache_key(token["refresh_token"])) is None
+    assert refresh(client, application, token["refresh_token"]).status_code == 400
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(RESULT_CACHE_SETTINGS)
+def test_refresh_with_invalid_scope_is_not_pending(
+    oauth2_settings, application, test_user, client, result_cache
+):
+    token = exchange(client, application, authorize(client, application, test_user)).json()
+    key = refresh_token_result_cache_key(token["refresh_token"])
+
+    response = refresh(client, application, token["refresh_token"], scope="write")
+    assert response.status_code == 400
+    assert response.json()["error"] == "invalid_scope"
+    assert result_cache.get(key) is None
+
+    start = time.monotonic()
+    assert refresh(client, application, token["refresh_token"]).status_code == 200
+    assert time.monotonic() - start < oauth2_settings.REFRESH_TOKEN_RESULT_WAIT_SECONDS
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(RESULT_CACHE_SETTINGS)
+def test_rolled_back_refresh_is_not_pending(
+    oauth2_settings, application, test_user, client, result_cache, mocker
+):
+    token = exchange(client, application, authorize(client, application, test_user)).json()
+
+    mocker.patch.object(OAuth2Validator, "_create_refresh_token", side_effect=DatabaseError)
+    with pytest.raises(DatabaseError):
+        refresh(client, application, token["refresh_token"])
+    assert result_cache.get(refresh_token_result_cache_key(token["refresh_token"])) is None
+    assert RefreshToken.objects.get().revoked is None
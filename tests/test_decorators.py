@@ -1,11 +1,16 @@
+import asyncio
 from datetime import timedelta
+from unittest import mock
 
+from asgiref.sync import async_to_sync
 from django.contrib.auth import get_user_model
-from django.test import RequestFactory, TestCase
+from django.test import RequestFactory, TestCase, override_settings
 from django.utils import timezone
+from oauthlib.oauth2 import Server
 
 from oauth2_provider.decorators import protected_resource, rw_protected_resource
 from oauth2_provider.models import get_access_token_model, get_application_model
+from oauth2_provider.scopes import get_scopes_backend
 
 
 Application = get_application_model()
@@ -87,3 +92,75 @@ class TestProtectedResourceDecorator(TestCase):
         request = self.request_factory.get("/fake-resource", **auth_headers)
         response = scoped_view(request)
         self.assertEqual(response.status_code, 403)
+
+    def test_rw_protected_scopes_per_method(self):
+        self.access_token.scope = "read"
+        self.access_token.save()
+        auth_headers = {
+            "HTTP_AUTHORIZATION": "Bearer " + self.access_token.token,
+        }
+
+        with mock.patch(
+            "oauth2_provider.decorators.get_scopes_backend", wraps=get_scopes_backend
+        ) as scopes_backend:
+
+            @rw_protected_resource()
+            def scoped_view(request, *args, **kwargs):
+                return "read only contents"
+
+            for _ in range(3):
+                response = scoped_view(self.request_factory.get("/fake-resource", **auth_headers))
+                self.assertEqual(response, "read only contents")
+                response = scoped_view(self.request_factory.post("/fake-resource", **auth_headers))
+                self.assertEqual(response.status_code, 403)
+        self.assertEqual(scopes_backend.call_count, 1)
+
+    def test_rw_protected_honours_settings_changes(self):
+        self.access_token.scope = "read"
+        self.access_token.save()
+        auth_headers = {
+            "HTTP_AUTHORIZATION": "Bearer " + self.access_token.token,
+        }
+
+        @rw_protected_resource()
+        def scoped_view(request, *args, **kwargs):
+            return "read only contents"
+
+        response = scoped_view(self.request_factory.get("/fake-resource", **auth_headers))
+        self.assertEqual(response, "read only contents")
+        with override_settings(
+            OAUTH2_PROVIDER={"SCOPES": {"view": "View", "write": "Write"}, "READ_SCOPE": "view"}
+        ):
+            response = scoped_view(self.request_factory.get("/fake-resource", **auth_headers))
+            self.assertEqual(response.status_code, 403)
+
+    def test_async_view(self):
+        @protected_resource(scopes=["read"])
+        async def view(request, *args, **kwargs):
+            return "async protected contents"
+
+        self.assertTrue(asyncio.iscoroutinefunction(view))
+        auth_headers = {
+            "HTTP_AUTHORIZATION": "Bearer " + self.access_token.token,
+        }
+        request = self.request_factory.get("/fake-resource", **auth_headers)
+        self.assertEqual(async_to_sync(view)(request), "async protected contents")
+        self.assertEqual(request.resource_owner, self.user)
+
+        response = async_to_sync(view)(self.request_factory.get("/fake-resource"))
+        self.assertEqual(response.status_code, 403)
+
+    def test_custom_server_is_built_with_validator_only(self):
+        class ValidatorOnlyServer(Server):
+            def __init__(self, request_validator):
+                super().__init__(request_validator)
+
+        @protected_resource(server_cls=ValidatorOnlyServer)
+        def view(request, *args, **kwargs):
+            return "protected contents"
+
+        auth_headers = {
+            "HTTP_AUTHORIZATION": "Bearer " + self.access_token.token,
+        }
+        request = self.request_factory.get("/fake-resource", **auth_headers)
+        self.assertEqual(view(request), "protected contents")
@@ -0,0 +1,132 @@
+import json
+import tempfile
+
+import pytest
+from django.core.cache import caches
+from django.test import override_settings
+
+from oauth2_provider.cache import grant_cache_key
+from oauth2_provider.models import get_access_token_model, get_grant_model, get_refresh_token_model
+from oauth2_provider.oauth2_validators import OAuth2Validator
+
+from . import presets, test_authorization_code
+from .utils import authorize, exchange
+
+
+AccessToken = get_access_token_model()
+Grant = get_grant_model()
+RefreshToken = get_refresh_token_model()
+
+GRANT_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "locmem": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "grants"},
+}
+
+
+def file_grant_caches(location):
+    return dict(
+        GRANT_CACHES,
+        file={"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": location},
+    )
+
+
+class GrantCacheMixin:
+    grant_cache_alias = None
+
+    def setUp(self):
+        super().setUp()
+        self.oauth2_settings.GRANT_CACHE_ALIAS = self.grant_cache_alias
+        caches[self.grant_cache_alias].clear()
+
+    def tearDown(self):
+        caches[self.grant_cache_alias].clear()
+        super().tearDown()
+
+
+class FileGrantCacheMixin(GrantCacheMixin):
+    grant_cache_alias = "file"
+
+    def setUp(self):
+        location = tempfile.TemporaryDirectory(prefix="oauth2_provider_grants")
+        self.addCleanup(location.cleanup)
+        file_caches = override_settings(CACHES=file_grant_caches(location.name))
+        file_caches.enable()
+        self.addCleanup(file_caches.disable)
+        super().setUp()
+
+
+# The code flow test suite, with grants stored in each cache backend.
+
+
+@override_settings(CACHES=GRANT_CACHES)
+class TestLocMemCacheAuthorizationCodeTokenView(
+    GrantCacheMixin, test_authorization_code.TestAuthorizationCodeTokenView
+):
+    grant_cache_alias = "locmem"
+
+
+class TestFileCacheAuthorizationCodeTokenView(
+    FileGrantCacheMixin, test_authorization_code.TestAuthorizationCodeTokenView
+):
+    pass
+
+
+@override_settings(CACHES=GRANT_CACHES)
+class TestLocMemCacheOIDCAuthorizationCodeTokenView(
+    GrantCacheMixin, test_authorization_code.TestOIDCAuthorizationCodeTokenView
+):
+    grant_cache_alias = "locmem"
+
+
+class TestFileCacheOIDCAuthorizationCodeTokenView(
+    FileGrantCacheMixin, test_authorization_code.TestOIDCAuthorizationCodeTokenView
+):
+    pass
+
+
+@pytest.fixture(params=["locmem", "file"])
+def grant_cache(request, settings, oauth2_settings, tmp_path):
+    settings.CACHES = file_grant_caches(str(tmp_path))
+    oauth2_settings.GRANT_CACHE_ALIAS = request.param
+    cache = caches[request.param]
+    cache.clear()
+    yield cache
+    cache.clear()
+
+
+@pytest.fixture
+def cached_code(grant_cache, application, test_user, client):
+    return authorize(client, application, test_user)
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(presets.OIDC_SETTINGS_RW)
+def test_grant_is_stored_in_cache(oauth2_settings, application, client, grant_cache, cached_code):
+    assert not Grant.objects.exists()
+    grant = grant_cache.get(grant_cache_key(cached_code))
+    assert grant["application_id"] == application.pk
+    assert grant["scope"] == "openid read"
+
+    assert exchange(client, application, cached_code).status_code == 200
+    assert grant_cache.get(grant_cache_key(cached_code)) is None
+    assert exchange(client, application, cached_code).status_code == 400
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(presets.OIDC_SETTINGS_RW)
+def test_concurrent_redemption_is_rejected(
+    oauth2_settings, application, client, grant_cache, cached_code, mocker
+):
+    save_bearer_token = OAuth2Validator.save_bearer_token
+
+    def redeemed_concurrently(self, token, request, *args, **kwargs):
+        # Another request exchanged the same code in the meantime.
+        grant_cache.delete(grant_cache_key(cached_code))
+        save_bearer_token(self, token, request, *args, **kwargs)
+
+    mocker.patch.object(OAuth2Validator, "save_bearer_token", redeemed_concurrently)
+    response = exchange(client, application, cached_code)
+    assert response.status_code == 400
+    assert json.loads(response.content)["error"] == "invalid_grant"
+    assert not AccessToken.objects.exists()
+    assert not RefreshToken.objects.exists()
@@ -0,0 +1,52 @@
+import json
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from oauth2_provider.models import get_access_token_model, get_grant_model, get_refresh_token_model
+from oauth2_provider.oauth2_validators import OAuth2Validator
+
+from . import presets
+from .utils import authorize, exchange
+
+
+AccessToken = get_access_token_model()
+Grant = get_grant_model()
+RefreshToken = get_refresh_token_model()
+
+pytestmark = pytest.mark.oauth2_settings(presets.OIDC_SETTINGS_RW)
+
+
+@pytest.fixture
+def code(oauth2_settings, application, test_user, client):
+    return authorize(client, application, test_user)
+
+
+@pytest.mark.django_db
+def test_grant_is_loaded_once(oauth2_settings, application, client, code):
+    with CaptureQueriesContext(connection) as queries:
+        response = exchange(client, application, code)
+    assert response.status_code == 200
+    grant_queries = [query["sql"] for query in queries if Grant._meta.db_table in query["sql"]]
+    assert len(grant_queries) == 2
+    assert grant_queries[0].startswith("SELECT")
+    assert grant_queries[1].startswith("DELETE")
+    assert not Grant.objects.exists()
+
+
+@pytest.mark.django_db
+def test_concurrent_redemption_is_rejected(oauth2_settings, application, client, code, mocker):
+    save_bearer_token = OAuth2Validator.save_bearer_token
+
+    def redeemed_concurrently(self, token, request, *args, **kwargs):
+        # Another request exchanged the same code in the meantime.
+        Grant.objects.all().delete()
+        save_bearer_token(self, token, request, *args, **kwargs)
+
+    mocker.patch.object(OAuth2Validator, "save_bearer_token", redeemed_concurrently)
+    response = exchange(client, application, code)
+    assert response.status_code == 400
+    assert json.loads(response.content)["error"] == "invalid_grant"
+    assert not AccessToken.objects.exists()
+    assert not RefreshToken.objects.exists()
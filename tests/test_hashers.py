@@ -0,0 +1,71 @@
+import pytest
+from django.contrib.auth.hashers import check_password
+from django.urls import reverse
+
+from oauth2_provider.hashers import SaltedHMACSHA256Hasher, check_client_secret
+from oauth2_provider.models import get_application_model
+
+from .utils import get_basic_auth_header
+
+
+Application = get_application_model()
+
+CLEARTEXT_SECRET = "1234567890abcdefghijklmnopqrstuvwxyz"
+
+HMAC_SETTINGS = {"CLIENT_SECRET_HASHER": "oauth2_provider.hashers.SaltedHMACSHA256Hasher"}
+
+
+@pytest.fixture
+def application(oauth2_settings):
+    return Application.objects.create(
+        name="Client credentials application",
+        client_type=Application.CLIENT_CONFIDENTIAL,
+        authorization_grant_type=Application.GRANT_CLIENT_CREDENTIALS,
+        client_secret=CLEARTEXT_SECRET,
+    )
+
+
+def request_token(client, application, secret=CLEARTEXT_SECRET):
+    return client.post(
+        reverse("oauth2_provider:token"),
+        data={"grant_type": "client_credentials"},
+        **get_basic_auth_header(application.client_id, secret),
+    )
+
+
+def stored_secret(application):
+    return Application.objects.values_list("client_secret", flat=True).get(pk=application.pk)
+
+
+def test_salted_hmac_sha256_hasher():
+    hasher = SaltedHMACSHA256Hasher()
+    encoded = hasher.encode(CLEARTEXT_SECRET, hasher.salt())
+    assert encoded.startswith("hmac_sha256$")
+    assert hasher.verify(CLEARTEXT_SECRET, encoded)
+    assert not hasher.verify("wrong secret", encoded)
+    assert hasher.encode(CLEARTEXT_SECRET, hasher.salt()) != encoded
+    assert check_client_secret(CLEARTEXT_SECRET, encoded)
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(HMAC_SETTINGS)
+def test_new_secret_is_hashed_with_configured_hasher(application):
+    assert application.client_secret.startswith("hmac_sha256$")
+    assert check_client_secret(CLEARTEXT_SECRET, application.client_secret)
+
+
+@pytest.mark.django_db
+def test_secret_is_rehashed_on_successful_authentication(oauth2_settings, application, client):
+    assert check_password(CLEARTEXT_SECRET, stored_secret(application))
+
+    oauth2_settings.CLIENT_SECRET_HASHER = SaltedHMACSHA256Hasher
+    assert request_token(client, application, "wrong secret").status_code == 401
+    assert not stored_secret(application).startswith("hmac_sha256$")
+    assert request_token(client, application).status_code == 200
+    assert stored_secret(application).startswith("hmac_sha256$")
+    assert request_token(client, application).status_code == 200
+
+    # Going back to the default hasher works the same way.
+    oauth2_settings.CLIENT_SECRET_HASHER = None
+    assert request_token(client, application).status_code == 200
+    assert check_password(CLEARTEXT_SECRET, stored_secret(application))
@@ -0,0 +1,183 @@
+import time
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from jwcrypto import jwk, jwt
+from oauthlib.common import Request
+
+from oauth2_provider.jwt_tokens import decode_access_token, encode_access_token
+from oauth2_provider.models import get_access_token_model, get_application_model
+from oauth2_provider.oauth2_validators import OAuth2Validator
+
+from . import presets
+from .conftest import generate_access_token
+from .utils import authorize, exchange, get_basic_auth_header
+
+
+AccessToken = get_access_token_model()
+Application = get_application_model()
+
+CLEARTEXT_SECRET = "1234567890abcdefghijklmnopqrstuvwxyz"
+
+JWT_SETTINGS = dict(presets.OIDC_SETTINGS_RW, ACCESS_TOKEN_JWT_ENABLED=True)
+
+EC_PRIVATE_KEY = (
+    jwk.JWK.generate(kty="EC", crv="P-256").export_to_pem(private_key=True, password=None).decode("utf-8")
+)
+
+
+@pytest.fixture
+def jwt_tokens(oauth2_settings, application, test_user, client):
+    return generate_access_token(
+        oauth2_settings, application, test_user, client, JWT_SETTINGS, "openid read", "http://example.org"
+    )
+
+
+def validate(token, request=None):
+    return OAuth2Validator().validate_bearer_token(token, ["read"], request or Request("/"))
+
+
+def claims_of(token):
+    return decode_access_token(token, check_expiry=False)
+
+
+@pytest.mark.django_db
+def test_access_token_is_signed_jwt(jwt_tokens, test_user, application):
+    claims = claims_of(jwt_tokens.access_token)
+    assert jwt.JWT(jwt=jwt_tokens.access_token).token.jose_header["typ"] == "at+jwt"
+    assert claims["sub"] == str(test_user.pk)
+    assert claims["client_id"] == application.client_id
+    assert claims["scope"] == "openid read"
+    assert claims["exp"] > time.time()
+    access_token = AccessToken.objects.get(token=claims["jti"])
+    assert access_token.user == test_user
+
+
+@pytest.mark.django_db
+def test_jwt_access_token_is_valid(jwt_tokens, test_user, client):
+    request = Request("/")
+    assert validate(jwt_tokens.access_token, request)
+    assert request.user == test_user
+    assert request.client == jwt_tokens.application
+
+    response = client.get(
+        reverse("oauth2_provider:user-info"), HTTP_AUTHORIZATION="Bearer " + jwt_tokens.access_token
+    )
+    assert response.status_code == 200
+    assert response.json()["sub"] == str(test_user.pk)
+
+
+@pytest.mark.django_db
+def test_invalid_jwt_rejected_without_query(jwt_tokens, django_assert_num_queries):
+    header, payload, signature = jwt_tokens.access_token.split(".")
+    tampered = ".".join([header, payload[:-4] + "AAAA", signature])
+    expired = encode_access_token(dict(claims_of(jwt_tokens.access_token), exp=int(time.time()) - 3600))
+    with django_assert_num_queries(0):
+        assert not validate(tampered)
+        assert not validate(expired)
+        # ID tokens are signed with the same key but are not access tokens.
+        assert not validate(jwt_tokens.id_token)
+
+
+@pytest.mark.django_db
+def test_revoked_jwt_is_rejected(jwt_tokens):
+    assert OAuth2Validator().revoke_token(jwt_tokens.access_token, "access_token", Request("/")) is None
+    assert not AccessToken.objects.filter(token=claims_of(jwt_tokens.access_token)["jti"]).exists()
+    assert not validate(jwt_tokens.access_token)
+
+
+@pytest.mark.django_db
+def test_jwt_built_from_claims_when_not_revoked(jwt_tokens, test_user):
+    jwt_tokens.oauth2_settings.ACCESS_TOKEN_REVOCATION_FILTER_ENABLED = True
+    request = Request("/")
+    with CaptureQueriesContext(connection) as queries:
+        assert validate(jwt_tokens.access_token, request)
+    assert not any(AccessToken._meta.db_table in query["sql"] for query in queries)
+    assert request.user.pk == test_user.pk
+    assert request.client == jwt_tokens.application
+    assert sorted(request.scopes) == ["openid", "read"]
+    assert request.access_token.token == claims_of(jwt_tokens.access_token)["jti"]
+
+
+@pytest.mark.django_db
+def test_jwt_of_deleted_user_is_rejected(jwt_tokens, test_user):
+    jwt_tokens.oauth2_settings.ACCESS_TOKEN_REVOCATION_FILTER_ENABLED = True
+    assert validate(jwt_tokens.access_token)
+    test_user.delete()
+    assert not validate(jwt_tokens.access_token)
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(
+    dict(
+        presets.DEFAULT_SCOPES_RW, ACCESS_TOKEN_JWT_ENABLED=True, ACCESS_TOKEN_JWT_PRIVATE_KEY=EC_PRIVATE_KEY
+    )
+)
+def test_client_credentials_jwt_signed_with_ec_key(oauth2_settings, client):
+    application = Application.objects.create(
+        name="JWT client credentials",
+        client_type=Application.CLIENT_CONFIDENTIAL,
+        authorization_grant_type=Application.GRANT_CLIENT_CREDENTIALS,
+        client_secret=CLEARTEXT_SECRET,
+    )
+    response = client.post(
+        reverse("oauth2_provider:token"),
+        data={"grant_type": "client_credentials"},
+        **get_basic_auth_header(application.client_id, CLEARTEXT_SECRET),
+    )
+    assert response.status_code == 200
+    token = response.json()["access_token"]
+    assert jwt.JWT(jwt=token).token.jose_header["alg"] == "ES256"
+    assert claims_of(token)["sub"] == application.client_id
+    assert validate(token)
+
+
+@pytest.mark.django_db
+def test_refresh_within_grace_period_returns_jwt(oauth2_settings, application, test_user, client):
+    tokens = generate_access_token(
+        oauth2_settings,
+        application,
+        test_user,
+        client,
+        dict(JWT_SETTINGS, REFRESH_TOKEN_GRACE_PERIOD_SECONDS=120),
+        "openid read",
+        "http://example.org",
+    )
+    refresh_token = AccessToken.objects.get(token=claims_of(tokens.access_token)["jti"]).refresh_token
+    data = {
+        "grant_type": "refresh_token",
+        "refresh_token": refresh_token.token,
+        "client_id": application.client_id,
+        "client_secret": CLEARTEXT_SECRET,
+    }
+    first = client.post(reverse("oauth2_provider:token"), data=data).json()
+    second = client.post(reverse("oauth2_provider:token"), data=data).json()
+    assert claims_of(first["access_token"])["jti"] == claims_of(second["access_token"])["jti"]
+    assert claims_of(first["access_token"])["jti"] != claims_of(tokens.access_token)["jti"]
+    assert validate(second["access_token"])
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(dict(JWT_SETTINGS, ACCESS_TOKEN_JWT_PRIVATE_KEY=EC_PRIVATE_KEY))
+def test_jwks_publishes_access_token_keys(oauth2_settings, client):
+    keys = client.get(reverse("oauth2_provider:jwks-info")).json()["keys"]
+    kid = jwk.JWK.from_pem(EC_PRIVATE_KEY.encode("utf-8")).thumbprint()
+    assert {"kid": kid, "alg": "ES256", "use": "sig", "kty": "EC"}.items() <= next(
+        key for key in keys if key["kid"] == kid
+    ).items()
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(dict(JWT_SETTINGS, ACCESS_TOKEN_EXPIRE_JITTER=0.2))
+def test_jwt_expiry_matches_jittered_lifetime(oauth2_settings, application, test_user, client, mocker):
+    mocker.patch("oauth2_provider.models.random.random", return_value=0.5)
+    token = exchange(client, application, authorize(client, application, test_user)).json()
+
+    expires_in = int(oauth2_settings.ACCESS_TOKEN_EXPIRE_SECONDS * 0.9)
+    assert token["expires_in"] == expires_in
+    claims = claims_of(token["access_token"])
+    assert claims["exp"] - claims["iat"] == expires_in
+    access_token = AccessToken.objects.get(token=claims["jti"])
+    assert abs(access_token.expires.timestamp() - claims["exp"]) < 2
@@ -0,0 +1,157 @@
+import json
+
+import pytest
+from django.core.cache import caches
+from django.db import DatabaseError, connection
+from django.test.utils import CaptureQueriesContext
+
+from oauth2_provider.cache.quotas import live_token_count_cache_key
+from oauth2_provider.models import get_access_token_model, get_application_model, get_refresh_token_model
+from oauth2_provider.oauth2_validators import OAuth2Validator
+
+from . import presets
+from .utils import CLEARTEXT_SECRET, request_token
+
+
+AccessToken = get_access_token_model()
+Application = get_application_model()
+RefreshToken = get_refresh_token_model()
+
+COUNT_CACHE_SETTINGS = dict(presets.DEFAULT_SCOPES_RW, LIVE_TOKEN_QUOTA_CACHE_ALIAS="default")
+
+
+@pytest.fixture
+def count_cache():
+    cache = caches["default"]
+    cache.clear()
+    yield cache
+    cache.clear()
+
+
+@pytest.fixture
+def quota_application(oauth2_settings, count_cache):
+    return Application.objects.create(
+        name="Quota application",
+        client_type=Application.CLIENT_CONFIDENTIAL,
+        authorization_grant_type=Application.GRANT_PASSWORD,
+        client_secret=CLEARTEXT_SECRET,
+        live_token_quota=2,
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(presets.DEFAULT_SCOPES_RW)
+def test_oldest_tokens_are_evicted(oauth2_settings, quota_application, test_user, client):
+    tokens = [request_token(client, quota_application).json() for _i in range(3)]
+
+    live_tokens = set(AccessToken.objects.values_list("token", flat=True))
+    assert live_tokens == {tokens[1]["access_token"], tokens[2]["access_token"]}
+    evicted = RefreshToken.objects.get(token=tokens[0]["refresh_token"])
+    assert evicted.revoked is not None
+    assert RefreshToken.objects.filter(revoked__isnull=True).count() == 2
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(dict(presets.DEFAULT_SCOPES_RW, LIVE_TOKEN_QUOTA_POLICY="reject"))
+def test_tokens_over_quota_are_rejected(oauth2_settings, quota_application, test_user, client):
+    tokens = [request_token(client, quota_application).json() for _i in range(2)]
+
+    response = request_token(client, quota_application)
+    assert response.status_code == 400
+    assert json.loads(response.content)["error"] == "access_denied"
+    assert AccessToken.objects.count() == 2
+
+    AccessToken.objects.get(token=tokens[0]["access_token"]).revoke()
+    assert request_token(client, quota_application).status_code == 200
+
+
+def count_token_queries(client, application, capture_on_commit_callbacks):
+    with capture_on_commit_callbacks(execute=True), CaptureQueriesContext(connection) as queries:
+        assert request_token(client, application).status_code == 200
+    return len([query for query in queries if "COUNT(" in query["sql"]])
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(COUNT_CACHE_SETTINGS)
+def test_live_tokens_are_counted_in_cache(
+    oauth2_settings, quota_application, test_user, client, django_capture_on_commit_callbacks
+):
+    oauth2_settings.LIVE_TOKEN_QUOTA_POLICY = "reject"
+    quota_application.live_token_quota = 3
+    quota_application.save()
+
+    def count():
+        return count_token_queries(client, quota_application, django_capture_on_commit_callbacks)
+
+    # The live tokens are counted once, then the count is kept in the cache.
+    assert count() == 1
+    assert count() == 0
+    AccessToken.objects.first().revoke()
+    # The cached count still includes the revoked token.
+    assert count() == 0
+    # At the quota, the tokens are counted again before rejecting the request.
+    assert count() == 1
+    assert AccessToken.objects.count() == 3
+    assert request_token(client, quota_application).status_code == 400
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(COUNT_CACHE_SETTINGS)
+def test_rolled_back_tokens_are_not_counted(
+    oauth2_settings,
+    quota_application,
+    test_user,
+    client,
+    count_cache,
+    mocker,
+    django_capture_on_commit_callbacks,
+):
+    key = live_token_count_cache_key(quota_application.pk, test_user.pk)
+    with django_capture_on_commit_callbacks(execute=True):
+        assert request_token(client, quota_application).status_code == 200
+    assert count_cache.get(key) == 1
+
+    mocker.patch.object(OAuth2Validator, "_create_refresh_token", side_effect=DatabaseError)
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        with pytest.raises(DatabaseError):
+            request_token(client, quota_application)
+    assert callbacks == []
+    assert count_cache.get(key) == 1
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(presets.DEFAULT_SCOPES_RW)
+def test_refresh_does_not_count_against_quota(oauth2_settings, quota_application, test_user, client):
+    quota_application.live_token_quota = 1
+    quota_application.save()
+    token = request_token(client, quota_application).json()
+
+    response = request_token(
+        client, quota_application, grant_type="refresh_token", refresh_token=token["refresh_token"]
+    )
+    assert response.status_code == 200
+    assert AccessToken.objects.get().token == response.json()["access_token"]
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(dict(presets.DEFAULT_SCOPES_RW, LIVE_TOKEN_QUOTA_CACHE_ALIAS=None))
+def test_live_tokens_are_counted_in_database_without_cache(
+    oauth2_settings, quota_application, test_user, client, django_capture_on_commit_callbacks
+):
+    assert count_token_queries(client, quota_application, django_capture_on_commit_callbacks) == 1
+    assert count_token_queries(client, quota_application, django_capture_on_commit_callbacks) == 1
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(COUNT_CACHE_SETTINGS)
+def test_live_token_count_expires_with_application_tokens(
+    oauth2_settings, quota_application, test_user, client, count_cache, mocker
+):
+    quota_application.access_token_expire_seconds = 60
+    quota_application.save()
+    add = mocker.spy(count_cache, "add")
+
+    assert request_token(client, quota_application).status_code == 200
+    (_key, count, timeout), _kwargs = add.call_args
+    assert count == 0
+    assert timeout == 60
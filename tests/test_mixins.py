@@ -7,7 +7,7 @@ from django.test import RequestFactory, TestCase
 from django.views.generic import View
 from oauthlib.oauth2 import Server
 
-from oauth2_provider.oauth2_backends import OAuthLibCore
+from oauth2_provider.oauth2_backends import OAuthLibCore, get_oauthlib_core
 from oauth2_provider.oauth2_validators import OAuth2Validator
 from oauth2_provider.views.mixins import (
     OAuthLibMixin,
@@ -91,6 +91,26 @@ class TestOAuthLibMixin(BaseTest):
 
         self.assertIsInstance(test_view.get_server(), Server)
 
+    def test_oauthlib_core_is_shared(self):
+        self.oauth2_settings.ALWAYS_RELOAD_OAUTHLIB_CORE = False
+
+        class TestView(OAuthLibMixin, View):
+            validator_class = OAuth2Validator
+
+        class OtherView(OAuthLibMixin, View):
+            server_class = Server
+
+        class CustomServerView(OAuthLibMixin, View):
+            @classmethod
+            def get_server(cls):
+                return Server(OAuth2Validator())
+
+        core = TestView.get_oauthlib_core()
+        self.assertIs(OtherView.get_oauthlib_core(), core)
+        self.assertIs(get_oauthlib_core(), core)
+        self.assertIsNot(CustomServerView.get_oauthlib_core(), core)
+        self.assertIs(CustomServerView.get_oauthlib_core(), CustomServerView.get_oauthlib_core())
+
     def test_custom_backend(self):
         class AnotherOauthLibBackend:
             pass
@@ -5,10 +5,12 @@ import pytest
 from django.contrib.auth import get_user_model
 from django.test import RequestFactory, TestCase
 from django.utils.timezone import now, timedelta
+from oauthlib.oauth2 import Server
 
 from oauth2_provider.backends import get_oauthlib_core
 from oauth2_provider.models import get_access_token_model, get_application_model, redirect_to_uri_allowed
 from oauth2_provider.oauth2_backends import JSONOAuthLibCore, OAuthLibCore
+from oauth2_provider.oauth2_validators import OAuth2Validator
 
 
 try:
@@ -203,6 +205,91 @@ class TestOAuthLibCore(TestCase):
         oauthlib_core.verify_request(request, scopes=[])
 
 
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "path, extra",
+    [
+        ("/fake-resource", {"HTTP_AUTHORIZATION": "Bearer fast-token"}),
+        ("/fake-resource", {"HTTP_AUTHORIZATION": "bearer fast-token"}),
+        ("/fake-resource?access_token=fast-token", {}),
+    ],
+)
+def test_verify_request_bearer_fast_path(oauth2_settings, application, test_user, path, extra):
+    oauth2_settings.BEARER_TOKEN_FAST_PATH = True
+    access_token = AccessTokenModel.objects.create(
+        token="fast-token",
+        user=test_user,
+        application=application,
+        scope="read write",
+        expires=now() + timedelta(seconds=300),
+    )
+    oauthlib_core = OAuthLibCore()
+    request = RequestFactory().get(path, **extra)
+    with mock.patch.object(OAuthLibCore, "_extract_params") as extract_params:
+        valid, r = oauthlib_core.verify_request(request, scopes=["read"])
+    extract_params.assert_not_called()
+    assert valid
+    assert r.access_token == access_token
+    assert r.user == test_user
+    assert r.client == application
+
+
+@pytest.mark.django_db
+def test_verify_request_passes_full_request_by_default(oauth2_settings, application, test_user):
+    AccessTokenModel.objects.create(
+        token="full-token",
+        user=test_user,
+        application=application,
+        scope="read",
+        expires=now() + timedelta(seconds=300),
+    )
+    request = RequestFactory().get(
+        "/fake-resource?tenant=acme", HTTP_AUTHORIZATION="Bearer full-token", HTTP_X_TENANT="acme"
+    )
+    validator = oauth2_settings.OAUTH2_VALIDATOR_CLASS
+    with mock.patch.object(
+        validator, "validate_bearer_token", autospec=True, side_effect=validator.validate_bearer_token
+    ) as validate_bearer_token:
+        assert OAuthLibCore().verify_request(request, scopes=["read"])[0]
+    r = validate_bearer_token.call_args[0][3]
+    assert r.uri == "/fake-resource?tenant=acme"
+    assert r.headers["HTTP_X_TENANT"] == "acme"
+
+
+@pytest.mark.django_db
+def test_verify_request_bearer_fast_path_form_token(oauth2_settings, application, test_user):
+    oauth2_settings.BEARER_TOKEN_FAST_PATH = True
+    AccessTokenModel.objects.create(
+        token="fast-token",
+        user=test_user,
+        application=application,
+        scope="read",
+        expires=now() + timedelta(seconds=300),
+    )
+    request = RequestFactory().post("/fake-resource", data={"access_token": "fast-token"})
+    assert OAuthLibCore().verify_request(request, scopes=["read"])[0]
+    request = RequestFactory().post("/fake-resource", data={"access_token": "unknown"})
+    assert not OAuthLibCore().verify_request(request, scopes=["read"])[0]
+
+
+def test_oauthlib_core_is_shared(oauth2_settings):
+    oauth2_settings.ALWAYS_RELOAD_OAUTHLIB_CORE = False
+    core = get_oauthlib_core()
+    assert get_oauthlib_core() is core
+    assert get_oauthlib_core(Server, OAuth2Validator, OAuthLibCore) is core
+    assert get_oauthlib_core(validator_class=mock.MagicMock) is not core
+
+    oauth2_settings.ALWAYS_RELOAD_OAUTHLIB_CORE = True
+    assert get_oauthlib_core() is not core
+
+
+def test_oauthlib_core_is_rebuilt_on_setting_change(oauth2_settings, settings):
+    oauth2_settings.ALWAYS_RELOAD_OAUTHLIB_CORE = False
+    core = get_oauthlib_core()
+    settings.OAUTH2_PROVIDER = {"ACCESS_TOKEN_EXPIRE_SECONDS": 60}
+    assert get_oauthlib_core() is not core
+
+
 @pytest.mark.parametrize(
     "uri, expected_result",
     # localhost is _not_ a loopback URI
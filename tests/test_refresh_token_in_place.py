@@ -0,0 +1,123 @@
+import datetime
+import json
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from jwcrypto import jwt
+
+from oauth2_provider.models import (
+    clear_expired,
+    get_access_token_model,
+    get_id_token_model,
+    get_refresh_token_model,
+    token_checksum,
+)
+
+from . import presets
+from .utils import authorize, exchange, refresh
+
+
+AccessToken = get_access_token_model()
+IDToken = get_id_token_model()
+RefreshToken = get_refresh_token_model()
+
+IN_PLACE_SETTINGS = dict(
+    presets.OIDC_SETTINGS_RW,
+    ROTATE_REFRESH_TOKEN_IN_PLACE=True,
+    REFRESH_TOKEN_GRACE_PERIOD_SECONDS=120,
+    REFRESH_TOKEN_EXPIRE_SECONDS=3600,
+)
+
+
+@pytest.fixture
+def token(oauth2_settings, application, test_user, client):
+    return exchange(client, application, authorize(client, application, test_user)).json()
+
+
+def introspect(client, access_token):
+    return client.get(reverse("oauth2_provider:user-info"), HTTP_AUTHORIZATION="Bearer " + access_token)
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(IN_PLACE_SETTINGS)
+def test_refresh_token_is_rotated_in_place(oauth2_settings, application, client, token, oidc_key):
+    refresh_token = RefreshToken.objects.get()
+    access_token = AccessToken.objects.get()
+
+    response = refresh(client, application, token["refresh_token"])
+    assert response.status_code == 200
+    rotated = response.json()
+    assert rotated["refresh_token"] != token["refresh_token"]
+    assert rotated["access_token"] != token["access_token"]
+
+    assert list(RefreshToken.objects.values_list("pk", flat=True)) == [refresh_token.pk]
+    assert list(AccessToken.objects.values_list("pk", flat=True)) == [access_token.pk]
+    refresh_token.refresh_from_db()
+    assert refresh_token.token == rotated["refresh_token"]
+    assert refresh_token.token_checksum == token_checksum(rotated["refresh_token"])
+    assert refresh_token.previous_token_checksum == token_checksum(token["refresh_token"])
+    assert refresh_token.revoked is None
+    assert refresh_token.access_token.token == rotated["access_token"]
+    assert refresh_token.access_token.expires > access_token.expires
+    # oauthlib 4 issues a new ID token with each refresh, which replaces the previous one.
+    assert IDToken.objects.get() == refresh_token.access_token.id_token
+    if "id_token" in rotated:
+        claims = json.loads(jwt.JWT(key=oidc_key, jwt=rotated["id_token"]).claims)
+        assert str(IDToken.objects.get().jti) == claims["jti"]
+
+    assert introspect(client, token["access_token"]).status_code == 401
+    assert introspect(client, rotated["access_token"]).status_code == 200
+    assert refresh(client, application, rotated["refresh_token"]).status_code == 200
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(IN_PLACE_SETTINGS)
+def test_previous_refresh_token_in_grace_period(oauth2_settings, application, client, token):
+    rotated = refresh(client, application, token["refresh_token"]).json()
+
+    response = refresh(client, application, token["refresh_token"])
+    assert response.status_code == 200
+    assert response.json()["access_token"] == rotated["access_token"]
+    assert response.json()["refresh_token"] == rotated["refresh_token"]
+    assert RefreshToken.objects.get().token == rotated["refresh_token"]
+
+    RefreshToken.objects.update(updated=timezone.now() - datetime.timedelta(minutes=10))
+    assert refresh(client, application, token["refresh_token"]).status_code == 400
+
+    oauth2_settings.REFRESH_TOKEN_GRACE_PERIOD_SECONDS = 0
+    RefreshToken.objects.update(updated=timezone.now())
+    assert refresh(client, application, token["refresh_token"]).status_code == 400
+    assert refresh(client, application, rotated["refresh_token"]).status_code == 200
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(IN_PLACE_SETTINGS)
+def test_only_the_last_previous_refresh_token_is_accepted(oauth2_settings, application, client, token):
+    rotated = refresh(client, application, token["refresh_token"]).json()
+    refresh(client, application, rotated["refresh_token"])
+
+    assert refresh(client, application, token["refresh_token"]).status_code == 400
+    assert refresh(client, application, rotated["refresh_token"]).status_code == 200
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(IN_PLACE_SETTINGS)
+def test_revoked_refresh_token_rotated_in_place(oauth2_settings, application, client, token):
+    rotated = refresh(client, application, token["refresh_token"]).json()
+
+    RefreshToken.objects.get().revoke()
+    assert not AccessToken.objects.exists()
+    assert refresh(client, application, rotated["refresh_token"]).status_code == 400
+    assert refresh(client, application, token["refresh_token"]).status_code == 400
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(IN_PLACE_SETTINGS)
+def test_clear_expired_after_rotation_in_place(oauth2_settings, application, client, token):
+    AccessToken.objects.update(expires=timezone.now() - datetime.timedelta(hours=2))
+    refresh(client, application, token["refresh_token"])
+
+    clear_expired()
+    assert RefreshToken.objects.count() == 1
+    assert AccessToken.objects.count() == 1
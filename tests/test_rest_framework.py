@@ -159,6 +159,16 @@ class TestOAuth2Authentication(TestCase):
         response = self.client.get("/oauth2-test/", HTTP_AUTHORIZATION=auth)
         self.assertEqual(response.status_code, 200)
 
+    def test_authentication_user_is_lazy(self):
+        auth = self._create_authorization_header(self.access_token.token)
+        request = APIRequestFactory().get("/oauth2-test/", HTTP_AUTHORIZATION=auth)
+        with self.assertNumQueries(1):
+            user, token = OAuth2Authentication().authenticate(request)
+            self.assertEqual(user.pk, self.test_user.pk)
+        self.assertEqual(token, self.access_token)
+        with self.assertNumQueries(1):
+            self.assertEqual(user.username, self.test_user.username)
+
     def test_authentication_denied(self):
         response = self.client.get("/oauth2-test/")
         self.assertEqual(response.status_code, 401)
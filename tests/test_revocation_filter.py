@@ -0,0 +1,136 @@
+import uuid
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from oauthlib.common import Request
+
+from oauth2_provider.jwt_tokens import get_access_token_key
+from oauth2_provider.models import RevokedAccessToken, clear_expired, get_access_token_model
+from oauth2_provider.oauth2_validators import OAuth2Validator
+from oauth2_provider.revocation import BloomFilter, RevocationList, get_revocation_list
+
+from . import presets
+from .conftest import generate_access_token
+
+
+AccessToken = get_access_token_model()
+
+REVOCATION_SETTINGS = dict(
+    presets.OIDC_SETTINGS_RW,
+    ACCESS_TOKEN_JWT_ENABLED=True,
+    ACCESS_TOKEN_REVOCATION_FILTER_ENABLED=True,
+    ACCESS_TOKEN_REVOCATION_FILTER_REFRESH_SECONDS=3600,
+    # The application is still loaded, keep it off the database.
+    APPLICATION_LOCAL_CACHE_MAX_ENTRIES=10,
+)
+
+
+@pytest.fixture
+def jwt_token(oauth2_settings, application, test_user, client):
+    tokens = generate_access_token(
+        oauth2_settings,
+        application,
+        test_user,
+        client,
+        REVOCATION_SETTINGS,
+        "openid read",
+        "http://example.org",
+    )
+    return tokens.access_token
+
+
+def validate(token):
+    return OAuth2Validator().validate_bearer_token(token, ["read"], Request("/"))
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom_filter = BloomFilter(1000, 0.01)
+    items = [uuid.uuid4().hex for _ in range(1000)]
+    for item in items:
+        bloom_filter.add(item)
+    assert all(item in bloom_filter for item in items)
+    false_positives = sum(uuid.uuid4().hex in bloom_filter for _ in range(10000))
+    assert false_positives < 300
+
+
+def test_revocation_list_prunes_expired_entries():
+    revocations = RevocationList(capacity=4, error_rate=0.01)
+    for i in range(4):
+        revocations.add(str(i), 100 + i)
+    assert revocations.check("3") is True
+    assert revocations.check("unknown") in (False, None)
+    revocations.prune(102)
+    assert len(revocations) == 1
+    # The filter was rebuilt from the remaining entries.
+    assert revocations.check("0") is False
+    assert revocations.check("3") is True
+
+
+@pytest.mark.django_db
+def test_unrevoked_token_needs_no_query(jwt_token, django_assert_num_queries):
+    assert validate(jwt_token)
+    with django_assert_num_queries(0):
+        assert validate(jwt_token)
+
+
+@pytest.mark.django_db
+def test_unrevoked_token_row_is_not_read_without_caches(jwt_token, oauth2_settings):
+    oauth2_settings.APPLICATION_LOCAL_CACHE_MAX_ENTRIES = 0
+    with CaptureQueriesContext(connection) as queries:
+        assert validate(jwt_token)
+    assert not any(AccessToken._meta.db_table in query["sql"] for query in queries)
+
+
+@pytest.mark.django_db
+def test_revoked_token_is_rejected_without_query(jwt_token, django_assert_num_queries):
+    access_token = AccessToken.objects.get(token=get_access_token_key(jwt_token))
+    assert validate(jwt_token)
+    access_token.revoke()
+    assert RevokedAccessToken.objects.filter(jti=access_token.token).exists()
+    with django_assert_num_queries(0):
+        assert not validate(jwt_token)
+
+
+@pytest.mark.django_db
+def test_revocation_by_other_process_is_seen_on_refresh(jwt_token, oauth2_settings):
+    jti = get_access_token_key(jwt_token)
+    assert validate(jwt_token)
+    # Another process revoked the token, this process has not refreshed its list yet.
+    RevokedAccessToken.objects.create(jti=jti, expires=timezone.now() + timedelta(hours=1))
+    assert validate(jwt_token)
+    get_revocation_list().schedule_refresh(0)
+    assert not validate(jwt_token)
+
+
+@pytest.mark.django_db
+def test_filter_false_positive_falls_back_to_database(jwt_token, mocker, django_assert_num_queries):
+    assert validate(jwt_token)
+    mocker.patch.object(RevocationList, "check", return_value=None)
+    with django_assert_num_queries(1):
+        assert validate(jwt_token)
+
+
+@pytest.mark.django_db
+def test_clear_expired_removes_expired_revocations(oauth2_settings):
+    RevokedAccessToken.objects.create(jti="expired", expires=timezone.now() - timedelta(seconds=1))
+    RevokedAccessToken.objects.create(jti="live", expires=timezone.now() + timedelta(hours=1))
+    clear_expired()
+    assert list(RevokedAccessToken.objects.values_list("jti", flat=True)) == ["live"]
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(REVOCATION_SETTINGS)
+def test_opaque_token_revocation_is_not_recorded(oauth2_settings, application, test_user):
+    access_token = AccessToken.objects.create(
+        token="opaque-bearer-token",
+        application=application,
+        user=test_user,
+        scope="read",
+        expires=timezone.now() + timedelta(hours=1),
+    )
+    access_token.revoke()
+    assert not RevokedAccessToken.objects.exists()
+    assert get_revocation_list().check("opaque-bearer-token") is False
@@ -0,0 +1,143 @@
+import json
+
+import pytest
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from oauth2_provider.models import get_access_token_model, get_application_model, get_grant_model
+from oauth2_provider.oauth2_validators import OAuth2Validator
+from oauth2_provider.sealed_codes import looks_like_sealed_code, redeem_sealed_code, unseal_grant
+
+from . import presets, test_authorization_code, test_hybrid
+from .utils import CLEARTEXT_SECRET, authorize, exchange
+
+
+AccessToken = get_access_token_model()
+Application = get_application_model()
+Grant = get_grant_model()
+
+SEALED_SETTINGS = dict(presets.OIDC_SETTINGS_RW, AUTHORIZATION_CODE_SEALED_ENABLED=True)
+
+
+class SealedCodesMixin:
+    def setUp(self):
+        super().setUp()
+        self.oauth2_settings.AUTHORIZATION_CODE_SEALED_ENABLED = True
+        caches["default"].clear()
+
+    def tearDown(self):
+        caches["default"].clear()
+        super().tearDown()
+
+
+# The code flow test suite, with sealed authorization codes.
+
+
+class TestSealedCodesAuthorizationCodeTokenView(
+    SealedCodesMixin, test_authorization_code.TestAuthorizationCodeTokenView
+):
+    pass
+
+
+class TestSealedCodesOIDCAuthorizationCodeTokenView(
+    SealedCodesMixin, test_authorization_code.TestOIDCAuthorizationCodeTokenView
+):
+    pass
+
+
+class TestSealedCodesHybridTokenView(SealedCodesMixin, test_hybrid.TestHybridTokenView):
+    pass
+
+
+@pytest.fixture
+def replay_cache():
+    cache = caches["default"]
+    cache.clear()
+    yield cache
+    cache.clear()
+
+
+@pytest.fixture
+def sealed_code(oauth2_settings, application, test_user, client, replay_cache):
+    with CaptureQueriesContext(connection) as queries:
+        code = authorize(client, application, test_user)
+    assert not [query for query in queries if Grant._meta.db_table in query["sql"]]
+    return code
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(SEALED_SETTINGS)
+def test_sealed_code_carries_the_grant(oauth2_settings, application, test_user, client, sealed_code):
+    assert looks_like_sealed_code(sealed_code)
+    assert not Grant.objects.exists()
+    grant = unseal_grant(sealed_code)
+    assert grant.client_id == application.client_id
+    assert grant.user == test_user
+    assert grant.scope == "openid read"
+    assert grant.nonce == "random_nonce_string"
+    assert not grant.is_expired()
+
+    response = exchange(client, application, sealed_code)
+    assert response.status_code == 200
+    assert "id_token" in response.json()
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(SEALED_SETTINGS)
+def test_sealed_code_is_single_use(oauth2_settings, application, client, sealed_code):
+    assert exchange(client, application, sealed_code).status_code == 200
+    response = exchange(client, application, sealed_code)
+    assert response.status_code == 400
+    assert json.loads(response.content)["error"] == "invalid_grant"
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(SEALED_SETTINGS)
+def test_concurrent_redemption_is_rejected(oauth2_settings, application, client, sealed_code, mocker):
+    save_bearer_token = OAuth2Validator.save_bearer_token
+
+    def redeemed_concurrently(self, token, request, *args, **kwargs):
+        # Another request exchanged the same code in the meantime.
+        redeem_sealed_code(sealed_code, unseal_grant(sealed_code).expires)
+        save_bearer_token(self, token, request, *args, **kwargs)
+
+    mocker.patch.object(OAuth2Validator, "save_bearer_token", redeemed_concurrently)
+    response = exchange(client, application, sealed_code)
+    assert response.status_code == 400
+    assert json.loads(response.content)["error"] == "invalid_grant"
+    assert not AccessToken.objects.exists()
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(SEALED_SETTINGS)
+def test_tampered_sealed_code_is_rejected(oauth2_settings, application, client, sealed_code):
+    header, key, iv, ciphertext, tag = sealed_code.split(".")
+    ciphertext = ("A" if ciphertext[0] != "A" else "B") + ciphertext[1:]
+    tampered = ".".join([header, key, iv, ciphertext, tag])
+    assert unseal_grant(tampered) is None
+    assert exchange(client, application, tampered).status_code == 400
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(SEALED_SETTINGS)
+def test_sealed_code_is_bound_to_its_client(oauth2_settings, application, client, sealed_code):
+    other = Application.objects.create(
+        name="Other Application",
+        redirect_uris="http://example.org",
+        client_type=Application.CLIENT_CONFIDENTIAL,
+        authorization_grant_type=Application.GRANT_AUTHORIZATION_CODE,
+        client_secret=CLEARTEXT_SECRET,
+    )
+    assert exchange(client, other, sealed_code).status_code == 400
+    assert exchange(client, application, sealed_code).status_code == 200
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(SEALED_SETTINGS)
+def test_sealing_key_rotation(oauth2_settings, application, client, sealed_code, settings):
+    oauth2_settings.AUTHORIZATION_CODE_SEALING_KEYS = ["new key", settings.SECRET_KEY]
+    assert exchange(client, application, sealed_code).status_code == 200
+
+    oauth2_settings.AUTHORIZATION_CODE_SEALING_KEYS = ["new key"]
+    assert unseal_grant(sealed_code) is None
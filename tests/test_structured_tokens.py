@@ -0,0 +1,177 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from oauthlib.common import Request
+
+from oauth2_provider import structured_tokens
+from oauth2_provider.models import get_access_token_model, get_refresh_token_model
+from oauth2_provider.oauth2_validators import OAuth2Validator
+from oauth2_provider.views.introspect import IntrospectTokenView
+
+from . import presets
+from .conftest import generate_access_token
+
+
+AccessToken = get_access_token_model()
+RefreshToken = get_refresh_token_model()
+
+STRUCTURED_SETTINGS = dict(
+    presets.OIDC_SETTINGS_RW,
+    ACCESS_TOKEN_GENERATOR="oauth2_provider.structured_tokens.generate_access_token",
+    REFRESH_TOKEN_GENERATOR="oauth2_provider.structured_tokens.generate_refresh_token",
+    STRUCTURED_TOKENS_ENABLED=True,
+)
+
+
+def wrapped_generator(request):
+    return structured_tokens.generate_access_token(request)
+
+
+def tamper(token):
+    return token[:-1] + ("A" if token[-1] != "A" else "B")
+
+
+@pytest.fixture
+def tokens(application, test_user):
+    access_token = AccessToken.objects.create(
+        token=structured_tokens.generate_access_token(None),
+        application=application,
+        user=test_user,
+        scope="read write",
+        expires=timezone.now() + timedelta(seconds=3600),
+    )
+    refresh_token = RefreshToken.objects.create(
+        token=structured_tokens.generate_refresh_token(None),
+        application=application,
+        user=test_user,
+        access_token=access_token,
+    )
+    return access_token, refresh_token
+
+
+@pytest.mark.oauth2_settings(dict(STRUCTURED_SETTINGS, STRUCTURED_TOKEN_SHARD="eu1"))
+def test_token_format(oauth2_settings):
+    token = structured_tokens.generate_access_token(None)
+    assert token.startswith("dot_at_eu1_")
+    assert structured_tokens.get_token_type(token) == structured_tokens.ACCESS_TOKEN
+    assert structured_tokens.get_token_type(tamper(token)) == structured_tokens.MALFORMED_TOKEN
+
+    token = structured_tokens.generate_refresh_token(None)
+    assert token.startswith("dot_rt_eu1_")
+    assert structured_tokens.get_token_type(token) == structured_tokens.REFRESH_TOKEN
+
+
+@pytest.mark.oauth2_settings(dict(STRUCTURED_SETTINGS, STRUCTURED_TOKEN_CHECKSUM="hmac"))
+def test_hmac_checksum(oauth2_settings, settings):
+    token = structured_tokens.generate_access_token(None)
+    assert structured_tokens.get_token_type(token) == structured_tokens.ACCESS_TOKEN
+    settings.SECRET_KEY = "another secret key"
+    assert structured_tokens.get_token_type(token) == structured_tokens.MALFORMED_TOKEN
+
+
+@pytest.mark.oauth2_settings(STRUCTURED_SETTINGS)
+def test_tokens_without_prefix(oauth2_settings):
+    assert structured_tokens.get_token_type("opaque-token") is None
+    oauth2_settings.STRUCTURED_TOKENS_ONLY = True
+    assert structured_tokens.get_token_type("opaque-token") == structured_tokens.MALFORMED_TOKEN
+
+
+@pytest.mark.oauth2_settings(STRUCTURED_SETTINGS)
+def test_tokens_of_other_shards(oauth2_settings):
+    token = structured_tokens.generate_access_token(None)
+    oauth2_settings.STRUCTURED_TOKEN_SHARD = "eu1"
+    # Issued before the shard was set.
+    assert structured_tokens.get_token_type(token) == structured_tokens.ACCESS_TOKEN
+
+    oauth2_settings.STRUCTURED_TOKEN_SHARD = "us1"
+    token = structured_tokens.generate_access_token(None)
+    oauth2_settings.STRUCTURED_TOKEN_SHARD = "eu1"
+    assert structured_tokens.get_token_type(token) == structured_tokens.MALFORMED_TOKEN
+    oauth2_settings.STRUCTURED_TOKEN_SHARD = None
+    assert structured_tokens.get_token_type(token) == structured_tokens.ACCESS_TOKEN
+
+
+def test_disabled_by_default(oauth2_settings):
+    oauth2_settings.ACCESS_TOKEN_GENERATOR = structured_tokens.generate_access_token
+    token = structured_tokens.generate_access_token(None)
+    assert structured_tokens.get_token_type(tamper(token)) is None
+
+
+@pytest.mark.oauth2_settings(
+    dict(
+        STRUCTURED_TOKENS_ENABLED=True,
+        ACCESS_TOKEN_GENERATOR="tests.test_structured_tokens.wrapped_generator",
+    )
+)
+def test_enabled_with_wrapped_generator(oauth2_settings):
+    token = wrapped_generator(None)
+    assert structured_tokens.get_token_type(token) == structured_tokens.ACCESS_TOKEN
+    assert structured_tokens.get_token_type(tamper(token)) == structured_tokens.MALFORMED_TOKEN
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(STRUCTURED_SETTINGS)
+def test_bearer_token_rejected_without_query(oauth2_settings, tokens):
+    access_token, refresh_token = tokens
+    validator = OAuth2Validator()
+    with CaptureQueriesContext(connection) as queries:
+        assert not validator.validate_bearer_token(tamper(access_token.token), ["read"], Request("/"))
+        assert not validator.validate_bearer_token(refresh_token.token, ["read"], Request("/"))
+    assert len(queries) == 0
+    assert validator.validate_bearer_token(access_token.token, ["read"], Request("/"))
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(
+    dict(
+        STRUCTURED_SETTINGS,
+        RESOURCE_SERVER_INTROSPECTION_URL="http://example.org/introspect",
+        RESOURCE_SERVER_AUTH_TOKEN="token",
+    )
+)
+def test_tampered_token_is_not_introspected(oauth2_settings, tokens, mocker):
+    access_token, _refresh_token = tokens
+    introspect = mocker.patch.object(OAuth2Validator, "_get_token_from_authentication_server")
+    request = Request("/")
+    assert not OAuth2Validator().validate_bearer_token(tamper(access_token.token), ["read"], request)
+    assert request.oauth2_error["error"] == "invalid_token"
+    introspect.assert_not_called()
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(STRUCTURED_SETTINGS)
+def test_introspection_rejected_without_query(oauth2_settings, tokens):
+    access_token, _refresh_token = tokens
+    with CaptureQueriesContext(connection) as queries:
+        response = IntrospectTokenView.get_token_response(tamper(access_token.token))
+    assert response.content == b'{"active": false}'
+    assert len(queries) == 0
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(STRUCTURED_SETTINGS)
+def test_revoke_goes_to_the_token_table(oauth2_settings, tokens):
+    access_token, refresh_token = tokens
+    validator = OAuth2Validator()
+    with CaptureQueriesContext(connection) as queries:
+        validator.revoke_token(tamper(refresh_token.token), "access_token", Request("/"))
+    assert len(queries) == 0
+
+    # The hint is wrong, but the token says it is a refresh token.
+    with CaptureQueriesContext(connection) as queries:
+        validator.revoke_token(refresh_token.token, "access_token", Request("/"))
+    assert RefreshToken._meta.db_table in queries[0]["sql"]
+    refresh_token.refresh_from_db()
+    assert refresh_token.revoked is not None
+
+
+@pytest.mark.django_db
+def test_token_flow_with_structured_tokens(oauth2_settings, application, test_user, client):
+    tokens = generate_access_token(
+        oauth2_settings, application, test_user, client, STRUCTURED_SETTINGS, "openid", "http://example.org"
+    )
+    assert tokens.access_token.startswith("dot_at_")
+    assert OAuth2Validator().validate_bearer_token(tokens.access_token, ["openid"], Request("/"))
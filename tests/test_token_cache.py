@@ -0,0 +1,262 @@
+from datetime import timedelta
+
+import pytest
+from django.core.cache import caches
+from django.utils import timezone
+from oauthlib.common import Request
+
+from oauth2_provider.cache import (
+    LocalTokenCache,
+    access_token_cache_key,
+    cache_access_token,
+    get_cached_access_token,
+    get_local_access_token_cache,
+    local_access_token_cache_stats,
+)
+from oauth2_provider.models import clear_expired, get_access_token_model, get_refresh_token_model
+from oauth2_provider.oauth2_validators import OAuth2Validator
+
+
+AccessToken = get_access_token_model()
+RefreshToken = get_refresh_token_model()
+
+CACHE_SETTINGS = {"ACCESS_TOKEN_CACHE_ALIAS": "default"}
+
+
+@pytest.fixture
+def token_cache():
+    cache = caches["default"]
+    cache.clear()
+    yield cache
+    cache.clear()
+
+
+@pytest.fixture
+def access_token(application, test_user):
+    return AccessToken.objects.create(
+        token="cached-token",
+        application=application,
+        user=test_user,
+        scope="read write",
+        expires=timezone.now() + timedelta(seconds=3600),
+    )
+
+
+def validate(token):
+    return OAuth2Validator().validate_bearer_token(token, ["read"], Request("/"))
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(CACHE_SETTINGS)
+def test_validation_is_served_from_cache(
+    oauth2_settings, token_cache, access_token, django_assert_num_queries
+):
+    with django_assert_num_queries(1):
+        assert validate(access_token.token)
+    with django_assert_num_queries(0):
+        request = Request("/")
+        assert OAuth2Validator().validate_bearer_token(access_token.token, ["read"], request)
+    assert request.user == access_token.user
+    assert request.client == access_token.application
+
+
+@pytest.mark.django_db
+def test_cache_disabled_by_default(oauth2_settings, token_cache, access_token, django_assert_num_queries):
+    assert validate(access_token.token)
+    assert token_cache.get(access_token_cache_key(access_token.token)) is None
+    with django_assert_num_queries(1):
+        assert validate(access_token.token)
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(CACHE_SETTINGS)
+def test_revoke_invalidates_cache(oauth2_settings, token_cache, access_token):
+    assert validate(access_token.token)
+    access_token.revoke()
+    assert get_cached_access_token(access_token.token) is None
+    assert not validate(access_token.token)
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(CACHE_SETTINGS)
+def test_refresh_token_revoke_invalidates_cache(oauth2_settings, token_cache, access_token, application):
+    refresh_token = RefreshToken.objects.create(
+        token="cached-refresh-token",
+        application=application,
+        user=access_token.user,
+        access_token=access_token,
+    )
+    assert validate(access_token.token)
+    refresh_token.revoke()
+    assert not validate(access_token.token)
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(CACHE_SETTINGS)
+@pytest.mark.parametrize(
+    "delete",
+    [
+        lambda access_token: access_token.user.delete(),
+        lambda access_token: access_token.application.delete(),
+        lambda access_token: AccessToken.objects.filter(pk=access_token.pk).delete(),
+    ],
+    ids=["user", "application", "queryset"],
+)
+def test_delete_invalidates_cache(oauth2_settings, token_cache, access_token, delete):
+    assert validate(access_token.token)
+    delete(access_token)
+    assert get_cached_access_token(access_token.token) is None
+    assert not validate(access_token.token)
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(CACHE_SETTINGS)
+def test_save_invalidates_cache(oauth2_settings, token_cache, access_token):
+    assert validate(access_token.token)
+    access_token.scope = "write"
+    access_token.save()
+    assert not validate(access_token.token)
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(CACHE_SETTINGS)
+def test_cached_token_of_deleted_user(oauth2_settings, token_cache, access_token):
+    assert validate(access_token.token)
+    cached = get_cached_access_token(access_token.token)
+    access_token.user.delete()
+    # Another process cached the token before the user was deleted.
+    cache_access_token(cached)
+    request = Request("/")
+    assert OAuth2Validator().validate_bearer_token(access_token.token, ["read"], request)
+    assert not request.user.is_authenticated
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(CACHE_SETTINGS)
+def test_timeout_capped_at_expiry(oauth2_settings, token_cache, access_token, mocker):
+    access_token.expires = timezone.now() + timedelta(seconds=30)
+    spy = mocker.spy(token_cache, "set")
+    cache_access_token(access_token)
+    assert spy.call_args[0][2] <= 30
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(CACHE_SETTINGS)
+def test_expired_token_is_not_cached(oauth2_settings, token_cache, access_token):
+    access_token.expires = timezone.now() - timedelta(seconds=1)
+    access_token.save()
+    assert not validate(access_token.token)
+    assert get_cached_access_token(access_token.token) is None
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(CACHE_SETTINGS)
+def test_clear_expired_invalidates_cache(oauth2_settings, token_cache, access_token):
+    # Simulate an entry cached before the token's expiry was moved into the past.
+    token_cache.set(access_token_cache_key(access_token.token), access_token)
+    AccessToken.objects.filter(pk=access_token.pk).update(expires=timezone.now() - timedelta(seconds=1))
+    clear_expired()
+    assert get_cached_access_token(access_token.token) is None
+
+
+LOCAL_CACHE_SETTINGS = {"ACCESS_TOKEN_LOCAL_CACHE_MAX_ENTRIES": 10}
+
+
+def test_local_cache_evicts_least_recently_used():
+    cache = LocalTokenCache(max_entries=2, max_bytes=1024 * 1024)
+    cache.set("a", 1, 60)
+    cache.set("b", 2, 60)
+    assert cache.get("a") == 1
+    cache.set("c", 3, 60)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_local_cache_evicts_expired_entries_first(mocker):
+    clock = mocker.patch("oauth2_provider.cache.local.time.monotonic", return_value=1000)
+    cache = LocalTokenCache(max_entries=2, max_bytes=1024 * 1024)
+    cache.set("long", 1, 60)
+    cache.set("short", 2, 5)
+    cache.get("long")
+    clock.return_value = 1010
+    cache.set("new", 3, 60)
+    stats = cache.stats()
+    assert stats["expirations"] == 1
+    assert stats["evictions"] == 0
+    assert cache.get("long") == 1
+    assert cache.get("new") == 3
+
+
+def test_local_cache_respects_byte_budget():
+    cache = LocalTokenCache(max_entries=100, max_bytes=3 * LocalTokenCache.ENTRY_OVERHEAD + 100)
+    for i in range(10):
+        cache.set(str(i), "x" * 10, 60)
+    stats = cache.stats()
+    assert stats["bytes"] <= stats["max_bytes"]
+    assert stats["entries"] < 10
+    cache.set("huge", "x" * 10000, 60)
+    assert cache.get("huge", "missing") == "missing"
+
+
+def test_local_cache_counts_hits_and_misses():
+    cache = LocalTokenCache(max_entries=10, max_bytes=1024 * 1024)
+    cache.set("a", None, 60)
+    assert cache.get("a", "missing") is None
+    assert cache.get("b", "missing") == "missing"
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(LOCAL_CACHE_SETTINGS)
+def test_local_cache_serves_validation(oauth2_settings, access_token, django_assert_num_queries):
+    assert validate(access_token.token)
+    with django_assert_num_queries(0):
+        assert validate(access_token.token)
+    assert local_access_token_cache_stats()["hits"] == 1
+    access_token.revoke()
+    assert not validate(access_token.token)
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(LOCAL_CACHE_SETTINGS)
+def test_local_cache_invalidated_on_delete(oauth2_settings, access_token):
+    assert validate(access_token.token)
+    access_token.user.delete()
+    assert get_local_access_token_cache().get(access_token_cache_key(access_token.token)) is None
+    assert not validate(access_token.token)
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(LOCAL_CACHE_SETTINGS)
+def test_local_cache_forgets_unknown_token_once_created(oauth2_settings, application, test_user):
+    assert not validate("new-token")
+    AccessToken.objects.create(
+        token="new-token",
+        application=application,
+        user=test_user,
+        scope="read",
+        expires=timezone.now() + timedelta(seconds=3600),
+    )
+    assert validate("new-token")
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(LOCAL_CACHE_SETTINGS)
+def test_local_cache_remembers_unknown_tokens(oauth2_settings, django_assert_num_queries):
+    with django_assert_num_queries(1):
+        assert not validate("unknown-token")
+    with django_assert_num_queries(0):
+        assert not validate("unknown-token")
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(dict(CACHE_SETTINGS, **LOCAL_CACHE_SETTINGS))
+def test_local_cache_is_filled_from_shared_cache(oauth2_settings, token_cache, access_token):
+    cache_access_token(access_token)
+    get_local_access_token_cache().clear()
+    assert get_cached_access_token(access_token.token) == access_token
+    assert get_local_access_token_cache().get(access_token_cache_key(access_token.token)) == access_token
@@ -0,0 +1,117 @@
+import hashlib
+from datetime import timedelta
+from importlib import import_module
+from types import SimpleNamespace
+
+import pytest
+from django.apps import apps
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from oauthlib.common import Request
+
+from oauth2_provider.models import get_access_token_model, get_grant_model, get_refresh_token_model
+from oauth2_provider.oauth2_validators import OAuth2Validator
+
+from . import presets
+from .conftest import generate_access_token
+
+
+AccessToken = get_access_token_model()
+Grant = get_grant_model()
+RefreshToken = get_refresh_token_model()
+
+CLEARTEXT_SECRET = "1234567890abcdefghijklmnopqrstuvwxyz"
+
+CHECKSUM_SETTINGS = dict(presets.OIDC_SETTINGS_RW, TOKEN_CHECKSUM_LOOKUP=True)
+
+
+def checksum(value):
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+@pytest.fixture
+def access_token(application, test_user):
+    return AccessToken.objects.create(
+        token="checksummed-token",
+        application=application,
+        user=test_user,
+        scope="read write",
+        expires=timezone.now() + timedelta(seconds=3600),
+    )
+
+
+@pytest.mark.django_db
+def test_checksums_are_saved(access_token, application, test_user):
+    refresh_token = RefreshToken.objects.create(
+        token="checksummed-refresh-token", application=application, user=test_user, access_token=access_token
+    )
+    grant = Grant.objects.create(
+        code="checksummed-code",
+        application=application,
+        user=test_user,
+        expires=timezone.now() + timedelta(seconds=60),
+        redirect_uri="http://example.org",
+    )
+    assert access_token.token_checksum == checksum("checksummed-token")
+    assert refresh_token.token_checksum == checksum("checksummed-refresh-token")
+    assert grant.code_checksum == checksum("checksummed-code")
+
+    access_token.token = "changed-token"
+    access_token.save()
+    access_token.refresh_from_db()
+    assert access_token.token_checksum == checksum("changed-token")
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(CHECKSUM_SETTINGS)
+def test_bearer_token_looked_up_by_checksum(oauth2_settings, access_token):
+    with CaptureQueriesContext(connection) as queries:
+        assert OAuth2Validator().validate_bearer_token(access_token.token, ["read"], Request("/"))
+    assert "token_checksum" in queries[0]["sql"]
+    assert access_token.token not in queries[0]["sql"]
+
+
+@pytest.mark.django_db
+def test_token_flows_with_checksum_lookup(oauth2_settings, application, test_user, client):
+    tokens = generate_access_token(
+        oauth2_settings, application, test_user, client, CHECKSUM_SETTINGS, "openid", "http://example.org"
+    )
+    response = client.get(
+        reverse("oauth2_provider:user-info"), HTTP_AUTHORIZATION="Bearer " + tokens.access_token
+    )
+    assert response.status_code == 200
+
+    refresh_token = RefreshToken.objects.get(access_token__token=tokens.access_token)
+    response = client.post(
+        reverse("oauth2_provider:token"),
+        data={
+            "grant_type": "refresh_token",
+            "refresh_token": refresh_token.token,
+            "client_id": application.client_id,
+            "client_secret": CLEARTEXT_SECRET,
+        },
+    )
+    assert response.status_code == 200
+    new_access_token = response.json()["access_token"]
+
+    response = client.post(
+        reverse("oauth2_provider:revoke-token"),
+        data={
+            "token": new_access_token,
+            "client_id": application.client_id,
+            "client_secret": CLEARTEXT_SECRET,
+        },
+    )
+    assert response.status_code == 200
+    assert not AccessToken.objects.filter(token=new_access_token).exists()
+
+
+@pytest.mark.django_db
+def test_backfill_migration(access_token):
+    AccessToken.objects.filter(pk=access_token.pk).update(token_checksum=None)
+    migration = import_module("oauth2_provider.migrations.0013_backfill_token_checksum")
+    migration.backfill_checksums(apps, SimpleNamespace(connection=connection))
+    access_token.refresh_from_db()
+    assert access_token.token_checksum == checksum(access_token.token)
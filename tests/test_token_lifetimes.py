@@ -0,0 +1,113 @@
+import datetime
+
+import pytest
+from django.utils import timezone
+
+from oauth2_provider.models import (
+    clear_expired,
+    get_access_token_model,
+    get_application_model,
+    get_id_token_model,
+    get_refresh_token_model,
+)
+
+from . import presets
+from .utils import CLEARTEXT_SECRET, authorize, exchange, request_token
+
+
+AccessToken = get_access_token_model()
+Application = get_application_model()
+IDToken = get_id_token_model()
+RefreshToken = get_refresh_token_model()
+
+
+def create_application(**kwargs):
+    return Application.objects.create(
+        name="Service application",
+        client_type=Application.CLIENT_CONFIDENTIAL,
+        authorization_grant_type=Application.GRANT_PASSWORD,
+        client_secret=CLEARTEXT_SECRET,
+        **kwargs,
+    )
+
+
+def assert_expires_in(expires, seconds):
+    remaining = (expires - timezone.now()).total_seconds()
+    assert seconds - 5 < remaining <= seconds
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(presets.DEFAULT_SCOPES_RW)
+def test_access_token_lifetime(oauth2_settings, test_user, client):
+    service = create_application(access_token_expire_seconds=7 * 24 * 3600)
+    browser = create_application()
+
+    token = request_token(client, service).json()
+    assert token["expires_in"] == 7 * 24 * 3600
+    assert_expires_in(AccessToken.objects.get(token=token["access_token"]).expires, 7 * 24 * 3600)
+
+    token = request_token(client, browser).json()
+    assert token["expires_in"] == oauth2_settings.ACCESS_TOKEN_EXPIRE_SECONDS
+    assert_expires_in(
+        AccessToken.objects.get(token=token["access_token"]).expires,
+        oauth2_settings.ACCESS_TOKEN_EXPIRE_SECONDS,
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(presets.OIDC_SETTINGS_RW)
+def test_id_token_lifetime(oauth2_settings, application, test_user, client):
+    application.id_token_expire_seconds = 600
+    application.save()
+
+    token = exchange(client, application, authorize(client, application, test_user)).json()
+    assert "id_token" in token
+    assert_expires_in(IDToken.objects.get().expires, 600)
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(presets.DEFAULT_SCOPES_RW)
+@pytest.mark.parametrize("global_lifetime", [3600, None])
+def test_clear_expired_refresh_token_lifetime(oauth2_settings, test_user, client, global_lifetime):
+    oauth2_settings.REFRESH_TOKEN_EXPIRE_SECONDS = global_lifetime
+    short_lived = create_application(refresh_token_expire_seconds=60)
+    long_lived = create_application(refresh_token_expire_seconds=7 * 24 * 3600)
+    default = create_application()
+    for application in (short_lived, long_lived, default):
+        request_token(client, application)
+    RefreshToken.objects.update(revoked=timezone.now() - datetime.timedelta(hours=2))
+
+    clear_expired()
+    remaining = set(RefreshToken.objects.values_list("application", flat=True))
+    if global_lifetime:
+        assert remaining == {long_lived.pk}
+    else:
+        assert remaining == {long_lived.pk, default.pk}
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(
+    dict(presets.DEFAULT_SCOPES_RW, ACCESS_TOKEN_EXPIRE_JITTER=0.2, ACCESS_TOKEN_REFRESH_AHEAD_RATIO=0.75)
+)
+def test_expiry_jitter_and_refresh_ahead_hint(oauth2_settings, test_user, client, mocker):
+    application = create_application(access_token_expire_seconds=1000)
+    mocker.patch("oauth2_provider.models.random.random", return_value=0.5)
+
+    token = request_token(client, application).json()
+    assert token["expires_in"] == 900
+    assert token["refresh_in"] == 675
+    assert_expires_in(AccessToken.objects.get(token=token["access_token"]).expires, 900)
+
+    token = request_token(
+        client, application, grant_type="refresh_token", refresh_token=token["refresh_token"]
+    ).json()
+    assert token["expires_in"] == 900
+    assert token["refresh_in"] == 675
+
+
+@pytest.mark.django_db
+@pytest.mark.oauth2_settings(presets.DEFAULT_SCOPES_RW)
+def test_no_expiry_jitter_by_default(oauth2_settings, test_user, client):
+    token = request_token(client, create_application()).json()
+    assert token["expires_in"] == oauth2_settings.ACCESS_TOKEN_EXPIRE_SECONDS
+    assert "refresh_in" not in token
@@ -25,3 +25,23 @@ CQDpSvwIvDMSIQIJAMDk47DzG9FHAghtvg1TWpy3oQIJAL6NHlS+RBufAgkA6QLA
     jwk3 = utils.jwk_from_pem(a_different_tiny_rsa_key)
 
     assert jwk3 is not jwk1
+
+
+def test_lazy_user_loads_on_attribute_access():
+    class User:
+        pk = 42
+        username = "test_user"
+
+    loaded = []
+
+    def load():
+        loaded.append(True)
+        return User()
+
+    user = utils.LazyUser(42, load)
+    user.backend = "backend"
+    assert user and user.pk == 42 and user.backend == "backend"
+    assert not loaded
+    assert user.username == "test_user"
+    assert user.backend == "backend"
+    assert loaded == [True]
@@ -1,5 +1,12 @@
 import base64
 from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+from django.urls import reverse
+
+
+# The client secret of the applications created by the conftest fixtures.
+CLEARTEXT_SECRET = "1234567890abcdefghijklmnopqrstuvwxyz"
 
 
 def get_basic_auth_header(user, password):
@@ -30,3 +37,66 @@ def spy_on(meth):
 
     wrapper.spy = spy
     return wrapper
+
+
+def authorize(client, application, user):
+    """
+    Let `user` authorize `application` for the openid and read scopes, and return
+    the authorization code.
+    """
+    client.force_login(user)
+    response = client.post(
+        reverse("oauth2_provider:authorize"),
+        data={
+            "client_id": application.client_id,
+            "state": "random_state_string",
+            "scope": "openid read",
+            "redirect_uri": "http://example.org",
+            "response_type": "code",
+            "nonce": "random_nonce_string",
+            "allow": True,
+        },
+    )
+    client.logout()
+    return parse_qs(urlparse(response["Location"]).query)["code"][0]
+
+
+def exchange(client, application, code):
+    """
+    Exchange an authorization code returned by `authorize` for tokens.
+    """
+    return client.post(
+        reverse("oauth2_provider:token"),
+        data={
+            "grant_type": "authorization_code",
+            "code": code,
+            "redirect_uri": "http://example.org",
+            "client_id": application.client_id,
+            "client_secret": CLEARTEXT_SECRET,
+        },
+    )
+
+
+def refresh(client, application, refresh_token, **data):
+    """
+    Exchange a refresh token for new tokens, with the extra request parameters in `data`.
+    """
+    data.update(
+        grant_type="refresh_token",
+        refresh_token=refresh_token,
+        client_id=application.client_id,
+        client_secret=CLEARTEXT_SECRET,
+    )
+    return client.post(reverse("oauth2_provider:token"), data=data)
+
+
+def request_token(client, application, **data):
+    """
+    Request a token from the token endpoint, with the password grant of the conftest
+    test_user unless another grant_type is given in `data`.
+    """
+    data.setdefault("grant_type", "password")
+    if data["grant_type"] == "password":
+        data.update(username="test_user", password="123456")
+    data.update(client_id=application.client_id, client_secret=CLEARTEXT_SECRET)
+    return client.post(reverse("oauth2_provider:token"), data=data)